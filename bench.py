@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+오프라인 종단 간 벤치마크 — 로컬 스탠드인 서버(stubs.MarketDataStub)로 main() 전체를 실행
+시나리오별 지연 · 오류 · 비정상값을 주입하고 소요 시간 · 요청 수 · 폴백 경로를 비교
+
+사용:
+  python bench.py                          # 전체 시나리오
+  python bench.py -s baseline -s fx-down   # 일부만
+  python bench.py --runs 5 --json bench.json
+  python bench.py --baseline bench.json    # 이전 결과 대비 회귀 시 종료 코드 1
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+import monitor
+import stubs
+
+# 시나리오: (설명, faults, 옵션)
+#   faults는 stubs.MarketDataStub 형식, manual=True면 수동 실행(현황 리포트 → Telegram 전송)
+SCENARIOS = {
+    "baseline":         ("정상 응답", {}, {}),
+    "manual-report":    ("수동 실행 — 현황 리포트 전송", {}, {"manual": True}),
+    "fx-down":          ("Naver 환율 503 → er-api 폴백",
+                         {"naver-fx": {"status": 503}}, {}),
+    "fx-slow":          ("Naver 환율 1.5s 지연",
+                         {"naver-fx": {"delay": 1.5}}, {}),
+    "metals-down":      ("Naver 금 API 500 → 데스크톱 HTML 폴백",
+                         {"naver-metals": {"status": 500}}, {}),
+    "metals-invalid":   ("Naver 금 API 비정상값 → 데스크톱 HTML 폴백",
+                         {"naver-metals": {"invalid": True}}, {}),
+    "swissquote-invalid": ("Swissquote 범위 밖 시세 ($50,000) → 금 김프 불가",
+                           {"swissquote": {"invalid": True}}, {}),
+    "upbit-timeout":    ("Upbit 타임아웃 → 테더 김프 불가",
+                         {"upbit": {"delay": 5.0}}, {}),
+    "fx-all-down":      ("환율 소스 전부 실패 → 회차 중단",
+                         {"naver-fx": {"status": 500}, "er-api": {"status": 500}}, {"manual": True}),
+    "telegram-429":     ("Telegram 429 1회 → retry_after 후 재전송",
+                         {"telegram": {"status": 429, "fail_first": 1, "retry_after": 0.5}},
+                         {"manual": True}),
+    "all-slow":         ("모든 소스 0.3s 지연",
+                         {name: {"delay": 0.3} for name in
+                          ("upbit", "naver-fx", "naver-metals", "swissquote")}, {}),
+}
+
+
+# ═══════════════════════════════════════════════════════
+#  환경 구성
+# ═══════════════════════════════════════════════════════
+
+def point_monitor_at(stub: stubs.MarketDataStub, timeout: float):
+    """
+    monitor의 모든 외부 엔드포인트를 스탠드인으로 돌리고 오프라인에서 불가능한 소스는 제외
+    (yfinance 기반 Yahoo 폴백은 URL을 바꿀 수 없어 체인에서 제거)
+    """
+    for name in monitor.SOURCE_BASE_URLS:
+        monitor.SOURCE_BASE_URLS[name] = stub.url
+    monitor.VENUE_BASE_URLS["upbit"] = stub.url
+    monitor.TELEGRAM_API_URL   = stub.url
+    monitor.TELEGRAM_BOT_TOKEN = "TEST"
+    monitor.TELEGRAM_CHAT_ID   = "1"
+    monitor.NOTIFY_WEBHOOK_URL = monitor.DISCORD_WEBHOOK_URL = ""
+    monitor.SUBSCRIBERS_FILE   = ""      # 구독자 알림 제외 (로컬 subscribers.json과 무관하게 비교)
+    monitor.MARKET_HOURS_ENABLED = False  # 실행 시각(휴장 여부)과 무관하게 모든 소스 조회
+    monitor.KIMP_ASSETS = ["USDT"]
+    monitor.KIMP_VENUES = ["upbit"]
+    monitor.HTTP_TIMEOUT = timeout
+    monitor.HTTP_CACHE_ENABLED = False
+    monitor.PROVIDERS[:] = [p for p in monitor.PROVIDERS if "yahoo" not in p.id]
+
+
+def reset_monitor(workdir: str):
+    """회차마다 프로세스 전역 상태를 새로 시작 (콜드 스타트와 같은 조건)"""
+    if monitor._http_client is not None:
+        monitor._http_client.close()
+    if monitor._tick_store is not None:
+        monitor._tick_store.close()
+    monitor._http_client = None
+    monitor._tick_store  = None
+    monitor._notifier    = None
+    monitor._source_latency.clear()
+    monitor._source_health.clear()
+    monitor.METRICS = monitor.Metrics()
+    for name in os.listdir(workdir):
+        os.remove(os.path.join(workdir, name))
+    monitor.TICK_DB      = os.path.join(workdir, "ticks.db")
+    monitor.METRICS_FILE = os.path.join(workdir, "metrics.json")
+    monitor.configure_state_backend("memory")
+
+
+# ═══════════════════════════════════════════════════════
+#  실행
+# ═══════════════════════════════════════════════════════
+
+def run_once(stub: stubs.MarketDataStub, workdir: str, manual: bool, verbose: bool) -> dict:
+    reset_monitor(workdir)
+    stub.reset_counts()
+
+    attempts = []
+    original = monitor.record_source_result
+
+    def traced(source, ok, elapsed=None, error=None, cached=False):
+        attempts.append((source, ok, None if ok else monitor.failure_reason(error)))
+        return original(source, ok, elapsed, error, cached)
+
+    monitor.record_source_result = traced
+    os.environ["RUN_MODE"] = "workflow_dispatch" if manual else "schedule"
+    out = sys.stdout if verbose else io.StringIO()
+    started = time.perf_counter()
+    exit_code = 0
+    try:
+        with redirect_stdout(out):
+            monitor.main()
+    except SystemExit as e:
+        exit_code = e.code or 0
+    finally:
+        monitor.record_source_result = original
+    wall = time.perf_counter() - started
+
+    metrics = monitor.METRICS.to_dict()
+    stages = {}
+    for span in metrics["spans"]:
+        if not span["name"].startswith("fetch:"):
+            stages[span["name"]] = stages.get(span["name"], 0.0) + span["duration"]
+    return {
+        "wall":     wall,
+        "exit":     exit_code,
+        "requests": stub.reset_counts(),
+        "paths":    fallback_paths(attempts),
+        "stages":   stages,
+    }
+
+
+def fallback_paths(attempts: list) -> dict:
+    """
+    자산별 시도 순서 — "fx:naver✗(http) → fx:er-api✓"
+    """
+    asset_of = {p.id: p.asset for p in monitor.PROVIDERS}
+    paths = {}
+    for source, ok, reason in attempts:
+        step = f"{source}✓" if ok else f"{source}✗({reason})"
+        paths.setdefault(asset_of.get(source, source), []).append(step)
+    return {asset: " → ".join(steps) for asset, steps in sorted(paths.items())}
+
+
+def run_scenario(stub: stubs.MarketDataStub, workdir: str, name: str, runs: int,
+                 verbose: bool) -> dict:
+    desc, faults, opts = SCENARIOS[name]
+    stub.faults.clear()
+    stub.faults.update(faults)
+    results = [run_once(stub, workdir, opts.get("manual", False), verbose) for _ in range(runs)]
+    walls = [r["wall"] for r in results]
+    last  = results[-1]
+    return {
+        "scenario":  name,
+        "desc":      desc,
+        "runs":      runs,
+        "wall_median": round(statistics.median(walls), 4),
+        "wall_min":  round(min(walls), 4),
+        "wall_max":  round(max(walls), 4),
+        "exit":      last["exit"],
+        "requests":  last["requests"],
+        "paths":     last["paths"],
+        "stages":    {k: round(v, 4) for k, v in last["stages"].items()},
+    }
+
+
+def compare(results: list, baseline: dict, tolerance: float, slack: float) -> list:
+    """
+    이전 결과 대비 회귀 — 소요 시간(median > base × (1+tolerance) + slack) · 폴백 경로 변화
+    """
+    problems = []
+    for r in results:
+        base = baseline.get(r["scenario"])
+        if base is None:
+            continue
+        limit = base["wall_median"] * (1 + tolerance) + slack
+        if r["wall_median"] > limit:
+            problems.append(f"{r['scenario']}: 소요 시간 {base['wall_median']:.3f}s → "
+                            f"{r['wall_median']:.3f}s (허용 {limit:.3f}s)")
+        if r["paths"] != base["paths"]:
+            problems.append(f"{r['scenario']}: 폴백 경로 변경 {base['paths']} → {r['paths']}")
+        if r["exit"] != base["exit"]:
+            problems.append(f"{r['scenario']}: 종료 코드 {base['exit']} → {r['exit']}")
+    return problems
+
+
+def print_report(results: list):
+    print(f"\n  {'시나리오':<20} {'median':>8} {'min':>7} {'max':>7} {'exit':>4}  요청 수")
+    for r in results:
+        reqs = " ".join(f"{k}={v}" for k, v in sorted(r["requests"].items()))
+        print(f"  {r['scenario']:<20} {r['wall_median']:>7.3f}s {r['wall_min']:>6.3f}s "
+              f"{r['wall_max']:>6.3f}s {r['exit']:>4}  {reqs}")
+        for asset, path in r["paths"].items():
+            print(f"  {'':<20}   {asset:<17} {path}")
+        slow = sorted(r["stages"].items(), key=lambda kv: -kv[1])[:3]
+        print(f"  {'':<20}   구간 상위: " + ", ".join(f"{k} {v:.3f}s" for k, v in slow))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="오프라인 종단 간 벤치마크 (로컬 스탠드인)")
+    parser.add_argument("-s", "--scenario", action="append", choices=list(SCENARIOS),
+                        help="실행할 시나리오 (반복 지정, 기본: 전체)")
+    parser.add_argument("--runs", type=int, default=3, help="시나리오당 반복 횟수 (median 보고)")
+    parser.add_argument("--timeout", type=float, default=2.0, help="HTTP 타임아웃(초)")
+    parser.add_argument("--json", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON — 회귀 시 종료 코드 1")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="허용 소요 시간 증가율")
+    parser.add_argument("--slack", type=float, default=0.05, help="허용 소요 시간 증가 절대값(초)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="monitor 출력 표시")
+    args = parser.parse_args(argv)
+
+    names = args.scenario or list(SCENARIOS)
+    with stubs.MarketDataStub() as stub, tempfile.TemporaryDirectory(prefix="kimp-bench-") as workdir:
+        point_monitor_at(stub, args.timeout)
+        print(f"  [Bench] 스탠드인 {stub.url} — 시나리오 {len(names)}개 × {args.runs}회 "
+              f"(Yahoo 폴백 제외, 타임아웃 {args.timeout:g}s)")
+        results = []
+        for name in names:
+            results.append(run_scenario(stub, workdir, name, args.runs, args.verbose))
+            r = results[-1]
+            print(f"  [Bench] {name:<20} {r['wall_median']:.3f}s  ({r['desc']})")
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({r["scenario"]: r for r in results}, f, indent=2, ensure_ascii=False)
+        print(f"\n  [Bench] 저장: {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.tolerance, args.slack)
+        if problems:
+            print("\n  [Bench] 회귀 감지:")
+            for p in problems:
+                print(f"    - {p}")
+            return 1
+        print("\n  [Bench] 기준 대비 회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
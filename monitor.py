@@ -1,107 +1,851 @@
 #!/usr/bin/env python3
 """
-김치프리미엄 모니터 — 테더 김프 & 금 김프
+김치프리미엄 모니터 — 테더 김프 & 금 김프 (+ KIMP_ASSETS 다중 자산)
 스마트 알림: 방향성 기반 — 악화 시에만 재알림
 금 김프: 단계별 알림 (0%, -1%, -2%, -3%...) + 변동 원인 분석
-상태 저장: 레포 내 state.json (최근 10건 이력 + 마지막 알림값)
+이상 변동: EWMA z-score + 스트리밍 분위수 (state.json의 stats, 틱마다 O(1))
+상태 저장: 레포 내 state.json (마지막 알림값) + ticks.db (전체 시세 이력, SQLite WAL)
 데이터 개선: 네이버 실시간 환율 API + 비정상값 검증 적용
+실행 모드: 1회 실행 (크론) / --daemon 상주 모드 (수 초 단위 폴링)
 """
 
 import os
 import sys
 import json
+import argparse
+import ast
+import operator
+import bisect
+import codecs
+import copy
+import hashlib
+import signal
+import sqlite3
+import subprocess
+import tempfile
 import re
 import math
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from datetime import datetime, timezone, timedelta
+from typing import Callable, Optional
 
 import requests
-import yfinance as yf
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, NewConnectionError, ReadTimeoutError
+from urllib3.util.retry import Retry
 
 # ─── 상수 ───────────────────────────────────────────────
 KST = timezone(timedelta(hours=9))
 TROY_OUNCE_TO_GRAM = 31.1035
 STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "state.json")
-MAX_HISTORY = 10
+TICK_DB    = os.environ.get("TICK_DB") or os.path.join(os.path.dirname(STATE_FILE), "ticks.db")
 
 # 금값 합리적 범위 (USD/oz)
 GOLD_PRICE_MIN_USD = 1_000
 GOLD_PRICE_MAX_USD = 10_000
 
+# 환율 합리적 범위 (원/USD)
+USD_KRW_MIN = 500
+USD_KRW_MAX = 3_000
+
 # ─── 금 김프 단계별 알림 설정 ───────────────────────────
 # low 방향: 0% 이하 진입 시 최초 알림, 이후 -1%, -2%, -3%... 단위로 알림
 # high 방향: 기존과 동일 (GOLD_KIMP_HIGH 초과 시 알림)
-GOLD_KIMP_STEP = 1.0  # 단계 간격 (1%p 단위)
+GOLD_KIMP_STEP = float(os.environ.get("GOLD_KIMP_STEP") or "1.0")  # 단계 간격 (기본 1%p)
+
+# ─── 이상 변동 알림 (온라인 통계) ───────────────────────
+ANOMALY_Z_THRESHOLD  = float(os.environ.get("ANOMALY_Z_THRESHOLD")  or "4")
+ANOMALY_COOLDOWN_MIN = float(os.environ.get("ANOMALY_COOLDOWN_MIN") or "60")
+ANOMALY_MIN_SAMPLES  = 30     # 이 이상 관측된 뒤부터 판단
+ANOMALY_MIN_STD_PP   = 0.05   # z-score 분모 하한 (%p) — 평탄 구간 과민 반응 방지
+STATS_HALFLIFE_MIN   = float(os.environ.get("STATS_HALFLIFE_MIN")   or "360")
+STATS_QUANTILES      = (0.05, 0.5, 0.95)
+# 통계는 실행마다 STATS_FILE에도 저장 — git 백엔드는 상태 커밋을 디바운스(GIT_COMMIT_INTERVAL_MIN)하므로
+# 커밋에만 의존하면 CI에서 표본이 약 1시간에 1개로 줄어듦. CI는 이 파일을 Actions 캐시로 유지 (커밋 안 함)
+STATS_FILE = os.environ.get("STATS_FILE") or os.path.join(os.path.dirname(STATE_FILE), "stats.json")
+
+# ─── 금 김프 변동 분해 (--attribution) ───────────────────
+ATTRIBUTION_HISTORY_DAYS = float(os.environ.get("ATTRIBUTION_HISTORY_DAYS") or "7")  # 누적 시계열 적재 기간
+ATTRIBUTION_HORIZONS     = os.environ.get("ATTRIBUTION_HORIZONS") or "1h,24h,7d"
+
+# ─── 시세 이력 롤업 (OHLC 봉 · 보존 기간) ────────────────
+# 틱마다 계열별 1분 · 1시간 · 1일 봉을 갱신하고, 보존 기간이 지난 원시 틱 · 1분 봉은 정리 (0이면 무기한)
+BAR_SERIES         = ("usdt_kimp", "gold_kimp", "usd_krw", "intl_gold_usd_oz", "krx_gold_krw_g")
+BAR_RESOLUTIONS    = {"1m": 60, "1h": 3600, "1d": 86400}
+BAR_ALIGN_OFFSET   = 9 * 3600   # 봉 경계를 KST 기준으로 (일봉 = KST 자정)
+TICK_RETENTION_DAYS       = float(os.environ.get("TICK_RETENTION_DAYS") or "14")
+MINUTE_BAR_RETENTION_DAYS = float(os.environ.get("MINUTE_BAR_RETENTION_DAYS") or "180")
+COMPACT_INTERVAL_SEC      = 3600   # 데몬에서 정리 주기 (1회 실행은 실행마다 1회)
+
+# ─── 거래 시간 (휴장 시장은 조회 생략) ──────────────────
+# 장이 닫힌 시장의 자산은 마감 후 MARKET_CLOSE_SETTLE_MIN이 지난 뒤 기록된 종가를 재사용 (Upbit은 항상 조회)
+# 세션은 KST "HH:MM-HH:MM" (마감이 개장보다 이르면 다음 날 마감), MARKET_HOLIDAYS로 휴장일 추가
+MARKET_HOURS_ENABLED    = (os.environ.get("MARKET_HOURS") or "on").lower() != "off"
+MARKET_CLOSE_SETTLE_MIN = float(os.environ.get("MARKET_CLOSE_SETTLE_MIN") or "30")
+KRX_SESSION   = os.environ.get("KRX_SESSION")  or "09:00-15:30"   # KRX 금시장 정규장
+FX_SESSION    = os.environ.get("FX_SESSION")   or "09:00-02:00"   # 서울 외환시장 (연장 거래 포함)
+GOLD_SESSION  = os.environ.get("GOLD_SESSION") or "07:00-07:00"   # 국제 금 — 월 07시 ~ 토 07시 (24시간 × 5일)
+MARKET_HOLIDAYS = os.environ.get("MARKET_HOLIDAYS") or ""          # "2026-06-03,2026-10-05" 형식
 
 # ─── 환경변수 ───────────────────────────────────────────
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN") or ""
 TELEGRAM_CHAT_ID   = os.environ.get("TELEGRAM_CHAT_ID")   or ""
+TELEGRAM_API_URL   = os.environ.get("TELEGRAM_API_URL")   or "https://api.telegram.org"
+NOTIFY_WEBHOOK_URL  = os.environ.get("NOTIFY_WEBHOOK_URL")  or ""   # 범용 JSON 웹훅 {"text": ...}
+DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL") or ""
 
 USDT_KIMP_LOW  = float(os.environ.get("USDT_KIMP_LOW")  or "0")
 USDT_KIMP_HIGH = float(os.environ.get("USDT_KIMP_HIGH") or "10")
 GOLD_KIMP_LOW  = float(os.environ.get("GOLD_KIMP_LOW")  or "0")
 GOLD_KIMP_HIGH = float(os.environ.get("GOLD_KIMP_HIGH") or "10")
 
+# ─── 다중 자산 김프 ─────────────────────────────────────
+# Upbit KRW 마켓 심볼 목록 — USDT 외 자산은 틱마다 배치 요청 1회로 함께 조회
+# 자산별 임계값: KIMP_LOW_<SYM> / KIMP_HIGH_<SYM> (미설정 시 USDT 임계값 사용)
+KIMP_ASSETS = [s.strip().upper() for s in (os.environ.get("KIMP_ASSETS") or "USDT").split(",")
+               if s.strip()]
+STABLECOINS = {"USDT", "USDC", "DAI", "USDS", "USDE"}   # 기준가 = USD/KRW 환율
+OFFSHORE_PRICE_SOURCE = os.environ.get("OFFSHORE_PRICE_SOURCE") or "binance"
+# 국내 거래소 교차 비교 — upbit 외 거래소를 추가하면 거래소 × 자산 김프 행렬 계산
+KIMP_VENUES = [s.strip().lower() for s in (os.environ.get("KIMP_VENUES") or "upbit").split(",")
+               if s.strip()]
+VENUE_SPREAD_PP = float(os.environ.get("VENUE_SPREAD_PP") or "1.0")  # 거래소 간 괴리 알림 기준 (%p)
+ASSET_NAMES = {"USDT": "테더", "BTC": "비트코인", "ETH": "이더리움", "XRP": "리플", "SOL": "솔라나"}
+
+# ─── 알림 규칙 파일 (선언형) ────────────────────────────
+# 있으면 파일의 규칙으로 평가 (.yaml/.yml은 PyYAML 필요, .json은 표준 라이브러리), 없으면 기본 규칙
+ALERT_RULES_FILE = os.environ.get("ALERT_RULES_FILE") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "alert_rules.yaml")
+
+# ─── 구독자별 알림 (다중 채팅) ───────────────────────────
+# 채팅마다 자산 선택 · 임계값 · 단계 간격 — 없으면 전역 설정(USDT_KIMP_* / GOLD_KIMP_* / KIMP_*_<SYM>)
+SUBSCRIBERS_FILE = os.environ.get("SUBSCRIBERS_FILE") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "subscribers.json")
+SUBSCRIPTION_DEFAULT_ASSETS = ("USDT", "GOLD")
+
+# ─── 상태 저장소 ────────────────────────────────────────
+# git: 파일 + 디바운스 커밋/푸시 (1회 실행 기본) · file: 로컬 파일만 (데몬 기본) · memory
+STATE_BACKEND           = os.environ.get("STATE_BACKEND") or "git"
+GIT_COMMIT_INTERVAL_MIN = float(os.environ.get("GIT_COMMIT_INTERVAL_MIN") or "60")
+
+# ─── 데몬 모드 (--daemon) ───────────────────────────────
+POLL_INTERVAL_SEC       = float(os.environ.get("POLL_INTERVAL_SEC")       or "10")
+POLL_INTERVAL_MIN_SEC   = 2.0
+STATE_SAVE_INTERVAL_SEC = float(os.environ.get("STATE_SAVE_INTERVAL_SEC") or "300")
+
+# ─── 기동 시간 예산 (--startup-time) ────────────────────
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS") or "500")
+
+# ─── Upbit 실시간 스트림 (--stream) ─────────────────────
+UPBIT_WS_URL       = os.environ.get("UPBIT_WS_URL") or "wss://api.upbit.com/websocket/v1"
+WS_RECV_TIMEOUT_SEC = 30.0   # 무수신 시 ping 주기
+WS_BACKOFF_MIN_SEC  = 1.0
+WS_BACKOFF_MAX_SEC  = 60.0
+WS_MAX_AGE_SEC      = 60.0   # 회차 수집 시 스트림 가격 허용 나이
+
+# ─── HTTP 클라이언트 ─────────────────────────────────────
+HTTP_TIMEOUT   = float(os.environ.get("HTTP_TIMEOUT") or "10")  # 기본 타임아웃 (초)
+HTTP_RETRIES   = int(os.environ.get("HTTP_RETRIES") or "1")     # GET 재시도 횟수
+HTTP_POOL_SIZE = 4                                              # 호스트당 keep-alive 커넥션 수
+HTTP_DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    )
+}
+
+# ─── HTML 스크래핑 (스트리밍 추출) ──────────────────────
+# 본문을 청크 단위로 읽다가 추출기가 매치되면 즉시 중단 — 바이트 · 시간 예산 초과 시 실패
+SCRAPE_MAX_BYTES  = int(os.environ.get("SCRAPE_MAX_BYTES") or str(512 * 1024))
+SCRAPE_BUDGET_SEC = float(os.environ.get("SCRAPE_BUDGET_SEC") or "5")
+SCRAPE_CHUNK_SIZE = 8192
+
+# ─── 시세 소스 엔드포인트 ───────────────────────────────
+# SOURCE_BASE_URL_<NAME> 으로 덮어쓰기 (로컬 스탠드인 · 프록시 · 벤치마크용)
+SOURCE_BASE_URLS = {
+    name: os.environ.get(f"SOURCE_BASE_URL_{name.upper().replace('-', '_')}") or default
+    for name, default in (
+        ("naver-fx",      "https://m.stock.naver.com"),
+        ("naver-api",     "https://api.stock.naver.com"),
+        ("naver-finance", "https://finance.naver.com"),
+        ("er-api",        "https://open.er-api.com"),
+        ("swissquote",    "https://forex-data-feed.swissquote.com"),
+        ("binance",       "https://api.binance.com"),
+        ("coinbase",      "https://api.coinbase.com"),
+    )
+}
+
+# ─── 알림 디스패처 ──────────────────────────────────────
+NOTIFY_RETRIES        = 4      # 싱크별 재시도 횟수 (429는 retry_after 준수)
+NOTIFY_BACKOFF_SEC    = 1.0    # 재시도 지수 백오프 시작값
+NOTIFY_FLUSH_SEC      = 30.0   # 1회 실행 종료 시 전송 대기 (속도 제한 싱크는 남은 건수만큼 늘림)
+NOTIFY_FLUSH_MAX_SEC  = float(os.environ.get("NOTIFY_FLUSH_MAX_SEC") or "180")   # 늘린 대기의 상한 (CI 작업 5분)
+TELEGRAM_MAX_CHARS    = 4000   # sendMessage 4096자 제한 — 병합 메시지는 이 길이로 분할
+TELEGRAM_RATE_PER_SEC = 1.0    # 채팅당 초당 1건 (버스트 3)
+DISCORD_RATE_PER_SEC  = 2.5    # 웹훅당 2초 5건
+TELEGRAM_BROADCAST_RATE_PER_SEC = 25.0   # 구독자 전송 — 봇 전체 초당 30건 제한 아래로
+
+# ─── HTTP 응답 캐시 (느리게 변하는 소스) ─────────────────
+# 소스별 TTL(초) — TTL 안에서는 재요청 없이 캐시 사용, 만료 후에는 ETag/Last-Modified로 재검증
+# HTTP_CACHE_TTL="fx:er-api=7200,krx:naver-api=300" 형식으로 덮어쓰기
+HTTP_CACHE_ENABLED = (os.environ.get("HTTP_CACHE") or "on").lower() != "off"
+HTTP_CACHE_DB      = os.environ.get("HTTP_CACHE_DB") or os.path.join(os.path.dirname(STATE_FILE), "http_cache.db")
+# ↑ 커밋되는 틱 DB와 분리 (HTML 본문이 저장소 이력에 쌓이지 않도록) — CI에서는 Actions 캐시로 유지
+HTTP_CACHE_TTL = {
+    "fx:naver":          60,
+    "fx:er-api":         3600,    # 일간 업데이트
+    "krx:naver-api":     60,
+    "krx:naver-desktop": 120,
+}
+HTTP_CACHE_TTL.update({
+    k.strip(): float(v) for k, _, v in
+    (item.partition("=") for item in (os.environ.get("HTTP_CACHE_TTL") or "").split(",") if "=" in item)
+})
+HTTP_CACHE_MAX_STALE_SEC = float(os.environ.get("HTTP_CACHE_MAX_STALE_MIN") or "360") * 60  # 장애 시 허용
+
+# ─── 계측 (메트릭) ──────────────────────────────────────
+# 데몬: Prometheus 텍스트 엔드포인트 (METRICS_PORT=off 로 끔) / 1회 실행: METRICS_FILE JSON
+METRICS_HOST = os.environ.get("METRICS_HOST") or "127.0.0.1"
+METRICS_PORT = os.environ.get("METRICS_PORT") or "9108"
+METRICS_FILE = os.environ.get("METRICS_FILE") or os.path.join(os.path.dirname(STATE_FILE), "metrics.json")
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0)
+
+# ─── 읽기 API (데몬) ─────────────────────────────────────
+# GET /snapshot · /history/<기간> · /drivers — 회차마다 직렬화해 둔 JSON을 그대로 반환 (API_PORT=off 로 끔)
+API_HOST            = os.environ.get("API_HOST") or "127.0.0.1"
+API_PORT            = os.environ.get("API_PORT") or "9109"
+API_HISTORY_WINDOWS = os.environ.get("API_HISTORY_WINDOWS") or "1h,24h,7d"
+API_HISTORY_POINTS  = int(os.environ.get("API_HISTORY_POINTS") or "500")   # 기간별 최대 점 수 (균등 추출)
+
+# ─── 헤징 (폴백 소스 병렬 시작) ─────────────────────────
+# HEDGE_DELAY_SEC 미설정 시 소스별 최근 응답시간 p95를 지연 예산으로 사용
+HEDGE_ENABLED      = (os.environ.get("HEDGE_MODE") or "on").lower() != "off"
+HEDGE_DELAY_SEC    = float(os.environ["HEDGE_DELAY_SEC"]) if os.environ.get("HEDGE_DELAY_SEC") else None
+HEDGE_DEFAULT_SEC  = 3.0   # 표본 부족 시 / p95 상한
+HEDGE_FLOOR_SEC    = 0.3   # p95 하한
+HEDGE_MIN_SAMPLES  = 5
+LATENCY_SAMPLE_SIZE = 20
+
+_source_latency = {}  # source_id → deque[응답시간(초)]
+
+# ─── 소스 건강도 & 서킷 브레이커 ─────────────────────────
+# 연속 BREAKER_FAILURES회 실패한 소스는 쿨다운 동안 체인에서 제외 (쿨다운 후 1회 시험 요청)
+# 체인은 건강한 소스 중 예상 소요 시간(p50 / 성공률)이 짧은 순으로 재정렬
+HEALTH_WINDOW         = 50     # 성공률 계산에 쓰는 최근 결과 수
+HEALTH_MIN_SAMPLES    = 5      # 이보다 적게 관측된 소스는 성공률 가중 없이 정렬
+HEALTH_REPROBE_SEC    = 1800   # 이 시간 동안 시도되지 않은 소스는 선언 순서 자리에서 재측정
+BREAKER_FAILURES      = int(os.environ.get("BREAKER_FAILURES") or "3")
+BREAKER_COOLDOWN_SEC  = float(os.environ.get("BREAKER_COOLDOWN_MIN") or "15") * 60
+ADAPTIVE_ORDER        = (os.environ.get("ADAPTIVE_ORDER") or "on").lower() != "off"
+
+_source_health = {}   # source_id → SourceHealth
+_source_health_lock = threading.Lock()
+
+
+# ═══════════════════════════════════════════════════════
+#  시세 이력 (틱 저장소)
+# ═══════════════════════════════════════════════════════
+
+# 틱마다 기록하는 수치 컬럼 (컬럼명 → 반올림 자릿수)
+TICK_COLUMNS = {
+    "usdt_kimp":        4,
+    "gold_kimp":        4,
+    "usd_krw":          2,
+    "upbit_usdt":       2,
+    "intl_gold_usd_oz": 2,
+    "krx_gold_krw_g":   0,
+}
+
+
+def bar_start(ts: float, res: float) -> float:
+    """ts가 속한 res초 봉의 시작 epoch (KST 경계 정렬)"""
+    return ts - (ts + BAR_ALIGN_OFFSET) % res
+
+
+class OhlcBars:
+    """
+    고정 간격 OHLC 봉 (메모리) — 값이 들어오면 마지막 봉을 갱신하거나 새 봉을 추가 (O(1))
+
+    step의 약수 간격 봉(1분 봉 등)을 add()로 합쳐 넣을 수도 있음 (경계가 같은 기준으로 정렬돼 있어 겹치지 않음)
+    span을 주면 그보다 오래된 봉은 앞에서 잘라냄. 입력은 시간순 가정 — 이미 지난 봉의 값은 무시
+    """
+
+    def __init__(self, step: float, columns: tuple, span: float = None):
+        self.step    = step
+        self.columns = tuple(columns)
+        self.span    = span
+        self.starts  = []
+        self.bars    = []   # 봉마다 {컬럼: [o, h, l, c, count]}
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, ts: float, column: str, o: float, h: float, l: float, c: float, count: int = 1):
+        start = bar_start(ts, self.step)
+        if not self.starts or start > self.starts[-1]:
+            self.starts.append(start)
+            self.bars.append({})
+            if self.span:
+                cut = bisect.bisect_left(self.starts, start - self.span)
+                if cut:
+                    del self.starts[:cut]
+                    del self.bars[:cut]
+        elif start < self.starts[-1]:
+            return
+        bar = self.bars[-1].get(column)
+        if bar is None:
+            self.bars[-1][column] = [o, h, l, c, count]
+        else:
+            bar[1] = max(bar[1], h)
+            bar[2] = min(bar[2], l)
+            bar[3] = c
+            bar[4] += count
+
+    def update(self, ts: float, values: dict):
+        """틱 하나 반영 (None인 컬럼은 건너뜀)"""
+        for col in self.columns:
+            v = values.get(col)
+            if v is not None:
+                self.add(ts, col, v, v, v, v)
+
+    def records(self):
+        """(봉 시작, 컬럼, (o, h, l, c), count) 순회"""
+        for start, bar in zip(self.starts, self.bars):
+            for col, (o, h, l, c, count) in bar.items():
+                yield start, col, (o, h, l, c), count
+
+    def rows(self, since: float = None) -> list:
+        """[봉 시작, 컬럼별 [o, h, l, c] 또는 None, ...] — since 이후 봉만"""
+        i = bisect.bisect_left(self.starts, bar_start(since, self.step)) if since is not None else 0
+        return [
+            [start, *(None if col not in bar else [round(x, TICK_COLUMNS.get(col, 4)) for x in bar[col][:4]]
+                      for col in self.columns)]
+            for start, bar in zip(self.starts[i:], self.bars[i:])
+        ]
+
+
+class TickStore:
+    """
+    SQLite(WAL) 기반 append-only 시세 이력
+
+    - 틱마다 한 행 추가 (스냅샷 값 + 출처 Provider + 소요 시간 메타데이터)
+    - ts(epoch 초) 인덱스로 기간 조회, 조회는 커서를 배치 단위로 읽어 메모리 사용 제한
+    """
+
+    def __init__(self, path: str = None):
+        self.path  = path or TICK_DB
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS ticks (
+                ts      REAL NOT NULL,
+                time    TEXT NOT NULL,
+                {", ".join(f"{col} REAL" for col in TICK_COLUMNS)},
+                sources TEXT,
+                latency TEXT,
+                errors  TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ticks_ts ON ticks(ts)")
+        has_bars = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bars'").fetchone()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bars (
+                series TEXT    NOT NULL,
+                res    INTEGER NOT NULL,
+                start  REAL    NOT NULL,
+                open   REAL, high REAL, low REAL, close REAL,
+                count  INTEGER NOT NULL,
+                PRIMARY KEY (series, res, start)
+            ) WITHOUT ROWID
+        """)
+        self._compacted_at = 0.0
+        if not has_bars:
+            self._backfill_bars()
+        self._drop_legacy_http_cache()
+
+    def _drop_legacy_http_cache(self):
+        """구버전은 응답 캐시를 틱 DB에 저장 — 별도 파일로 옮긴 뒤 남은 테이블을 지우고 파일 크기 회수 (1회)"""
+        if os.path.abspath(HTTP_CACHE_DB) == os.path.abspath(self.path):
+            return
+        legacy = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'http_cache'").fetchone()
+        if legacy:
+            self._conn.execute("DROP TABLE http_cache")
+            self._conn.execute("VACUUM")
+            print("  [Ticks] 틱 DB의 구버전 응답 캐시 테이블 삭제 → HTTP_CACHE_DB로 분리")
+
+    def append(self, now: datetime, values: dict, sources: dict = None,
+               latency: dict = None, errors: dict = None):
+        """
+        틱 한 행 추가 + 같은 트랜잭션에서 계열별 1분 · 1시간 · 1일 봉 갱신 (계열 × 해상도당 upsert 1회)
+        """
+        row = {
+            col: round(values[col], digits) if values.get(col) is not None else None
+            for col, digits in TICK_COLUMNS.items()
+        }
+        cols = ", ".join(row)
+        marks = ", ".join("?" for _ in row)
+        ts = now.timestamp()
+        bars = [
+            (col, res, bar_start(ts, res), row[col], row[col], row[col], row[col])
+            for col in BAR_SERIES if row[col] is not None
+            for res in BAR_RESOLUTIONS.values()
+        ]
+        with self._lock, self._transaction():
+            self._conn.execute(
+                f"INSERT INTO ticks (ts, time, {cols}, sources, latency, errors) "
+                f"VALUES (?, ?, {marks}, ?, ?, ?)",
+                (ts, now.isoformat(), *row.values(),
+                 json.dumps(sources or {}), json.dumps(latency or {}),
+                 json.dumps(errors or {}, ensure_ascii=False)),
+            )
+            self._conn.executemany(
+                "INSERT INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT (series, res, start) DO UPDATE SET "
+                "high = max(high, excluded.high), low = min(low, excluded.low), "
+                "close = excluded.close, count = count + 1",
+                bars,
+            )
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _backfill_bars(self):
+        """
+        봉 테이블이 없던 DB — 기존 틱 전체를 한 번 읽어 봉 생성 (이후에는 append가 갱신)
+        """
+        books = [OhlcBars(res, BAR_SERIES) for res in BAR_RESOLUTIONS.values()]
+        for r in self.iter_range(columns=BAR_SERIES):
+            for book in books:
+                book.update(r["ts"], r)
+        bars = [(col, book.step, start, *ohlc, count)
+                for book in books for start, col, ohlc, count in book.records()]
+        if not bars:
+            return
+        with self._lock, self._transaction():
+            self._conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)", bars)
+        print(f"  [Ticks] 기존 틱 → OHLC 봉 {len(bars):,}개 생성")
+
+    def compact(self, now: datetime = None, force: bool = False) -> tuple:
+        """
+        보존 기간 정리 — TICK_RETENTION_DAYS가 지난 원시 틱, MINUTE_BAR_RETENTION_DAYS가 지난 1분 봉 삭제
+        (봉은 append 시점에 이미 반영돼 있어 삭제만 하면 됨) → (삭제 틱 수, 삭제 1분 봉 수)
+        """
+        now = (now or datetime.now(KST)).timestamp()
+        if not force and now - self._compacted_at < COMPACT_INTERVAL_SEC:
+            return 0, 0
+        self._compacted_at = now
+        ticks = bars = 0
+        with self._lock:
+            if TICK_RETENTION_DAYS > 0:
+                ticks = self._conn.execute(
+                    "DELETE FROM ticks WHERE ts < ?", (now - TICK_RETENTION_DAYS * 86400,)).rowcount
+            if MINUTE_BAR_RETENTION_DAYS > 0:
+                bars = self._conn.execute(
+                    "DELETE FROM bars WHERE res = ? AND start < ?",
+                    (BAR_RESOLUTIONS["1m"], now - MINUTE_BAR_RETENTION_DAYS * 86400)).rowcount
+        if ticks or bars:
+            print(f"  [Ticks] 보존 기간 정리: 원시 틱 {ticks:,}건 · 1분 봉 {bars:,}개 삭제")
+        return ticks, bars
+
+    def iter_bars(self, res: int, start: datetime = None, end: datetime = None, columns: tuple = None):
+        """
+        [start, end) 구간의 res초 봉을 시간순으로 순회 — (봉 시작 epoch, 계열, (o, h, l, c))
+        """
+        columns = columns or BAR_SERIES
+        for col in columns:
+            if col not in BAR_SERIES:
+                raise ValueError(f"봉이 없는 컬럼: {col}")
+        lo = start.timestamp() if start else float("-inf")
+        hi = end.timestamp() if end else float("inf")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT start, series, open, high, low, close FROM bars "
+                f"WHERE res = ? AND start >= ? AND start < ? "
+                f"AND series IN ({', '.join('?' for _ in columns)}) ORDER BY start",
+                (res, lo, hi, *columns),
+            ).fetchall()
+        for start_ts, col, *ohlc in rows:
+            yield start_ts, col, tuple(ohlc)
+
+    def iter_history(self, start: datetime = None, columns: tuple = None):
+        """
+        start 이후 시간순 값 — 원시 틱이 정리된 앞쪽 구간은 봉 종가로 채움 (1분 → 1시간 → 1일 봉 순으로 있는 만큼)
+        봉 값의 ts는 봉 종료 시각 (더 고운 구간과 겹치는 봉은 제외), 원시 틱과 같은 모양의 dict ({"ts": ..., 컬럼: 값})
+        """
+        columns = tuple(columns or BAR_SERIES)
+        lo = start.timestamp() if start else float("-inf")
+        with self._lock:
+            edge  = self._conn.execute("SELECT MIN(ts) FROM ticks").fetchone()[0]
+            firsts = {res: self._conn.execute("SELECT MIN(start) FROM bars WHERE res = ?", (res,)).fetchone()[0]
+                      for res in BAR_RESOLUTIONS.values()}
+        edge = float("inf") if edge is None else edge
+
+        segments = []   # 최근 구간부터 — 각 해상도는 더 고운 쪽이 없는 앞 구간만 담당
+        for res in sorted(BAR_RESOLUTIONS.values()):
+            first = firsts[res]
+            if first is None or first >= edge or edge <= lo:
+                continue
+            rows = []
+            for bar_ts, col, ohlc in self.iter_bars(res, datetime.fromtimestamp(max(lo, first), KST),
+                                                    datetime.fromtimestamp(edge, KST), columns):
+                ts = bar_ts + res
+                if ts > edge:   # 더 고운 구간과 겹치는 마지막 봉
+                    break
+                if not rows or rows[-1]["ts"] != ts:
+                    rows.append({"ts": ts, **dict.fromkeys(columns)})
+                rows[-1][col] = ohlc[3]
+            segments.append(rows)
+            edge = first
+        for rows in reversed(segments):
+            yield from rows
+        yield from self.iter_range(start, columns=columns)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ticks").fetchone()[0]
+
+    def latest(self, require: tuple = ()) -> Optional[dict]:
+        """
+        require 컬럼이 모두 채워진 가장 최근 틱 (없으면 None)
+        """
+        where = " AND ".join(f"{self._column(col)} IS NOT NULL" for col in require) or "1"
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT * FROM ticks WHERE {where} ORDER BY ts DESC LIMIT 1"
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def iter_range(self, start: datetime = None, end: datetime = None,
+                   columns: tuple = None, batch: int = 1000):
+        """
+        [start, end) 구간의 틱을 시간순으로 순회 (batch 행씩 읽음)
+        """
+        cols = ", ".join(["ts", "time", *(self._column(c) for c in columns)]) if columns else "*"
+        lo   = start.timestamp() if start else float("-inf")
+        hi   = end.timestamp() if end else float("inf")
+        last = None
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT rowid AS _rowid, {cols} FROM ticks "
+                    f"WHERE ts >= ? AND ts < ? AND (? IS NULL OR (ts, rowid) > (?, ?)) "
+                    f"ORDER BY ts, rowid LIMIT ?",
+                    (lo, hi, last and last[0], last and last[0], last and last[1], batch),
+                ).fetchall()
+            for row in rows:
+                yield self._to_dict(row)
+            if len(rows) < batch:
+                return
+            last = (rows[-1]["ts"], rows[-1]["_rowid"])
+
+    def checkpoint(self):
+        """WAL 내용을 본 파일에 반영 (파일 복사 · 실행 간 캐시 보관 전)"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _column(col: str) -> str:
+        if col not in TICK_COLUMNS:
+            raise ValueError(f"알 수 없는 컬럼: {col}")
+        return col
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        d = dict(row)
+        d.pop("_rowid", None)
+        for key in ("sources", "latency", "errors"):
+            if isinstance(d.get(key), str):
+                d[key] = json.loads(d[key])
+        return d
+
+
+_tick_store = None
+_tick_store_lock = threading.Lock()
+
+
+def get_tick_store() -> TickStore:
+    """
+    프로세스 공용 TickStore (최초 호출 시 생성)
+    """
+    global _tick_store
+    with _tick_store_lock:
+        if _tick_store is None:
+            _tick_store = TickStore()
+        return _tick_store
+
+
+def tick_values(snapshot, usdt_kimp, gold_kimp) -> dict:
+    """스냅샷 + 계산된 김프 → 틱 컬럼 값"""
+    return {
+        "usdt_kimp":        usdt_kimp,
+        "gold_kimp":        gold_kimp,
+        "usd_krw":          snapshot.usd_krw,
+        "upbit_usdt":       snapshot.upbit_usdt,
+        "intl_gold_usd_oz": snapshot.intl_gold_usd_oz,
+        "krx_gold_krw_g":   snapshot.krx_gold_krw_g,
+    }
+
+
+def record_tick(snapshot, usdt_kimp, gold_kimp, store: TickStore = None):
+    """
+    스냅샷 + 계산된 김프를 틱 저장소에 추가
+    """
+    store = store or get_tick_store()
+    store.append(
+        snapshot.time, tick_values(snapshot, usdt_kimp, gold_kimp),
+        sources=snapshot.sources,
+        latency=snapshot.latency,
+        errors={k: str(e) for k, e in snapshot.errors.items()},
+    )
+    store.compact(snapshot.time)
+
+
+def migrate_history(state: dict, store: TickStore = None):
+    """
+    구버전 state.json의 history 목록을 틱 저장소로 옮기고 state에서 제거
+    (저장소가 비어 있을 때만 — 중복 이관 방지)
+    """
+    history = state.pop("history", None)
+    if not history:
+        return
+    store = store or get_tick_store()
+    if store.count() > 0:
+        return
+    for entry in history:
+        store.append(datetime.fromisoformat(entry["time"]), entry,
+                     sources={"_migrated": "state.json"})
+    print(f"  [Ticks] state.json 이력 {len(history)}건 → {os.path.basename(store.path)} 이관")
+
 
 # ═══════════════════════════════════════════════════════
 #  상태 관리
 # ═══════════════════════════════════════════════════════
 
+class StateBackend:
+    """
+    알림 상태 저장소 인터페이스 — load() / save(state)
+    """
+    name = "base"
+
+    def load(self) -> Optional[dict]:
+        """저장된 상태 (없으면 None)"""
+        raise NotImplementedError
+
+    def save(self, state: dict):
+        raise NotImplementedError
+
+
+class FileStateBackend(StateBackend):
+    """
+    로컬 JSON 파일 — 임시 파일에 쓴 뒤 rename (중간에 죽어도 파일이 깨지지 않음)
+
+    이상 변동 통계(state["stats"])는 STATS_FILE에도 매번 저장하고, 로드 시 지표별로
+    더 최근에 갱신된 쪽을 사용합니다 (커밋되지 않은 실행의 표본도 이어서 반영).
+    """
+    name = "file"
+
+    def __init__(self, path: str = None, stats_path: str = None):
+        self.path       = path or STATE_FILE
+        self.stats_path = stats_path or STATS_FILE
+
+    def load(self) -> Optional[dict]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        try:
+            with open(self.stats_path, "r", encoding="utf-8") as f:
+                sidecar = json.load(f)
+        except (OSError, ValueError):
+            return state
+        stats = state.setdefault("stats", {})
+        for metric, entry in sidecar.items():
+            current = stats.get(metric)
+            if current is None or (entry["ewma"].get("last_ts") or 0) >= (current["ewma"].get("last_ts") or 0):
+                stats[metric] = entry
+        return state
+
+    def save(self, state: dict):
+        self._write_json(self.path, state)
+        if state.get("stats"):
+            self._write_json(self.stats_path, state["stats"])
+        print("  [State] 파일 저장 완료")
+
+    @staticmethod
+    def _write_json(path: str, data):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(prefix=".state-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class GitStateBackend(FileStateBackend):
+    """
+    파일 저장 + 디바운스된 git commit/push
+
+    알림 상태(last_alert)가 바뀌었거나 마지막 커밋 후 GIT_COMMIT_INTERVAL_MIN분이
+    지났을 때만 커밋합니다. 마지막 커밋 정보는 state["git_commit"]에 기록됩니다.
+    커밋 대상은 state.json뿐 — ticks.db(바이너리, 커밋마다 전체 사본이 이력에 쌓임)는
+    워크플로의 Actions 캐시로 실행 간 유지합니다.
+    """
+    name = "git"
+
+    def __init__(self, path: str = None, interval_min: float = None):
+        super().__init__(path)
+        self.interval_min = interval_min if interval_min is not None else GIT_COMMIT_INTERVAL_MIN
+        self.repo_dir     = os.path.dirname(os.path.abspath(self.path))
+
+    def save(self, state: dict):
+        now    = datetime.now(KST)
+        digest = hashlib.sha1(
+            json.dumps(state.get("last_alert", {}), sort_keys=True).encode()
+        ).hexdigest()
+        marker = state.get("git_commit") or {}
+
+        reason = None
+        if marker.get("alert_digest") != digest:
+            reason = "알림 상태 변경"
+        else:
+            try:
+                age_min = (now - datetime.fromisoformat(marker["time"])).total_seconds() / 60
+            except (KeyError, ValueError):
+                age_min = float("inf")
+            if age_min >= self.interval_min:
+                reason = f"{self.interval_min:g}분 주기"
+
+        if reason is None:
+            super().save(state)
+            print(f"  [State] 커밋 생략 (알림 상태 동일, 주기 {self.interval_min:g}분 미도달)")
+            return
+
+        state["git_commit"] = {"time": now.isoformat(), "alert_digest": digest}
+        super().save(state)
+
+        self._git("add", self.path)
+        if self._git("diff", "--cached", "--quiet", check=False).returncode == 0:
+            print("  [State] 변경사항 없음 — push 생략")
+            return
+        self._git("-c", "user.name=kimp-bot", "-c", "user.email=bot@kimp-monitor",
+                  "commit", "-m", "update state [skip ci]")
+        self._git("push")
+        print(f"  [State] git push 완료 ({reason})")
+
+    def _git(self, *args, check: bool = True) -> subprocess.CompletedProcess:
+        return subprocess.run(["git", *args], cwd=self.repo_dir,
+                              capture_output=True, text=True, check=check)
+
+
+class MemoryStateBackend(StateBackend):
+    """
+    메모리 보관 (데몬 모드용) — 디스크/네트워크 I/O 없음
+    seed가 있으면 최초 load 시 그 저장소에서 읽어옵니다.
+    """
+    name = "memory"
+
+    def __init__(self, seed: StateBackend = None):
+        self.seed   = seed
+        self._state = None
+
+    def load(self) -> Optional[dict]:
+        if self._state is None and self.seed is not None:
+            self._state = self.seed.load()
+        return copy.deepcopy(self._state)
+
+    def save(self, state: dict):
+        self._state = copy.deepcopy(state)
+
+
+STATE_BACKENDS = {
+    "file":   lambda: FileStateBackend(),
+    "git":    lambda: GitStateBackend(),
+    "memory": lambda: MemoryStateBackend(seed=FileStateBackend()),
+}
+
+_state_backend = None
+
+
+def get_state_backend() -> StateBackend:
+    global _state_backend
+    if _state_backend is None:
+        configure_state_backend(STATE_BACKEND)
+    return _state_backend
+
+
+def configure_state_backend(name: str) -> StateBackend:
+    """
+    STATE_BACKENDS 중 하나를 선택 (file / git / memory)
+    """
+    global _state_backend
+    if name not in STATE_BACKENDS:
+        raise ValueError(f"알 수 없는 STATE_BACKEND: {name!r} (가능: {', '.join(STATE_BACKENDS)})")
+    _state_backend = STATE_BACKENDS[name]()
+    return _state_backend
+
+
 def load_state() -> dict:
+    backend = get_state_backend()
     try:
-        if os.path.exists(STATE_FILE):
-            with open(STATE_FILE, "r", encoding="utf-8") as f:
-                state = json.load(f)
-            history_count = len(state.get("history", []))
-            alert_keys    = list(state.get("last_alert", {}).keys())
-            print(f"  [State] 로드 성공: 이력 {history_count}건, 알림상태 {alert_keys}")
+        state = backend.load()
+        if state is not None:
+            migrate_history(state)
+            tick_count = get_tick_store().count()
+            alert_keys = list(state.get("last_alert", {}).keys())
+            print(f"  [State] 로드 성공 ({backend.name}): 이력 {tick_count}건, 알림상태 {alert_keys}")
             return state
     except Exception as e:
         print(f"  [State] 로드 실패: {e}")
     print("  [State] 신규 생성")
-    return {"history": [], "last_alert": {}}
+    return {"last_alert": {}}
 
 
 def save_state(state: dict):
     try:
-        with open(STATE_FILE, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2, ensure_ascii=False)
-        print("  [State] 파일 저장 완료")
-
-        os.system("git config user.name 'kimp-bot'")
-        os.system("git config user.email 'bot@kimp-monitor'")
-        os.system(f"git add {STATE_FILE}")
-
-        result = os.popen("git diff --cached --quiet; echo $?").read().strip()
-        if result == "1":
-            os.system('git commit -m "update state [skip ci]"')
-            os.system("git push")
-            print("  [State] git push 완료")
-        else:
-            print("  [State] 변경사항 없음 — push 생략")
+        get_state_backend().save(state)
     except Exception as e:
         print(f"  [State] 저장 실패: {e}")
 
 
-def add_history(state: dict, usdt_kimp, gold_kimp, now: datetime,
-                usd_krw=None, intl_gold_usd_oz=None, krx_gold_krw_g=None):
-    entry = {
-        "time":            now.isoformat(),
-        "usdt_kimp":       round(usdt_kimp, 4) if usdt_kimp is not None else None,
-        "gold_kimp":       round(gold_kimp, 4) if gold_kimp is not None else None,
-        "usd_krw":         round(usd_krw, 2) if usd_krw is not None else None,
-        "intl_gold_usd_oz": round(intl_gold_usd_oz, 2) if intl_gold_usd_oz is not None else None,
-        "krx_gold_krw_g":  round(krx_gold_krw_g, 0) if krx_gold_krw_g is not None else None,
-    }
-    state.setdefault("history", []).append(entry)
-    if len(state["history"]) > MAX_HISTORY:
-        state["history"] = state["history"][-MAX_HISTORY:]
-
-
 # ── 테더 김프용: 기존 방향성 알림 (변경 없음) ──────────
 
-def should_alert(state: dict, key: str, current_value: float, now: datetime) -> tuple:
+def should_alert(state: dict, key: str, current_value: float, now: datetime,
+                 log: bool = True) -> tuple:
     """
     테더 김프 전용 — 방향성 기반 알림 판단 (기존 로직 유지)
+    log=False: 필터 로그 생략 (체결마다 호출되는 스트리밍 경로용)
     """
     last_alert = state.get("last_alert", {})
     prev = last_alert.get(key)
@@ -116,14 +860,16 @@ def should_alert(state: dict, key: str, current_value: float, now: datetime) ->
         if current_value < prev_value:
             return True, f"악화 ({prev_value:+.2f}% → {current_value:+.2f}%, {diff:+.2f}%p)"
         else:
-            print(f"  [Filter] {key}: 이전 {prev_value:+.2f}% → 현재 {current_value:+.2f}% (개선 방향) — 알림 생략")
+            if log:
+                print(f"  [Filter] {key}: 이전 {prev_value:+.2f}% → 현재 {current_value:+.2f}% (개선 방향) — 알림 생략")
             return False, ""
 
     if key.endswith("_high"):
         if current_value > prev_value:
             return True, f"악화 ({prev_value:+.2f}% → {current_value:+.2f}%, {diff:+.2f}%p)"
         else:
-            print(f"  [Filter] {key}: 이전 {prev_value:+.2f}% → 현재 {current_value:+.2f}% (개선 방향) — 알림 생략")
+            if log:
+                print(f"  [Filter] {key}: 이전 {prev_value:+.2f}% → 현재 {current_value:+.2f}% (개선 방향) — 알림 생략")
             return False, ""
 
     return True, "알림"
@@ -131,9 +877,10 @@ def should_alert(state: dict, key: str, current_value: float, now: datetime) ->
 
 # ── 금 김프용: 단계별 알림 ──────────────────────────────
 
-def _get_gold_step_level(kimp_value: float, direction: str) -> int:
+def _get_gold_step_level(kimp_value: float, direction: str, low: float = None,
+                         high: float = None, step: float = None) -> int:
     """
-    김프 값이 어느 '단계'에 있는지 계산
+    김프 값이 어느 '단계'에 있는지 계산 (low/high/step 기본: GOLD_KIMP_LOW/HIGH/STEP)
     
     direction="low" (하락 알림):
       0% 이하 진입 = level 0
@@ -145,23 +892,27 @@ def _get_gold_step_level(kimp_value: float, direction: str) -> int:
       +1% 추가     = level 1
       +2% 추가     = level 2  ...
     """
+    low  = GOLD_KIMP_LOW  if low  is None else low
+    high = GOLD_KIMP_HIGH if high is None else high
+    step = step or GOLD_KIMP_STEP
     if direction == "low":
-        # GOLD_KIMP_LOW(예: 0%) 기준으로 아래로 얼마나 벗어났는지
-        if kimp_value > GOLD_KIMP_LOW:
+        # low(예: 0%) 기준으로 아래로 얼마나 벗어났는지
+        if kimp_value > low:
             return -1  # 아직 기준 미달 (알림 대상 아님)
-        distance = GOLD_KIMP_LOW - kimp_value  # 양수
-        return int(distance / GOLD_KIMP_STEP)  # 0, 1, 2, 3...
+        distance = low - kimp_value  # 양수
+        return int(distance / step)  # 0, 1, 2, 3...
     else:  # high
-        if kimp_value < GOLD_KIMP_HIGH:
+        if kimp_value < high:
             return -1
-        distance = kimp_value - GOLD_KIMP_HIGH
-        return int(distance / GOLD_KIMP_STEP)
+        distance = kimp_value - high
+        return int(distance / step)
 
 
 def should_alert_gold_step(state: dict, key: str, current_value: float,
-                           direction: str, now: datetime) -> tuple:
+                           direction: str, now: datetime, log: bool = True,
+                           low: float = None, high: float = None, step: float = None) -> tuple:
     """
-    금 김프 단계별 알림 판단
+    금 김프 단계별 알림 판단 (low/high/step: 구독자별 기준, 기본은 전역 설정)
     
     알림 발생 조건:
     1) 첫 진입 (이전 상태 없음)
@@ -171,7 +922,10 @@ def should_alert_gold_step(state: dict, key: str, current_value: float,
     - 같은 단계 내에서 소폭 변동
     - 개선 방향 (level이 낮아짐)
     """
-    current_level = _get_gold_step_level(current_value, direction)
+    low  = GOLD_KIMP_LOW  if low  is None else low
+    high = GOLD_KIMP_HIGH if high is None else high
+    step = step or GOLD_KIMP_STEP
+    current_level = _get_gold_step_level(current_value, direction, low, high, step)
     
     if current_level < 0:
         # 기준 미달 — 알림 대상 아님
@@ -182,7 +936,7 @@ def should_alert_gold_step(state: dict, key: str, current_value: float,
     
     if prev is None:
         # 첫 진입
-        threshold = GOLD_KIMP_LOW if direction == "low" else GOLD_KIMP_HIGH
+        threshold = low if direction == "low" else high
         reason = f"첫 알림 (기준 {threshold}% 돌파, Level {current_level})"
         return True, reason, current_level
     
@@ -191,14 +945,14 @@ def should_alert_gold_step(state: dict, key: str, current_value: float,
     if current_level > prev_level:
         # 새 단계 진입 (악화)
         if direction == "low":
-            step_threshold = GOLD_KIMP_LOW - (current_level * GOLD_KIMP_STEP)
+            step_threshold = low - (current_level * step)
             reason = (
                 f"Level {prev_level}→{current_level} "
                 f"({step_threshold:+.0f}% 선 돌파, "
                 f"이전 {prev['value']:+.2f}% → 현재 {current_value:+.2f}%)"
             )
         else:
-            step_threshold = GOLD_KIMP_HIGH + (current_level * GOLD_KIMP_STEP)
+            step_threshold = high + (current_level * step)
             reason = (
                 f"Level {prev_level}→{current_level} "
                 f"({step_threshold:+.0f}% 선 돌파, "
@@ -207,9 +961,9 @@ def should_alert_gold_step(state: dict, key: str, current_value: float,
         return True, reason, current_level
     
     # 같은 단계이거나 개선 방향
-    if current_level < prev_level:
+    if log and current_level < prev_level:
         print(f"  [Filter] {key}: Level {prev_level}→{current_level} (개선 방향) — 알림 생략")
-    else:
+    elif log:
         print(f"  [Filter] {key}: Level {current_level} 유지 "
               f"({prev['value']:+.2f}%→{current_value:+.2f}%) — 알림 생략")
     return False, "", current_level
@@ -231,62 +985,433 @@ def update_alert_state(state: dict, key: str, value: float, now: datetime,
     state.setdefault("last_alert", {})[key] = entry
 
 
+# ═══════════════════════════════════════════════════════
+#  이상 변동 감지 (온라인 통계)
+# ═══════════════════════════════════════════════════════
+
+class EwmaStats:
+    """
+    시간 가중 EWMA 평균/분산 — 틱마다 O(1)
+
+    가중치는 직전 관측 이후 경과 시간 기준 (반감기 STATS_HALFLIFE_MIN분)이라
+    폴링 간격이 바뀌어도(크론 15분 ↔ 데몬 수 초) 같은 시간 척도를 유지합니다.
+    """
+
+    def __init__(self, mean: float = None, var: float = 0.0, count: int = 0,
+                 last_ts: float = None, last_value: float = None):
+        self.mean       = mean
+        self.var        = var
+        self.count      = count
+        self.last_ts    = last_ts
+        self.last_value = last_value
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(max(self.var, 0.0))
+
+    def zscore(self, x: float, min_std: float = 0.0) -> Optional[float]:
+        if self.mean is None:
+            return None
+        return (x - self.mean) / max(self.std, min_std, 1e-12)
+
+    def update(self, x: float, ts: float, halflife_sec: float):
+        if self.mean is None:
+            self.mean = x
+        else:
+            dt    = max(ts - self.last_ts, 0.0) if self.last_ts is not None else halflife_sec
+            alpha = 1.0 - math.exp(-math.log(2) * dt / halflife_sec)
+            diff  = x - self.mean
+            incr  = alpha * diff
+            self.mean += incr
+            self.var   = (1.0 - alpha) * (self.var + diff * incr)
+        self.count     += 1
+        self.last_ts    = ts
+        self.last_value = x
+
+    def to_dict(self) -> dict:
+        return {"mean": self.mean, "var": self.var, "count": self.count,
+                "last_ts": self.last_ts, "last_value": self.last_value}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "EwmaStats":
+        return cls(**d)
+
+
+class P2Quantile:
+    """
+    P² 스트리밍 분위수 추정 (Jain & Chlamtac) — 마커 5개, 틱마다 O(1)
+    """
+
+    def __init__(self, p: float, q: list = None, n: list = None, np_: list = None):
+        self.p   = p
+        self.q   = q or []     # 마커 높이 (초기 5개 관측 전에는 정렬된 표본)
+        self.n   = n or [0, 1, 2, 3, 4]
+        self.np_ = np_ or [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.dn  = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def update(self, x: float):
+        q, n = self.q, self.n
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(1, 5) if x < q[i]) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np_[i] += self.dn[i]
+
+        for i in (1, 2, 3):
+            d = self.np_[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d  = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i]  = qp
+                n[i] += d
+
+    def value(self) -> Optional[float]:
+        if not self.q:
+            return None
+        if len(self.q) < 5:
+            return self.q[min(len(self.q) - 1, int(round(self.p * (len(self.q) - 1))))]
+        return self.q[2]
+
+    def to_dict(self) -> dict:
+        return {"p": self.p, "q": self.q, "n": self.n, "np": self.np_}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "P2Quantile":
+        return cls(d["p"], list(d["q"]), list(d["n"]), list(d["np"]))
+
+
+class OnlineStats:
+    """
+    지표 하나(usdt_kimp / gold_kimp)의 EWMA + 분위수 스케치 — state["stats"]에 직렬화
+    """
+
+    def __init__(self, ewma: EwmaStats = None, quantiles: dict = None):
+        self.ewma      = ewma or EwmaStats()
+        self.quantiles = quantiles or {p: P2Quantile(p) for p in STATS_QUANTILES}
+
+    def update(self, x: float, ts: float) -> Optional[float]:
+        """
+        관측 반영 후 갱신 전 분포 기준 z-score 반환 (표본 부족 / 동일값 반복이면 None)
+
+        동일값 반복(주말 · 휴장 중 고정 종가)은 분산을 0으로 수렴시켜
+        재개 후 첫 변동을 항상 이상치로 만들므로 반영하지 않습니다.
+        """
+        if self.ewma.last_value is not None and x == self.ewma.last_value:
+            return None
+        z = self.ewma.zscore(x, min_std=ANOMALY_MIN_STD_PP)
+        ready = self.ewma.count >= ANOMALY_MIN_SAMPLES
+        self.ewma.update(x, ts, STATS_HALFLIFE_MIN * 60)
+        for sketch in self.quantiles.values():
+            sketch.update(x)
+        return z if ready else None
+
+    def to_dict(self) -> dict:
+        return {"ewma": self.ewma.to_dict(),
+                "quantiles": [sk.to_dict() for sk in self.quantiles.values()]}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "OnlineStats":
+        sketches = [P2Quantile.from_dict(x) for x in d.get("quantiles", [])]
+        return cls(EwmaStats.from_dict(d["ewma"]), {sk.p: sk for sk in sketches} or None)
+
+
+ANOMALY_METRICS = {"usdt_kimp": "테더 김프", "gold_kimp": "금 김프"}   # 지표 → 알림 표시명
+
+
+def update_anomaly_stats(state: dict, metric: str, value: float, now: datetime) -> dict:
+    """
+    지표의 EWMA · 분위수 통계를 갱신하고 이상 변동 규칙(<usdt|gold>_anomaly)이 쓰는 틱 값을 반환
+
+    Returns:
+        {<metric>_z, <metric>_z_abs, <metric>_ewma, <metric>_ewma_std, <metric>_dist}
+        — 표본이 ANOMALY_MIN_SAMPLES 미만이면 {} (규칙 평가 생략)
+    """
+    raw   = state.get("stats", {}).get(metric)
+    stats = OnlineStats.from_dict(raw) if raw else OnlineStats()
+    mean, std = stats.ewma.mean, stats.ewma.std     # 이번 값 반영 전 기준
+    z = stats.update(value, now.timestamp())
+    state.setdefault("stats", {})[metric] = stats.to_dict()
+    if z is None:
+        return {}
+    q = {p: sk.value() for p, sk in stats.quantiles.items()}
+    return {
+        f"{metric}_z":        z,
+        f"{metric}_z_abs":    abs(z),
+        f"{metric}_ewma":     mean,
+        f"{metric}_ewma_std": std,
+        f"{metric}_dist":     " / ".join(f"p{int(p * 100)} {v:+.2f}%" for p, v in q.items() if v is not None),
+    }
+
+
 # ═══════════════════════════════════════════════════════
 #  금 김프 변동 원인 분석
 # ═══════════════════════════════════════════════════════
 
+# (키, 표시명, 틱 컬럼, ln(1 + 김프) 에 대한 부호)
+GOLD_DRIVER_FACTORS = (
+    ("fx",   "환율",   "usd_krw",          -1),
+    ("intl", "국제금", "intl_gold_usd_oz", -1),
+    ("krx",  "국내금", "krx_gold_krw_g",   +1),
+)
+GOLD_DRIVER_COLUMNS = tuple(col for _, _, col, _ in GOLD_DRIVER_FACTORS)
+
+
+@dataclass
+class GoldAttribution:
+    """
+    두 시점 사이 금 김프 변동의 요인별 분해
+
+    1 + 김프/100 = 국내금 × 31.1035 / (국제금 × 환율) 이므로
+    Δln(1 + 김프/100) = Δln 국내금 − Δln 국제금 − Δln 환율 (근사 없이 정확히 성립)
+    %p 기여도는 로그 기여도에 공통 배율 Δ김프 / Δln(1 + 김프/100)을 곱해 합이 Δ김프와 일치합니다.
+    """
+    start_ts: float
+    end_ts: float
+    start: dict         # 틱 컬럼 → 시작 값
+    end: dict           # 틱 컬럼 → 끝 값
+    log_returns: dict   # 요인 키 → ln(끝 / 시작)
+
+    @property
+    def kimp_start(self) -> float:
+        return calc_gold_kimp(*(self.start[c] for c in ("krx_gold_krw_g", "intl_gold_usd_oz", "usd_krw")))[0]
+
+    @property
+    def kimp_end(self) -> float:
+        return calc_gold_kimp(*(self.end[c] for c in ("krx_gold_krw_g", "intl_gold_usd_oz", "usd_krw")))[0]
+
+    @property
+    def kimp_change(self) -> float:
+        return self.kimp_end - self.kimp_start
+
+    @property
+    def contributions(self) -> dict:
+        """요인 키 → 김프 기여도(%p), 합계 = kimp_change"""
+        x = sum(sign * self.log_returns[key] for key, _, _, sign in GOLD_DRIVER_FACTORS)
+        scale = (100 + self.kimp_start) * (math.expm1(x) / x if abs(x) > 1e-12 else 1.0)
+        return {key: scale * sign * self.log_returns[key] for key, _, _, sign in GOLD_DRIVER_FACTORS}
+
+    def to_dict(self) -> dict:
+        return {
+            "start":         datetime.fromtimestamp(self.start_ts, KST).isoformat(),
+            "end":           datetime.fromtimestamp(self.end_ts, KST).isoformat(),
+            "kimp_start":    round(self.kimp_start, 4),
+            "kimp_end":      round(self.kimp_end, 4),
+            "kimp_change":   round(self.kimp_change, 4),
+            "log_returns":   {k: round(v, 6) for k, v in self.log_returns.items()},
+            "contributions": {k: round(v, 4) for k, v in self.contributions.items()},
+        }
+
+
+def attribute_gold_kimp(start: dict, end: dict, start_ts: float = None,
+                        end_ts: float = None) -> GoldAttribution:
+    """
+    두 시점(틱 컬럼 dict)의 금 김프 변동 분해 — 틱 하나 단위의 증분 계산
+    """
+    return GoldAttribution(
+        start_ts, end_ts,
+        {col: start[col] for col in GOLD_DRIVER_COLUMNS},
+        {col: end[col] for col in GOLD_DRIVER_COLUMNS},
+        {key: math.log(end[col] / start[col]) for key, _, col, _ in GOLD_DRIVER_FACTORS},
+    )
+
+
+def parse_horizon(spec: str) -> float:
+    """
+    "30m" · "1h" · "24h" · "7d" → 초
+    """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    spec  = spec.strip().lower()
+    if spec[-1:] in units:
+        return float(spec[:-1]) * units[spec[-1]]
+    return float(spec)
+
+
+class GoldAttributionSeries:
+    """
+    요인별 누적 로그 수익률 시계열 — 틱 저장소에서 한 번 적재한 뒤 틱마다 O(1) 추가
+
+    누적 로그 수익률은 ln(가격)이므로 임의 구간 분해는 두 지점의 차로 끝나고,
+    rolling()은 모든 틱에 대해 horizon 전 대비 분해를 벡터 연산으로 계산합니다.
+    세 값이 모두 있는 틱만 사용 (보존 기간이 지나 정리된 구간은 봉 종가)
+    """
+
+    def __init__(self, capacity: int = 1024):
+        np = _numpy()
+        self.ts   = np.empty(capacity)
+        self.logs = np.empty((capacity, len(GOLD_DRIVER_FACTORS)))
+        self.size = 0
+        self.signs = np.array([sign for _, _, _, sign in GOLD_DRIVER_FACTORS], dtype=float)
+
+    @classmethod
+    def from_store(cls, store: TickStore = None, days: float = None) -> "GoldAttributionSeries":
+        days  = ATTRIBUTION_HISTORY_DAYS if days is None else days
+        start = datetime.now(KST) - timedelta(days=days)
+        rows  = [
+            (r["ts"], *(r[c] for c in GOLD_DRIVER_COLUMNS))
+            for r in (store or get_tick_store()).iter_history(start, columns=GOLD_DRIVER_COLUMNS)
+            if all(r[c] for c in GOLD_DRIVER_COLUMNS)
+        ]
+        np = _numpy()
+        series = cls(max(1024, 2 * len(rows)))
+        if rows:
+            data = np.array(rows, dtype=float)
+            series.size = len(rows)
+            series.ts[:series.size]   = data[:, 0]
+            series.logs[:series.size] = np.log(data[:, 1:])
+        return series
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, ts: float, values: dict) -> Optional[GoldAttribution]:
+        """
+        틱 추가 — 직전 틱 대비 분해를 반환 (값 누락 · 이미 적재된 시점이면 None)
+        """
+        if not all(values.get(c) for c in GOLD_DRIVER_COLUMNS):
+            return None
+        if self.size and ts <= self.ts[self.size - 1]:
+            return None
+        np = _numpy()
+        if self.size == len(self.ts):
+            self.ts   = np.concatenate([self.ts, np.empty_like(self.ts)])
+            self.logs = np.concatenate([self.logs, np.empty_like(self.logs)])
+        self.ts[self.size]   = ts
+        self.logs[self.size] = [math.log(values[c]) for c in GOLD_DRIVER_COLUMNS]
+        self.size += 1
+        return self._between(self.size - 2, self.size - 1) if self.size > 1 else None
+
+    def window(self, horizon_sec: float, end_ts: float = None) -> Optional[GoldAttribution]:
+        """
+        [end_ts − horizon, end_ts] 구간의 첫 틱 → 마지막 틱 분해 (end_ts 기본: 최신 틱)
+        """
+        np = _numpy()
+        ts = self.ts[:self.size]
+        if not self.size:
+            return None
+        end_ts = ts[-1] if end_ts is None else end_ts
+        j = int(np.searchsorted(ts, end_ts, side="right")) - 1
+        i = int(np.searchsorted(ts, end_ts - horizon_sec, side="left"))
+        return self._between(i, j) if 0 <= i < j else None
+
+    def rolling(self, horizon_sec: float) -> dict:
+        """
+        모든 틱 t에 대해 [t − horizon, t] 분해 — {"ts", "kimp_change", 요인 키...} 배열
+        (구간 안에 이전 틱이 없는 지점은 NaN)
+        """
+        np   = _numpy()
+        ts   = self.ts[:self.size]
+        logs = self.logs[:self.size]
+        start = np.searchsorted(ts, ts - horizon_sec, side="left")
+        valid = start < np.arange(self.size)
+        delta = logs - logs[start]
+        x     = delta @ self.signs
+        ratio0 = np.exp(logs[start] @ self.signs) * TROY_OUNCE_TO_GRAM   # 1 + 김프/100
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scale = 100 * ratio0 * np.where(np.abs(x) > 1e-12, np.expm1(x) / x, 1.0)
+        out = {"ts": ts.copy(), "kimp_change": np.where(valid, 100 * ratio0 * np.expm1(x), np.nan)}
+        for k, (key, _, _, sign) in enumerate(GOLD_DRIVER_FACTORS):
+            out[key] = np.where(valid, scale * sign * delta[:, k], np.nan)
+        return out
+
+    def _between(self, i: int, j: int) -> GoldAttribution:
+        start = dict(zip(GOLD_DRIVER_COLUMNS, map(math.exp, self.logs[i])))
+        end   = dict(zip(GOLD_DRIVER_COLUMNS, map(math.exp, self.logs[j])))
+        return GoldAttribution(
+            float(self.ts[i]), float(self.ts[j]), start, end,
+            {key: float(self.logs[j, k] - self.logs[i, k])
+             for k, (key, _, _, _) in enumerate(GOLD_DRIVER_FACTORS)},
+        )
+
+
+_gold_series = None
+_gold_series_lock = threading.Lock()
+
+
+def get_gold_attribution_series() -> GoldAttributionSeries:
+    """
+    프로세스 공용 누적 시계열 (최초 호출 시 틱 저장소에서 ATTRIBUTION_HISTORY_DAYS 적재)
+    """
+    global _gold_series
+    with _gold_series_lock:
+        if _gold_series is None:
+            _gold_series = GoldAttributionSeries.from_store()
+        return _gold_series
+
+
+def format_gold_attribution(attr: GoldAttribution, label: str = "") -> str:
+    """
+    "24h  김프 -0.42%p = 환율 -0.30 · 국제금 -0.51 · 국내금 +0.39"
+    """
+    contrib = attr.contributions
+    parts = " · ".join(f"{name} {contrib[key]:+.2f}" for key, name, _, _ in GOLD_DRIVER_FACTORS)
+    return f"{label:<5} 김프 {attr.kimp_start:+.2f}% → {attr.kimp_end:+.2f}% " \
+           f"({attr.kimp_change:+.2f}%p = {parts})"
+
+
 def analyze_gold_kimp_driver(
     state: dict,
     current_usd_krw: float,
     current_intl_gold_oz: float,
     current_krx_gold_g: float,
+    store: TickStore = None,
 ) -> str:
     """
     금 김프 변동의 주요 원인을 분석합니다.
     
-    이전 상태(state.history 또는 last_alert)와 비교하여
-    환율 / 국제금값 / 국내금값 각각의 변동률을 계산하고
+    이전 상태(last_alert 또는 틱 저장소의 직전 틱)와 비교하여
+    환율 / 국제금값 / 국내금값 각각이 김프를 몇 %p 움직였는지 분해하고 (GoldAttribution)
     어느 요인이 김프 변동을 주도했는지 판별합니다.
     
     Returns:
-        원인 분석 문자열 (예: "📌 주요인: 환율 상승 (+0.8%)")
+        원인 분석 문자열 (예: "💡 주요인: 환율 상승 → 국제금(원화) 비싸짐 → 김프 하락")
     """
-    # 이전 데이터 찾기: last_alert → history 순으로 탐색
-    prev_fx = None
-    prev_intl_gold = None
-    prev_krx_gold = None
+    # 이전 데이터 찾기: last_alert → 틱 저장소 순으로 탐색
+    prev = None
     prev_time = None
     
     # 1) last_alert에서 금 관련 이전 데이터 확인
     last_alert = state.get("last_alert", {})
     for key in ["gold_low", "gold_high"]:
-        if key in last_alert and "usd_krw" in last_alert[key]:
-            prev_fx = last_alert[key].get("usd_krw")
-            prev_intl_gold = last_alert[key].get("intl_gold_usd_oz")
-            prev_krx_gold = last_alert[key].get("krx_gold_krw_g")
-            prev_time = last_alert[key].get("time", "")
+        entry = last_alert.get(key, {})
+        if all(entry.get(col) for col in GOLD_DRIVER_COLUMNS):
+            prev = entry
+            prev_time = entry.get("time", "")
             break
     
-    # 2) last_alert에 없으면 history에서 마지막 유효 데이터
-    if prev_fx is None:
-        for entry in reversed(state.get("history", [])):
-            if entry.get("usd_krw") is not None and entry.get("intl_gold_usd_oz") is not None:
-                prev_fx = entry["usd_krw"]
-                prev_intl_gold = entry.get("intl_gold_usd_oz")
-                prev_krx_gold = entry.get("krx_gold_krw_g")
-                prev_time = entry.get("time", "")
-                break
+    # 2) last_alert에 없으면 틱 저장소의 마지막 유효 데이터
+    if prev is None:
+        entry = (store or get_tick_store()).latest(require=GOLD_DRIVER_COLUMNS)
+        if entry:
+            prev = entry
+            prev_time = entry.get("time", "")
     
-    if prev_fx is None or prev_intl_gold is None:
+    if prev is None:
         return "📌 원인 분석: 이전 데이터 없음 (첫 실행)"
     
-    # 변동률 계산
-    fx_change_pct = ((current_usd_krw - prev_fx) / prev_fx) * 100
-    intl_gold_change_pct = ((current_intl_gold_oz - prev_intl_gold) / prev_intl_gold) * 100
-    
-    krx_change_pct = None
-    if prev_krx_gold and prev_krx_gold > 0:
-        krx_change_pct = ((current_krx_gold_g - prev_krx_gold) / prev_krx_gold) * 100
+    current = {
+        "usd_krw":          current_usd_krw,
+        "intl_gold_usd_oz": current_intl_gold_oz,
+        "krx_gold_krw_g":   current_krx_gold_g,
+    }
+    attr = attribute_gold_kimp(prev, current)
+    contrib = attr.contributions
     
     # 기간 표시
     period_str = ""
@@ -311,32 +1436,18 @@ def analyze_gold_kimp_driver(
     #   - 환율 상승 → 국제금(원화 환산) 상승 → 김프 하락
     #   - 국제금값 상승 → 국제금(원화 환산) 상승 → 김프 하락
     #   - 국내금값 하락 → 김프 하락
+    # 요인별 기여도(%p)의 합은 김프 변동과 정확히 일치 (로그 수익률 분해)
     
-    # 국제금(원화환산) 변동 = 환율변동 + 금값변동 (근사)
-    intl_krw_change_approx = fx_change_pct + intl_gold_change_pct
-    
-    factors = []
-    
-    # 각 요인의 영향도 (절대값 기준으로 정렬)
-    factor_list = [
-        ("환율", fx_change_pct, current_usd_krw, prev_fx, "원"),
-        ("국제금", intl_gold_change_pct, current_intl_gold_oz, prev_intl_gold, "$/oz"),
-    ]
-    if krx_change_pct is not None:
-        factor_list.append(
-            ("국내금", krx_change_pct, current_krx_gold_g, prev_krx_gold, "원/g")
-        )
-    
-    # 영향도 순 정렬
-    factor_list.sort(key=lambda x: abs(x[1]), reverse=True)
+    units = {"usd_krw": "원", "intl_gold_usd_oz": "$/oz", "krx_gold_krw_g": "원/g"}
+    factor_list = sorted(GOLD_DRIVER_FACTORS, key=lambda f: abs(contrib[f[0]]), reverse=True)
     
     lines = []
-    if period_str:
-        lines.append(f"📌 변동 원인 ({period_str})")
-    else:
-        lines.append("📌 변동 원인 분석")
+    header = f"📌 변동 원인 ({period_str})" if period_str else "📌 변동 원인 분석"
+    lines.append(f"{header} — 김프 {attr.kimp_start:+.2f}%→{attr.kimp_end:+.2f}% "
+                 f"({attr.kimp_change:+.2f}%p)")
     
-    for name, change_pct, current, prev, unit in factor_list:
+    for key, name, col, _ in factor_list:
+        change_pct = math.expm1(attr.log_returns[key]) * 100
         if abs(change_pct) < 0.01:
             arrow = "→"
             tag = "변동없음"
@@ -347,33 +1458,32 @@ def analyze_gold_kimp_driver(
             arrow = "↓"
             tag = "하락"
         
-        if unit == "원":
-            lines.append(f"  {arrow} {name}: {prev:,.0f}→{current:,.0f}{unit} ({change_pct:+.2f}%, {tag})")
-        elif unit == "$/oz":
-            lines.append(f"  {arrow} {name}: ${prev:,.0f}→${current:,.0f} ({change_pct:+.2f}%, {tag})")
+        prev_v, cur_v, unit = attr.start[col], attr.end[col], units[col]
+        if unit == "$/oz":
+            move = f"${prev_v:,.0f}→${cur_v:,.0f}"
         else:
-            lines.append(f"  {arrow} {name}: {prev:,.0f}→{current:,.0f}{unit} ({change_pct:+.2f}%, {tag})")
+            move = f"{prev_v:,.0f}→{cur_v:,.0f}{unit}"
+        lines.append(f"  {arrow} {name}: {move} ({change_pct:+.2f}% {tag}, 김프 {contrib[key]:+.2f}%p)")
     
     # 주요인 한 줄 요약
-    top_name, top_change, _, _, _ = factor_list[0]
-    if abs(top_change) >= 0.05:
-        if top_name == "환율":
+    top_key, top_name, _, _ = factor_list[0]
+    top_change = attr.log_returns[top_key]
+    if abs(contrib[top_key]) >= 0.05:
+        if top_key == "fx":
             if top_change > 0:
-                summary = f"💡 주요인: 환율 상승 → 국제금(원화) 비싸짐 → 김프 하락"
+                summary = "💡 주요인: 환율 상승 → 국제금(원화) 비싸짐 → 김프 하락"
             else:
-                summary = f"💡 주요인: 환율 하락 → 국제금(원화) 싸짐 → 김프 상승"
-        elif top_name == "국제금":
+                summary = "💡 주요인: 환율 하락 → 국제금(원화) 싸짐 → 김프 상승"
+        elif top_key == "intl":
             if top_change > 0:
-                summary = f"💡 주요인: 국제금값 상승 → 국제금(원화) 비싸짐 → 김프 하락"
+                summary = "💡 주요인: 국제금값 상승 → 국제금(원화) 비싸짐 → 김프 하락"
             else:
-                summary = f"💡 주요인: 국제금값 하락 → 국제금(원화) 싸짐 → 김프 상승"
-        elif top_name == "국내금":
+                summary = "💡 주요인: 국제금값 하락 → 국제금(원화) 싸짐 → 김프 상승"
+        else:
             if top_change > 0:
-                summary = f"💡 주요인: 국내금값 상승 → 김프 상승"
+                summary = "💡 주요인: 국내금값 상승 → 김프 상승"
             else:
-                summary = f"💡 주요인: 국내금값 하락 → 김프 하락"
-        else:
-            summary = f"💡 주요인: {top_name} ({top_change:+.2f}%)"
+                summary = "💡 주요인: 국내금값 하락 → 김프 하락"
         lines.append(summary)
     else:
         lines.append("💡 모든 요인 소폭 변동 — 복합적 원인")
@@ -382,289 +1492,3230 @@ def analyze_gold_kimp_driver(
 
 
 # ═══════════════════════════════════════════════════════
-#  데이터 수집 (기존과 동일 — 변경 없음)
+#  HTTP 클라이언트 (커넥션 풀 공유)
 # ═══════════════════════════════════════════════════════
 
-def get_upbit_usdt_price() -> float:
-    url     = "https://api.upbit.com/v1/ticker"
-    params  = {"markets": "KRW-USDT"}
-    headers = {"Accept": "application/json"}
-    resp    = requests.get(url, params=params, headers=headers, timeout=10)
-    resp.raise_for_status()
-    price = float(resp.json()[0]["trade_price"])
-    print(f"  [Upbit] USDT/KRW = {price:,.2f}")
-    return price
+# 현재 스레드에서 마지막으로 캐시가 응답한 내역 (Provider 실행 단위로 초기화)
+_cache_trace = threading.local()
 
 
-def get_usd_krw_rate() -> float:
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        )
+def reset_cache_trace():
+    _cache_trace.entry = None
+
+
+def last_cache_trace() -> Optional[tuple]:
+    """(status, age초) — status: hit / revalidated / stale, 캐시 미사용이면 None"""
+    return getattr(_cache_trace, "entry", None)
+
+
+class ResponseCache:
+    """
+    GET 응답의 영속 캐시 (SQLite, HTTP_CACHE_DB — 프로세스 재시작 후에도 유지, git에는 커밋하지 않음)
+
+    - TTL 안: 네트워크 요청 없이 저장된 본문 반환 (hit)
+    - TTL 만료: ETag / Last-Modified가 있으면 조건부 요청, 304면 본문 재사용 (revalidated)
+    - 요청 실패 · 5xx: HTTP_CACHE_MAX_STALE_SEC 이내 값이면 그대로 반환 (stale)
+
+    age는 업스트림이 마지막으로 내용을 확인해 준 시점부터의 경과 시간입니다.
+    """
+
+    def __init__(self, path: str = None):
+        self.path  = path or HTTP_CACHE_DB
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key           TEXT PRIMARY KEY,
+                status        INTEGER NOT NULL,
+                body          BLOB NOT NULL,
+                headers       TEXT,
+                encoding      TEXT,
+                etag          TEXT,
+                last_modified TEXT,
+                validated_at  REAL NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def key(url: str, params: dict = None) -> str:
+        if not params:
+            return url
+        return url + "?" + "&".join(f"{k}={params[k]}" for k in sorted(params))
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, body, headers, encoding, etag, last_modified, validated_at "
+                "FROM http_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        names = ("status", "body", "headers", "encoding", "etag", "last_modified", "validated_at")
+        return dict(zip(names, row))
+
+    def put(self, key: str, resp: requests.Response, body: bytes = None):
+        """
+        body: 스트리밍으로 일부만 읽은 응답은 읽은 만큼만 저장 (추출기 재실행에 충분)
+        """
+        headers = {k: v for k, v in resp.headers.items()
+                   if k.lower() in ("content-type", "etag", "last-modified", "date")}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, resp.status_code, resp.content if body is None else body,
+                 json.dumps(headers), resp.encoding,
+                 resp.headers.get("ETag"), resp.headers.get("Last-Modified"), time.time()),
+            )
+
+    def touch(self, key: str):
+        with self._lock:
+            self._conn.execute("UPDATE http_cache SET validated_at = ? WHERE key = ?",
+                               (time.time(), key))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def to_response(entry: dict, url: str, status: str) -> requests.Response:
+        resp = requests.Response()
+        resp.status_code = entry["status"]
+        resp._content    = entry["body"]
+        resp._content_consumed = True   # iter_content()가 저장된 본문을 청크로 돌려주도록
+        resp.headers     = CaseInsensitiveDict(json.loads(entry["headers"] or "{}"))
+        resp.encoding    = entry["encoding"]
+        resp.url         = url
+        resp.cache_status = status
+        resp.cache_age    = time.time() - entry["validated_at"]
+        _cache_trace.entry = (status, resp.cache_age)
+        return resp
+
+
+@dataclass(frozen=True)
+class Extractor:
+    """
+    HttpClient.scrape()용 사전 컴파일 추출기
+
+    patterns는 우선순위 순으로 청크마다 검색 — 청크 경계에 걸친 매치를 위해
+    직전 청크의 마지막 overlap 글자를 이어 붙입니다 (매치 길이보다 커야 함).
+    encoding은 Content-Type에 charset이 없을 때 사용
+    """
+    name: str
+    patterns: tuple
+    overlap: int = 256
+    encoding: str = "utf-8"
+
+    def search(self, text: str) -> Optional["re.Match"]:
+        for pattern in self.patterns:
+            match = pattern.search(text)
+            if match:
+                return match
+        return None
+
+
+class FetchCancelled(Exception):
+    """헤징에서 다른 소스가 채택돼 중단된 시도"""
+
+
+class HedgeTimeout(requests.Timeout):
+    """지연 예산을 넘기고도 응답하지 못해 다른 소스에 밀려 버려진 시도 (건강도에는 타임아웃 실패)"""
+
+
+_fetch_scope = threading.local()   # 헤징 워커 스레드의 취소 이벤트 (cancel)
+
+
+def check_cancelled():
+    """현재 스레드의 시도가 취소됐으면 FetchCancelled — HTTP 요청 전후 · 재시도 · 스트리밍 청크마다 확인"""
+    event = getattr(_fetch_scope, "cancel", None)
+    if event is not None and event.is_set():
+        raise FetchCancelled("다른 소스 채택으로 취소")
+
+
+class CancellableRetry(Retry):
+    """
+    취소된 시도는 남은 재시도 · 백오프를 진행하지 않음
+    읽기 타임아웃은 재시도 없이 그대로 올림 (requests.ReadTimeout) — 연결 끊김(ProtocolError)은 재시도
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
+        check_cancelled()
+        if isinstance(error, ReadTimeoutError):
+            raise error
+        return super().increment(method, url, response, error, *args, **kwargs)
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        check_cancelled()
+
+
+class HttpClient:
+    """
+    모든 수집기와 알림 전송이 공유하는 HTTP 클라이언트
+
+    - 호스트별 keep-alive 커넥션 풀 (TCP/TLS 핸드셰이크 재사용)
+    - 공통 헤더 (User-Agent)
+    - 타임아웃 / 재시도 정책을 한 곳에서 관리
+      (재시도는 멱등 요청인 GET만, 429는 Retry-After 준수)
+    - 읽기 타임아웃은 재시도하지 않음 — 멈춘 소스가 타임아웃의 2배를 쓰지 않고 바로 폴백
+      (연결 오류 · 재시도 대상 상태 코드만 재시도)
+    """
+
+    def __init__(self, timeout: float = None, retries: int = None,
+                 pool_size: int = None, headers: dict = None,
+                 cache: ResponseCache = None):
+        self.timeout = timeout if timeout is not None else HTTP_TIMEOUT
+        self.cache   = cache
+        retries      = retries if retries is not None else HTTP_RETRIES
+        pool_size    = pool_size or HTTP_POOL_SIZE
+
+        retry = CancellableRetry(
+            total=retries,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size,
+                              max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update(HTTP_DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url: str, cache: str = None, **kwargs) -> requests.Response:
+        """
+        cache="<source id>"를 주면 HTTP_CACHE_TTL[source]에 따라 응답 캐시 사용
+        """
+        check_cancelled()
+        kwargs.setdefault("timeout", self.timeout)
+        ttl = HTTP_CACHE_TTL.get(cache, 0) if cache else 0
+        if self.cache is None or ttl <= 0:
+            return self._checked(self.session.get(url, **kwargs))
+
+        key   = ResponseCache.key(url, kwargs.get("params"))
+        entry = self.cache.get(key)
+        if entry is not None and time.time() - entry["validated_at"] < ttl:
+            return ResponseCache.to_response(entry, url, "hit")
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            resp = self._checked(self.session.get(url, headers=headers, **kwargs))
+        except requests.RequestException:
+            if entry is not None and time.time() - entry["validated_at"] < HTTP_CACHE_MAX_STALE_SEC:
+                return ResponseCache.to_response(entry, url, "stale")
+            raise
+
+        if resp.status_code == 304 and entry is not None:
+            self.cache.touch(key)
+            entry["validated_at"] = time.time()
+            return ResponseCache.to_response(entry, url, "revalidated")
+        if resp.status_code >= 500 and entry is not None \
+                and time.time() - entry["validated_at"] < HTTP_CACHE_MAX_STALE_SEC:
+            return ResponseCache.to_response(entry, url, "stale")
+        if resp.status_code == 200 and not kwargs.get("stream"):
+            self.cache.put(key, resp)
+        return resp
+
+    @staticmethod
+    def _checked(resp: requests.Response) -> requests.Response:
+        """응답을 받는 사이 취소됐으면 커넥션을 반납하고 FetchCancelled"""
+        try:
+            check_cancelled()
+        except FetchCancelled:
+            resp.close()
+            raise
+        return resp
+
+    def scrape(self, url: str, extractor: "Extractor", cache: str = None,
+               max_bytes: int = None, budget: float = None, **kwargs) -> "re.Match":
+        """
+        본문을 스트리밍으로 읽으며 extractor가 매치되는 즉시 중단하고 매치를 반환
+
+        - max_bytes: 매치 없이 이만큼 읽으면 ValueError (기본 SCRAPE_MAX_BYTES)
+        - budget:    요청 시작부터 이 시간(초)을 넘기면 requests.Timeout (기본 SCRAPE_BUDGET_SEC)
+        - cache:     get()과 같은 소스 ID — 매치까지 읽은 앞부분만 캐시에 저장
+        """
+        max_bytes = max_bytes or SCRAPE_MAX_BYTES
+        budget    = budget or SCRAPE_BUDGET_SEC
+        deadline  = time.monotonic() + budget
+        timeout   = kwargs.pop("timeout", self.timeout)
+        kwargs["timeout"] = min(timeout, budget)
+
+        resp = self.get(url, cache=cache, stream=True, **kwargs)
+        try:
+            resp.raise_for_status()
+            charset  = "charset=" in resp.headers.get("Content-Type", "").lower()
+            decoder  = codecs.getincrementaldecoder(
+                resp.encoding if charset else extractor.encoding)(errors="replace")
+            read     = bytearray()
+            tail     = ""
+            for chunk in resp.iter_content(SCRAPE_CHUNK_SIZE):
+                check_cancelled()
+                read += chunk
+                window = tail + decoder.decode(chunk)
+                match  = extractor.search(window)
+                if match:
+                    if cache and self.cache is not None and getattr(resp, "cache_status", None) is None:
+                        self.cache.put(ResponseCache.key(url, kwargs.get("params")), resp, bytes(read))
+                    return match
+                if len(read) >= max_bytes:
+                    raise ValueError(f"{extractor.name}: {len(read):,} bytes 안에서 찾지 못했습니다.")
+                if time.monotonic() > deadline:
+                    raise requests.Timeout(f"{extractor.name}: 시간 예산 {budget:g}s 초과")
+                tail = window[-extractor.overlap:]
+            raise ValueError(f"{extractor.name}: 본문({len(read):,} bytes)에서 찾지 못했습니다.")
+        finally:
+            resp.close()
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.post(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """
+    프로세스 공용 HttpClient (최초 호출 시 생성)
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient(cache=ResponseCache() if HTTP_CACHE_ENABLED else None)
+        return _http_client
+
+
+# ═══════════════════════════════════════════════════════
+#  계측 (구간 시간 · 소스별 지연 히스토그램 · 실패 카운터)
+# ═══════════════════════════════════════════════════════
+
+def _label_key(labels: dict = None) -> tuple:
+    return tuple(sorted((labels or {}).items()))
+
+
+class Metrics:
+    """
+    의존성 없는 최소 메트릭 레지스트리
+
+    - counter / gauge / histogram (누적 버킷, LATENCY_BUCKETS)
+    - span: 회차 안의 구간별 (시작 오프셋, 소요 시간) 기록 → 어디서 시간이 쓰였는지
+    """
+
+    HELP = {
+        "kimp_stage_seconds":          ("histogram", "회차 구간별 소요 시간"),
+        "kimp_source_request_seconds": ("histogram", "소스별 요청 소요 시간 (outcome: ok/cache/error/abandoned)"),
+        "kimp_source_failures_total":  ("counter",   "소스별 실패 수 (reason: timeout/connection/http/rejected/error)"),
+        "kimp_runs_total":             ("counter",   "실행한 회차 수"),
+        "kimp_run_seconds":            ("histogram", "회차 전체 소요 시간"),
+        "kimp_last_run_timestamp":     ("gauge",     "마지막 회차 완료 시각 (epoch)"),
+        "kimp_premium_percent":        ("gauge",     "최근 김프 (%)"),
     }
-    today_kst = datetime.now(KST).strftime("%Y-%m-%d")
 
-    try:
-        url  = (
-            "https://m.stock.naver.com/front-api/marketIndex/prices"
-            "?category=exchange&reutersCode=FX_USDKRW"
-        )
-        resp = requests.get(url, headers=headers, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+    def __init__(self):
+        self._lock      = threading.Lock()
+        self.counters   = {}   # (name, labels) → 값
+        self.gauges     = {}
+        self.histograms = {}   # (name, labels) → [버킷별 누적 수..., +Inf 수, 합계]
+        self.spans      = []   # 현재 회차 [(name, start, duration)]
+        self.run_started = time.monotonic()
+
+    def inc(self, name: str, labels: dict = None, value: float = 1.0):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, labels: dict = None):
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, seconds: float, labels: dict = None):
+        key = (name, _label_key(labels))
+        with self._lock:
+            h = self.histograms.setdefault(key, [0] * (len(LATENCY_BUCKETS) + 1) + [0.0])
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    h[i] += 1
+            h[len(LATENCY_BUCKETS)] += 1
+            h[-1] += seconds
+
+    # ── 회차 구간 ──
+
+    def begin_run(self):
+        with self._lock:
+            self.spans = []
+            self.run_started = time.monotonic()
+
+    def end_run(self):
+        elapsed = time.monotonic() - self.run_started
+        self.inc("kimp_runs_total")
+        self.observe("kimp_run_seconds", elapsed)
+        self.set("kimp_last_run_timestamp", time.time())
+        return elapsed
+
+    def add_span(self, name: str, started: float, duration: float):
+        with self._lock:
+            self.spans.append((name, started - self.run_started, duration))
+
+    def stage(self, name: str, started: float):
+        """started(time.monotonic())부터 지금까지를 name 구간으로 기록"""
+        duration = time.monotonic() - started
+        self.observe("kimp_stage_seconds", duration, {"stage": name})
+        self.add_span(name, started, duration)
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.stage(name, started)
+
+    # ── 내보내기 ──
+
+    def render_prometheus(self) -> str:
+        def fmt(labels: tuple, extra: tuple = ()) -> str:
+            items = labels + extra
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        with self._lock:
+            counters, gauges = dict(self.counters), dict(self.gauges)
+            histograms = {k: list(v) for k, v in self.histograms.items()}
+
+        lines, seen = [], set()
+        for store in (counters, gauges, histograms):
+            for (name, labels) in sorted(store):
+                if name not in seen:
+                    seen.add(name)
+                    kind, text = self.HELP.get(name, ("untyped", name))
+                    lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                if store is histograms:
+                    h = store[(name, labels)]
+                    for bound, count in zip(LATENCY_BUCKETS, h):
+                        lines.append(f"{name}_bucket{fmt(labels, (('le', f'{bound:g}'),))} {count}")
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', '+Inf'),))} {h[len(LATENCY_BUCKETS)]}")
+                    lines.append(f"{name}_sum{fmt(labels)} {h[-1]:.6f}")
+                    lines.append(f"{name}_count{fmt(labels)} {h[len(LATENCY_BUCKETS)]}")
+                else:
+                    lines.append(f"{name}{fmt(labels)} {store[(name, labels)]:.15g}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict:
+        """1회 실행용 JSON — 구간 타임라인 + 소스별 요약 + 전체 메트릭"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda x: x[1])
+            sources = {}
+            for (name, labels), h in self.histograms.items():
+                if name != "kimp_source_request_seconds":
+                    continue
+                lab = dict(labels)
+                entry = sources.setdefault(lab["source"], {"requests": 0, "seconds": 0.0,
+                                                           "outcomes": {}, "failures": {}})
+                entry["requests"] += h[len(LATENCY_BUCKETS)]
+                entry["seconds"]  = round(entry["seconds"] + h[-1], 4)
+                entry["outcomes"][lab["outcome"]] = h[len(LATENCY_BUCKETS)]
+            for (name, labels), v in self.counters.items():
+                if name == "kimp_source_failures_total":
+                    lab = dict(labels)
+                    sources.setdefault(lab["source"], {"requests": 0, "seconds": 0.0, "outcomes": {},
+                                                       "failures": {}})["failures"][lab["reason"]] = v
+            return {
+                "time":    datetime.now(KST).isoformat(),
+                "total_sec": round(time.monotonic() - self.run_started, 4),
+                "spans":   [{"name": n, "start": round(st, 4), "duration": round(d, 4)}
+                            for n, st, d in spans],
+                "sources": sources,
+                "counters": {f"{n}{dict(l) or ''}": v for (n, l), v in self.counters.items()},
+                "gauges":   {f"{n}{dict(l) or ''}": v for (n, l), v in self.gauges.items()},
+            }
+
+    def write_json(self, path: str = None):
+        path = path or METRICS_FILE
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        print(f"  [Metrics] {path} 저장")
+
+
+METRICS = Metrics()
+
+
+def failure_reason(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "rejected"
+    if isinstance(error, requests.Timeout) or _is_retried_timeout(error):
+        return "timeout"
+    if isinstance(error, requests.ConnectionError):
+        return "connection"
+    if isinstance(error, requests.HTTPError):
+        return "http"
+    return "error"
+
+
+def _is_retried_timeout(error: Exception) -> bool:
+    """
+    재시도(urllib3 Retry)를 소진한 타임아웃은 requests.ConnectionError(MaxRetryError(...TimeoutError))로
+    올라오므로 원인을 풀어 확인 (읽기 타임아웃은 CancellableRetry가 재시도 없이 바로 올림)
+    NewConnectionError(연결 거부 등)는 urllib3에서 ConnectTimeoutError의 하위 클래스라 따로 제외
+    """
+    if not isinstance(error, requests.ConnectionError):
+        return False
+    reason = error.args[0] if error.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    if isinstance(reason, NewConnectionError):
+        return False
+    return isinstance(reason, (ReadTimeoutError, ConnectTimeoutError))
+
+
+class MetricsServer:
+    """
+    데몬 모드 Prometheus 엔드포인트 — GET /metrics
+    """
+
+    def __init__(self, metrics: Metrics = None, host: str = None, port: int = None):
+        self.metrics = metrics or METRICS
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = owner.metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host or METRICS_HOST, int(port if port is not None else METRICS_PORT)),
+                                           Handler)
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ═══════════════════════════════════════════════════════
+#  읽기 API (데몬 — 메모리의 직렬화된 응답)
+# ═══════════════════════════════════════════════════════
+
+class ReadApiCache:
+    """
+    읽기 API 응답 캐시 — publish()가 회차마다 한 번 모든 응답을 JSON bytes로 만들어 통째로 교체
+
+    요청 처리는 dict 조회 + bytes 전송뿐이라 대시보드가 몰려도 시세 소스 · 틱 DB를 건드리지 않습니다.
+    기간별 이력은 API_HISTORY_POINTS개 이하로 —
+      - 짧은 기간 (점 간격 < 1분): 원시 틱 메모리 링에서 균등 추출
+      - 긴 기간: 저장된 봉(1분 · 1시간 · 1일)을 점 간격 봉(OhlcBars)으로 합쳐 적재, 이후 틱마다 O(1) 갱신
+    """
+
+    def __init__(self, windows: str = None, max_points: int = None, store: TickStore = None):
+        store           = store or get_tick_store()
+        self.windows    = {w.strip(): parse_horizon(w) for w in (windows or API_HISTORY_WINDOWS).split(",")
+                           if w.strip()}
+        self.max_points = max_points or API_HISTORY_POINTS
+        self.columns    = tuple(TICK_COLUMNS)
+        self.books      = {}   # 긴 기간 → OhlcBars
+        self.ts         = []   # 원시 틱 링 (시간순)
+        self.rows       = []
+        self.published  = 0
+        self._bodies    = {}   # 경로 → (bytes, ETag)
+
+        now = datetime.now(KST)
+        for name, seconds in self.windows.items():
+            step = seconds / self.max_points
+            if step < BAR_RESOLUTIONS["1m"]:
+                continue
+            res  = max(r for r in BAR_RESOLUTIONS.values() if r <= step)
+            book = self.books[name] = OhlcBars(math.ceil(step / res) * res, BAR_SERIES, span=seconds)
+            for bar_ts, col, ohlc in store.iter_bars(res, now - timedelta(seconds=seconds)):
+                book.add(bar_ts, col, *ohlc)
+        self.span = max((s for name, s in self.windows.items() if name not in self.books), default=0)
+        if self.span:
+            for r in store.iter_range(now - timedelta(seconds=self.span), columns=self.columns):
+                self.ts.append(r["ts"])
+                self.rows.append([r["ts"], *(r[c] for c in self.columns)])
+
+    def get(self, path: str) -> Optional[tuple]:
+        return self._bodies.get(path)
+
+    def paths(self) -> list:
+        return sorted(self._bodies)
+
+    def publish(self, snapshot: "MarketSnapshot", tick: dict, values: dict, asset_kimps: dict):
+        """
+        tick: 틱 컬럼 값 (tick_values), values: 알림 규칙 입력 (상세 문구 · 변동 분석 포함)
+        """
+        now = snapshot.time
+        ts  = now.timestamp()
+        if not self.ts or ts > self.ts[-1]:
+            self.ts.append(ts)
+            self.rows.append([ts, *(None if tick[c] is None else round(tick[c], TICK_COLUMNS[c])
+                                    for c in self.columns)])
+        cut = bisect.bisect_left(self.ts, ts - self.span)
+        if cut:
+            del self.ts[:cut]
+            del self.rows[:cut]
+        for book in self.books.values():
+            book.update(ts, tick)
+
+        documents = {
+            "/snapshot": self._snapshot(now, snapshot, tick, values, asset_kimps),
+            "/drivers":  self._drivers(now, values),
+        }
+        for name, seconds in self.windows.items():
+            documents[f"/history/{name}"] = self._history(now, name, seconds)
+        documents["/"] = {"endpoints": sorted(documents), "time": now.isoformat()}
+
+        etag = f'"{int(ts * 1000):x}"'
+        self._bodies = {
+            path: (json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode(), etag)
+            for path, doc in documents.items()
+        }
+        self.published += 1
+
+    def _snapshot(self, now: datetime, snapshot: "MarketSnapshot", tick: dict, values: dict,
+                  asset_kimps: dict) -> dict:
+        return {
+            "time":    now.isoformat(),
+            "usd_krw": snapshot.usd_krw,
+            "usdt": {
+                "kimp":       tick["usdt_kimp"],
+                "upbit_krw":  snapshot.upbit_usdt,
+                "thresholds": {"low": USDT_KIMP_LOW, "high": USDT_KIMP_HIGH},
+            },
+            "gold": {
+                "kimp":             tick["gold_kimp"],
+                "krx_krw_g":        snapshot.krx_gold_krw_g,
+                "intl_usd_oz":      snapshot.intl_gold_usd_oz,
+                "intl_krw_g":       values.get("intl_gold_krw_g"),
+                "thresholds":       {"low": GOLD_KIMP_LOW, "high": GOLD_KIMP_HIGH, "step": GOLD_KIMP_STEP},
+            },
+            "assets": {
+                sym: {"kimp": kimp, "upbit_krw": price, "ref_krw": ref, "thresholds": dict(
+                    zip(("low", "high"), premium_thresholds(sym)))}
+                for sym, (kimp, price, ref) in asset_kimps.items()
+            },
+            "venues":  snapshot.venues,
+            "sources": snapshot.sources,
+            "latency": {k: round(v, 4) for k, v in snapshot.latency.items()},
+            "cache":   {k: {"status": status, "age": round(age, 1)}
+                        for k, (status, age) in snapshot.cache.items()},
+            "errors":  {k: str(e) for k, e in snapshot.errors.items()},
+        }
+
+    def _drivers(self, now: datetime, values: dict) -> dict:
+        doc = {"time": now.isoformat(), "analysis": values.get("driver_analysis") or None, "windows": {}}
+        if _gold_series is not None:
+            for name, seconds in self.windows.items():
+                attr = _gold_series.window(seconds)
+                doc["windows"][name] = attr.to_dict() if attr else None
+        return doc
+
+    def _history(self, now: datetime, name: str, seconds: float) -> dict:
+        book = self.books.get(name)
+        if book is not None:
+            return {
+                "window":     name,
+                "time":       now.isoformat(),
+                "resolution": book.step,
+                "columns":    ["start", *book.columns],   # 계열별 [open, high, low, close] 또는 null
+                "points":     book.rows(now.timestamp() - seconds),
+            }
+        i      = bisect.bisect_left(self.ts, now.timestamp() - seconds)
+        rows   = self.rows[i:]
+        stride = max(1, math.ceil(len(rows) / self.max_points))
+        points = rows[::stride]
+        if rows and points[-1] is not rows[-1]:
+            points.append(rows[-1])
+        return {
+            "window":  name,
+            "time":    now.isoformat(),
+            "columns": ["ts", *self.columns],
+            "ticks":   len(rows),
+            "stride":  stride,
+            "points":  points,
+        }
+
+
+class ReadApiServer:
+    """
+    데몬 모드 읽기 API — GET 경로별로 ReadApiCache의 bytes 반환 (If-None-Match → 304)
+    """
+
+    def __init__(self, cache: ReadApiCache, host: str = None, port: int = None, max_age: float = None):
+        self.cache = cache
+        max_age    = int(max_age if max_age is not None else POLL_INTERVAL_SEC)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                entry = cache.get(self.path.split("?")[0].rstrip("/") or "/")
+                if entry is None:
+                    status = 503 if not cache.published else 404
+                    body   = json.dumps({"error": "not ready" if status == 503 else "not found",
+                                         "endpoints": cache.paths()}).encode()
+                    self._reply(status, body)
+                    return
+                body, etag = entry
+                if self.headers.get("If-None-Match") == etag:
+                    self._reply(304, b"", etag)
+                    return
+                self._reply(200, body, etag)
+
+            def _reply(self, status: int, body: bytes, etag: str = None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Cache-Control", f"max-age={max_age}")
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host or API_HOST, int(port if port is not None else API_PORT)),
+                                           Handler)
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="read-api", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+_read_api_cache = None   # 데몬에서 API를 켜면 설정 — run_tick이 회차마다 publish
+
+
+# ═══════════════════════════════════════════════════════
+#  폴백 체인 & 헤징
+# ═══════════════════════════════════════════════════════
+
+def record_source_latency(source: str, seconds: float):
+    samples = _source_latency.setdefault(source, deque(maxlen=LATENCY_SAMPLE_SIZE))
+    samples.append(seconds)
+
+
+def hedge_budget(source: str) -> float:
+    """
+    헤지 시작까지 기다릴 시간(초)
+
+    HEDGE_DELAY_SEC가 설정되어 있으면 고정값,
+    아니면 최근 성공 응답시간의 p95 (표본 부족 시 기본값)
+    """
+    if HEDGE_DELAY_SEC is not None:
+        return HEDGE_DELAY_SEC
+    samples = sorted(_source_latency.get(source, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_SEC
+    p95 = samples[min(len(samples) - 1, int(math.ceil(0.95 * len(samples))) - 1)]
+    return min(max(p95, HEDGE_FLOOR_SEC), HEDGE_DEFAULT_SEC)
+
+
+def load_source_latency(state: dict):
+    for source, samples in state.get("source_latency", {}).items():
+        _source_latency[source] = deque(samples, maxlen=LATENCY_SAMPLE_SIZE)
+
+
+def store_source_latency(state: dict):
+    state["source_latency"] = {
+        source: [round(x, 3) for x in samples]
+        for source, samples in _source_latency.items()
+    }
+
+
+@dataclass
+class SourceHealth:
+    """
+    소스 하나의 누적 건강도 — state["source_health"]에 저장되어 실행 간 유지
+    """
+    successes: int = 0
+    failures: int = 0
+    rejections: int = 0          # 응답은 왔지만 검증(범위 · 양수)에서 탈락
+    consecutive: int = 0         # 연속 실패 수
+    recent: str = ""             # 최근 HEALTH_WINDOW회 결과 ("1" 성공 / "0" 실패)
+    open_until: float = 0.0      # 서킷 열림 종료 시각 (epoch)
+    last_attempt: float = 0.0
+    last_error: str = ""
+
+    @property
+    def success_rate(self) -> float:
+        return self.recent.count("1") / len(self.recent) if self.recent else 1.0
+
+    def is_open(self, now: float = None) -> bool:
+        return (now or time.time()) < self.open_until
+
+    def record(self, ok: bool, error: Exception = None):
+        self.recent = (self.recent + ("1" if ok else "0"))[-HEALTH_WINDOW:]
+        self.last_attempt = time.time()
+        if ok:
+            self.successes  += 1
+            self.consecutive = 0
+            self.open_until  = 0.0
+            return
+        self.failures   += 1
+        self.consecutive += 1
+        self.last_error  = str(error)[:200] if error else ""
+        if isinstance(error, ValidationError):
+            self.rejections += 1
+        if self.consecutive >= BREAKER_FAILURES:
+            self.open_until = time.time() + BREAKER_COOLDOWN_SEC
+
+
+def get_source_health(source: str) -> SourceHealth:
+    with _source_health_lock:
+        return _source_health.setdefault(source, SourceHealth())
+
+
+def peek_source_health(source: str) -> SourceHealth:
+    """조회 전용 — 시도된 적 없는 소스는 빈 기록 (저장소에 추가하지 않음)"""
+    return _source_health.get(source) or SourceHealth()
+
+
+def record_source_result(source: str, ok: bool, elapsed: float = None, error: Exception = None,
+                         cached: bool = False):
+    """
+    시도 1건 반영 — 건강도 · 지연 표본(캐시 적중 제외) · 메트릭(히스토그램 · 실패 카운터 · 구간)
+    """
+    health = get_source_health(source)
+    with _source_health_lock:
+        was_open = health.consecutive >= BREAKER_FAILURES
+        health.record(ok, error)
+    if ok and elapsed is not None and not cached:
+        record_source_latency(source, elapsed)
+    if elapsed is not None:
+        outcome = "cache" if cached else ("ok" if ok else "error")
+        METRICS.observe("kimp_source_request_seconds", elapsed, {"source": source, "outcome": outcome})
+        METRICS.add_span(f"fetch:{source}", time.monotonic() - elapsed, elapsed)
+    if not ok:
+        METRICS.inc("kimp_source_failures_total", {"source": source, "reason": failure_reason(error)})
+    if not ok and health.consecutive == BREAKER_FAILURES:
+        print(f"  [Breaker] {source}: 연속 {health.consecutive}회 실패 → "
+              f"{BREAKER_COOLDOWN_SEC / 60:g}분간 제외")
+    elif ok and was_open:
+        print(f"  [Breaker] {source}: 복구 확인 → 체인 복귀")
+
+
+def source_percentile(source: str, q: float) -> Optional[float]:
+    samples = sorted(_source_latency.get(source, ()))
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(math.ceil(q * len(samples))) - 1)]
+
+
+def order_providers(providers: list) -> list:
+    """
+    폴백 체인 동적 정렬
+
+    1. 서킷이 열린 소스는 제외 (전부 열려 있으면 선언 순서대로 모두 시도)
+    2. fallback_only 소스(일간 데이터 등)는 항상 뒤쪽
+    3. 나머지는 예상 소요 시간 p50 / 성공률이 짧은 순 (측정 전이면 HEDGE_DEFAULT_SEC 가정,
+       동점이면 선언 우선순위). HEALTH_REPROBE_SEC 넘게 시도되지 않은 소스는 맨 앞에서 재측정.
+    """
+    if not ADAPTIVE_ORDER:
+        return list(providers)
+    now    = time.time()
+    closed = [p for p in providers if not peek_source_health(p.id).is_open(now)]
+    skipped = [p.id for p in providers if p not in closed]
+    if not closed:
+        return list(providers)
+    if skipped:
+        print(f"  [Breaker] 서킷 열림 — 건너뜀: {', '.join(skipped)}")
+
+    def score(provider):
+        health = peek_source_health(provider.id)
+        if health.recent and now - health.last_attempt > HEALTH_REPROBE_SEC:
+            return (provider.fallback_only, 0.0, provider.priority)   # 오래된 측정 → 재측정
+        p50  = source_percentile(provider.id, 0.5)
+        p50  = HEDGE_DEFAULT_SEC if p50 is None else p50           # 측정 전 소스는 보수적으로 가정
+        rate = health.success_rate if len(health.recent) >= HEALTH_MIN_SAMPLES else 1.0
+        return (provider.fallback_only, p50 / max(rate, 0.05), provider.priority)
+
+    return sorted(closed, key=score)
+
+
+def load_source_health(state: dict):
+    with _source_health_lock:
+        for source, raw in state.get("source_health", {}).items():
+            _source_health[source] = SourceHealth(**raw)
+
+
+def store_source_health(state: dict):
+    with _source_health_lock:
+        state["source_health"] = {
+            source: {**health.__dict__} for source, health in _source_health.items()
+        }
+
+
+def format_source_health() -> str:
+    """소스별 건강도 표 (--health)"""
+    lines = [f"  {'source':<20} {'성공률':>6} {'성공':>6} {'실패':>5} {'검증탈락':>8} "
+             f"{'p50':>7} {'p95':>7}  상태"]
+    now = time.time()
+    for source in sorted(_source_health):
+        h   = _source_health[source]
+        p50 = source_percentile(source, 0.5)
+        p95 = source_percentile(source, 0.95)
+        if h.is_open(now):
+            status = f"열림 ({(h.open_until - now) / 60:.0f}분 남음) — {h.last_error[:40]}"
+        else:
+            status = "정상" if not h.consecutive else f"연속 실패 {h.consecutive}"
+        lines.append(
+            f"  {source:<20} {h.success_rate * 100:>5.0f}% {h.successes:>6} {h.failures:>5} "
+            f"{h.rejections:>8} {(f'{p50:.2f}s' if p50 is not None else '-'):>7} "
+            f"{(f'{p95:.2f}s' if p95 is not None else '-'):>7}  {status}"
+        )
+    return "\n".join(lines)
+
+
+@dataclass
+class FetchResult:
+    """폴백 체인 결과 — 채택된 값 · Provider id · 체인 전체 소요 시간(초) · 캐시 사용 내역"""
+    value: float
+    source: str
+    elapsed: float
+    cache: Optional[tuple] = None   # (hit / revalidated / stale, age초)
+
+
+def abandon_attempts(attempts: dict):
+    """
+    채택되지 못한 진행 중 시도를 취소하고 결과를 기록 — 버려진 시도도 건강도 · 메트릭에 남김
+
+    지연 예산을 넘긴 시도는 타임아웃 실패(HedgeTimeout)로 집계해 계속 늦는 소스의 서킷이 열리게 하고,
+    예산 안에서 밀린 시도(늦게 시작한 헤지)는 실패로 치지 않고 abandoned 결과로만 기록합니다.
+    """
+    now = time.monotonic()
+    for source, (cancel, started, budget) in attempts.items():
+        cancel.set()
+        elapsed = now - started
+        if elapsed >= budget:
+            record_source_result(source, False, elapsed,
+                                 error=HedgeTimeout(f"{elapsed:.2f}s 무응답 (예산 {budget:.1f}s) — 다른 소스 채택"))
+        else:
+            METRICS.observe("kimp_source_request_seconds", elapsed, {"source": source, "outcome": "abandoned"})
+
+
+def fetch_with_fallback(label: str, providers: list, http: HttpClient = None,
+                        error_msg: str = None) -> FetchResult:
+    """
+    Provider 목록을 우선순위대로 시도합니다.
+
+    헤징 모드(HEDGE_MODE=on)에서는 앞 소스가 지연 예산(hedge_budget) 안에
+    응답하지 않으면 다음 소스를 병렬로 시작하고, 검증을 통과한 첫 응답을
+    채택합니다. 나머지 시도는 취소 이벤트로 중단합니다 — 다음 요청 · 재시도 · 스트리밍
+    청크 전에 멈추고 받은 응답은 커넥션을 반납 (이미 보낸 요청은 타임아웃까지 대기할 수 있음).
+    """
+    http      = http or get_http_client()
+    error_msg = error_msg or f"{label} 시세를 가져올 수 없습니다."
+    providers = order_providers(providers)
+    chain_started = time.monotonic()
+    if not HEDGE_ENABLED:
+        for provider in providers:
+            started = time.monotonic()
+            try:
+                reset_cache_trace()
+                value  = provider.run(http)
+                cached = last_cache_trace()
+                hit    = cached is not None and cached[0] == "hit"
+                record_source_result(provider.id, True, time.monotonic() - started, cached=hit)
+                return FetchResult(value, provider.id, time.monotonic() - chain_started, cached)
+            except Exception as e:
+                record_source_result(provider.id, False, time.monotonic() - started, error=e)
+                print(f"  [{provider.tag}] {label} 실패: {e}")
+        raise RuntimeError(error_msg)
+
+    results  = queue.Queue()
+    launched = 0
+    inflight = 0
+    cancels  = {}   # provider id → (취소 이벤트, 시작 시각, 지연 예산)
+    hedge_at = None # 다음 헤지 시작 시각 — 마지막 시도 시작 + 그 소스의 지연 예산
+
+    def worker(provider, cancel):
+        started = time.monotonic()
+        _fetch_scope.cancel = cancel
+        reset_cache_trace()
+        try:
+            value = provider.run(http)
+            results.put((provider, value, None, time.monotonic() - started, last_cache_trace()))
+        except Exception as e:
+            results.put((provider, None, e, time.monotonic() - started, None))
+
+    def launch():
+        nonlocal launched, inflight, hedge_at
+        provider = providers[launched]
+        cancel   = threading.Event()
+        started, budget = time.monotonic(), hedge_budget(provider.id)
+        cancels[provider.id] = (cancel, started, budget)
+        hedge_at = started + budget
+        threading.Thread(target=worker, args=(provider, cancel),
+                         name=f"hedge-{provider.id}", daemon=True).start()
+        launched += 1
+        inflight += 1
+
+    launch()
+    while inflight:
+        # 다른 시도의 결과를 처리한 뒤에도 대기는 마지막 시작 시각 기준 (예산을 다시 세지 않음)
+        wait = max(0.0, hedge_at - time.monotonic()) if launched < len(providers) else None
+        try:
+            provider, value, err, elapsed, cached = results.get(timeout=wait)
+        except queue.Empty:
+            print(f"  [Hedge] {label}: {providers[launched - 1].tag} "
+                  f"{cancels[providers[launched - 1].id][2]:.1f}s 무응답 "
+                  f"→ {providers[launched].tag} 병렬 시작")
+            launch()
+            continue
+
+        inflight -= 1
+        del cancels[provider.id]
+        if err is None:
+            hit = cached is not None and cached[0] == "hit"
+            record_source_result(provider.id, True, elapsed, cached=hit)
+            abandon_attempts(cancels)
+            if inflight:
+                print(f"  [Hedge] {label}: {provider.tag} 채택 ({elapsed:.2f}s) — 나머지 {inflight}건 취소")
+            return FetchResult(value, provider.id, time.monotonic() - chain_started, cached)
+
+        record_source_result(provider.id, False, elapsed, error=err)
+        print(f"  [{provider.tag}] {label} 실패: {err}")
+        if launched < len(providers):
+            launch()
+
+    raise RuntimeError(error_msg)
+
+
+# ═══════════════════════════════════════════════════════
+#  데이터 소스 레지스트리
+# ═══════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class Provider:
+    """
+    시세 소스 하나 — 자산 · 우선순위(낮을수록 먼저) · 검증 함수를 선언
+    """
+    id: str
+    tag: str
+    asset: str
+    priority: int
+    fetch: Callable
+    validate: Optional[Callable] = None
+    fallback_only: bool = False   # 최신성이 낮은 소스 — 동적 정렬에서도 항상 뒤쪽
+
+    def run(self, http: HttpClient) -> float:
+        value = self.fetch(http)
+        if self.validate:
+            try:
+                self.validate(value)
+            except ValueError as e:
+                raise ValidationError(str(e)) from e
+        return value
+
+
+class ValidationError(ValueError):
+    """응답은 받았지만 값이 검증 범위를 벗어남 (건강도에서 검증 탈락으로 집계)"""
+
+
+# 자산 키 → 로그/오류 메시지용 이름 (스냅샷 필드명과 동일)
+ASSET_LABELS = {
+    "usd_krw":          "USD/KRW",
+    "upbit_usdt":       "USDT/KRW",
+    "krx_gold_krw_g":   "KRX 금현물",
+    "intl_gold_usd_oz": "XAU/USD",
+}
+
+PROVIDERS = []
+
+
+def register_provider(id: str, tag: str, asset: str, priority: int, validate: Callable = None,
+                      fallback_only: bool = False):
+    """
+    수집 함수 fn(http) -> float 를 Provider로 등록하는 데코레이터
+    """
+    def decorator(fn):
+        PROVIDERS.append(Provider(id, tag, asset, priority, fn, validate, fallback_only))
+        return fn
+    return decorator
+
+
+def providers_for(asset: str) -> list:
+    return sorted((p for p in PROVIDERS if p.asset == asset), key=lambda p: p.priority)
+
+
+def fetch_asset(asset: str, http: HttpClient = None) -> float:
+    return fetch_asset_detail(asset, http).value
+
+
+def fetch_asset_detail(asset: str, http: HttpClient = None) -> FetchResult:
+    """
+    자산 하나를 등록된 Provider 폴백 체인으로 조회 (출처 · 소요 시간 포함)
+    """
+    label     = ASSET_LABELS[asset]
+    providers = providers_for(asset)
+    tags      = "·".join(p.tag for p in providers)
+    return fetch_with_fallback(
+        label, providers, http,
+        error_msg=f"{label}: 모든 소스({tags})가 응답하지 않습니다.",
+    )
+
+
+# ── 검증 ────────────────────────────────────────────────
+
+def _validate_positive(price: float):
+    if not price > 0:
+        raise ValueError(f"비정상 가격 감지: {price}")
+
+
+def _validate_usd_krw(rate: float):
+    if not (USD_KRW_MIN < rate < USD_KRW_MAX):
+        raise ValueError(
+            f"비정상 환율 감지: {rate:,.2f}원"
+            f"  (허용 범위 {USD_KRW_MIN:,}~{USD_KRW_MAX:,})"
+        )
+
+
+def _validate_gold_usd_oz(price: float):
+    if not (GOLD_PRICE_MIN_USD < price < GOLD_PRICE_MAX_USD):
+        raise ValueError(
+            f"비정상 금값 감지: ${price:,.2f}/oz"
+            f"  (허용 범위 ${GOLD_PRICE_MIN_USD:,}~${GOLD_PRICE_MAX_USD:,})"
+        )
+
+
+def _yfinance():
+    """
+    yfinance는 pandas/numpy까지 끌어오므로 Yahoo 폴백이 실제로 실행될 때만 import
+    """
+    import yfinance
+    return yfinance
+
+
+# ═══════════════════════════════════════════════════════
+#  데이터 수집
+# ═══════════════════════════════════════════════════════
+
+# ── Upbit ───────────────────────────────────────────────
+
+def fetch_upbit_tickers(http: HttpClient, markets: list) -> dict:
+    """
+    Upbit /v1/ticker 배치 조회 — 마켓 수와 무관하게 요청 1회
+
+    Returns:
+        {"KRW-BTC": 143000000.0, ...}
+    """
+    url     = f"{VENUE_BASE_URLS['upbit']}/v1/ticker"
+    params  = {"markets": ",".join(markets)}
+    headers = {"Accept": "application/json"}
+    resp    = http.get(url, params=params, headers=headers)
+    resp.raise_for_status()
+    prices = {item["market"]: float(item["trade_price"]) for item in resp.json()}
+    missing = [m for m in markets if m not in prices]
+    if missing:
+        raise ValueError(f"응답에 없는 마켓: {', '.join(missing)}")
+    for price in prices.values():
+        _validate_positive(price)
+    return prices
+
+
+@register_provider("upbit:rest", "Upbit", "upbit_usdt", 10, validate=_validate_positive)
+def _usdt_from_upbit(http: HttpClient) -> float:
+    price = fetch_upbit_tickers(http, ["KRW-USDT"])["KRW-USDT"]
+    print(f"  [Upbit] USDT/KRW = {price:,.2f}")
+    return price
+
+
+# ── USD/KRW 환율 ────────────────────────────────────────
+
+@register_provider("fx:naver", "Naver", "usd_krw", 10, validate=_validate_usd_krw)
+def _fx_from_naver(http: HttpClient) -> float:
+    today_kst = datetime.now(KST).strftime("%Y-%m-%d")
+
+    url  = (
+        f"{SOURCE_BASE_URLS['naver-fx']}/front-api/marketIndex/prices"
+        "?category=exchange&reutersCode=FX_USDKRW"
+    )
+    resp = http.get(url, cache="fx:naver")
+    resp.raise_for_status()
+    data = resp.json()
+
+    if not (data.get("isSuccess") and data.get("result")):
+        raise ValueError(f"응답 형식 이상: isSuccess={data.get('isSuccess')}")
+
+    item      = data["result"][0]
+    traded_at = item.get("localTradedAt", "")
+    rate      = float(item["closePrice"].replace(",", ""))
+
+    if traded_at == today_kst:
+        print(f"  [Naver] USD/KRW = {rate:,.2f}  (당일 {traded_at})")
+    else:
+        print(
+            f"  [Naver] USD/KRW = {rate:,.2f}"
+            f"  (최근 거래일 {traded_at} — 오늘 {today_kst}, 주말/공휴일 허용)"
+        )
+    return rate
+
+
+@register_provider("fx:yahoo", "Yahoo", "usd_krw", 20, validate=_validate_usd_krw)
+def _fx_from_yahoo(http: HttpClient) -> float:
+    print("  [Yahoo] 폴백: KRW=X 시도...")
+    ticker = _yfinance().Ticker("KRW=X")
+    rate   = float(ticker.fast_info.last_price)
+    print(f"  [Yahoo] USD/KRW = {rate:,.2f}")
+    return rate
+
+
+@register_provider("fx:er-api", "er-api", "usd_krw", 30, validate=_validate_usd_krw,
+                   fallback_only=True)
+def _fx_from_er_api(http: HttpClient) -> float:
+    print("  [er-api] 폴백: 일간 환율 시도...")
+    resp = http.get(f"{SOURCE_BASE_URLS['er-api']}/v6/latest/USD", cache="fx:er-api")
+    resp.raise_for_status()
+    rate = float(resp.json()["rates"]["KRW"])
+    print(f"  [er-api] USD/KRW = {rate:,.2f}  (주의: 일간 업데이트)")
+    return rate
+
+
+# ── KRX 금현물 ──────────────────────────────────────────
+
+@register_provider("krx:naver-api", "Naver API", "krx_gold_krw_g", 10, validate=_validate_positive)
+def _krx_gold_from_naver_api(http: HttpClient) -> float:
+    url  = f"{SOURCE_BASE_URLS['naver-api']}/marketindex/metals/M04020000"
+    resp = http.get(url, timeout=15, cache="krx:naver-api")
+    resp.raise_for_status()
+    data  = resp.json()
+    price = float(data["closePrice"].replace(",", ""))
+    print(f"  [KRX Gold] 국내 금현물 = {price:,.0f} 원/g  (네이버 API)")
+    return price
+
+
+NAVER_GOLD_EXTRACTOR = Extractor("naver-gold", (
+    re.compile(r"([\d,]+\.\d+)\s*원/g"),
+    re.compile(r"([\d,]+)\s*원/g"),
+))
+
+
+@register_provider("krx:naver-desktop", "Naver 데스크톱", "krx_gold_krw_g", 20,
+                   validate=_validate_positive)
+def _krx_gold_from_naver_desktop(http: HttpClient) -> float:
+    url   = f"{SOURCE_BASE_URLS['naver-finance']}/marketindex/goldDetail.naver"
+    match = http.scrape(url, NAVER_GOLD_EXTRACTOR, timeout=15, cache="krx:naver-desktop")
+    price = float(match.group(1).replace(",", ""))
+    print(f"  [KRX Gold] 국내 금현물 = {price:,.0f} 원/g  (데스크톱 파싱)")
+    return price
+
+
+# ── 국제 금 ─────────────────────────────────────────────
+
+@register_provider("gold:swissquote", "Swissquote", "intl_gold_usd_oz", 10,
+                   validate=_validate_gold_usd_oz)
+def _gold_from_swissquote(http: HttpClient) -> float:
+    url  = f"{SOURCE_BASE_URLS['swissquote']}/public-quotes/bboquotes/instrument/XAU/USD"
+    resp = http.get(url)
+    resp.raise_for_status()
+    data   = resp.json()
+    prices = data[0]["spreadProfilePrices"][0]
+    bid    = prices["bid"]
+    ask    = prices["ask"]
+    spot   = (bid + ask) / 2
+
+    print(f"  [Swissquote] XAU/USD = ${spot:,.2f}/oz  (bid ${bid:,.2f} / ask ${ask:,.2f})")
+    return spot
+
+
+@register_provider("gold:yahoo", "Yahoo", "intl_gold_usd_oz", 20,
+                   validate=_validate_gold_usd_oz)
+def _gold_from_yahoo(http: HttpClient) -> float:
+    print("  [Yahoo] 폴백: GC=F 금 선물 시도...")
+    ticker = _yfinance().Ticker("GC=F")
+    try:
+        price = float(ticker.fast_info.last_price)
+    except Exception:
+        hist = ticker.history(period="1d")
+        if hist.empty:
+            raise RuntimeError("yfinance 히스토리 데이터 없음")
+        price = float(hist["Close"].iloc[-1])
+
+    print(f"  [Yahoo] 국제 금 선물 = ${price:,.2f}/oz")
+    return price
+
+
+# ── 자산별 진입점 (레지스트리 폴백 체인) ────────────────
+
+def get_upbit_usdt_price(http: HttpClient = None) -> float:
+    return fetch_asset("upbit_usdt", http)
+
+
+def get_usd_krw_rate(http: HttpClient = None) -> float:
+    return fetch_asset("usd_krw", http)
+
+
+def get_krx_gold_price_per_gram(http: HttpClient = None) -> float:
+    return fetch_asset("krx_gold_krw_g", http)
+
+
+def get_international_gold_usd_per_oz(http: HttpClient = None) -> float:
+    return fetch_asset("intl_gold_usd_oz", http)
+
+
+# ── 다중 자산: Upbit 배치 + 해외 USD 기준가 ────────────
+
+OFFSHORE_SOURCES = {}
+
+
+def register_offshore_source(name: str):
+    """
+    해외 기준가 소스 fn(http, symbols) -> {symbol: USD 가격} 등록 데코레이터
+    (OFFSHORE_PRICE_SOURCE 환경변수로 선택, 소스당 요청 1회)
+    """
+    def decorator(fn):
+        OFFSHORE_SOURCES[name] = fn
+        return fn
+    return decorator
+
+
+@register_offshore_source("binance")
+def _offshore_from_binance(http: HttpClient, symbols: list) -> dict:
+    # USDT 마켓 가격을 USD로 간주 (테더 디페그 시 오차 — 필요하면 coinbase 사용)
+    pairs = json.dumps([f"{sym}USDT" for sym in symbols], separators=(",", ":"))
+    resp  = http.get(f"{SOURCE_BASE_URLS['binance']}/api/v3/ticker/price", params={"symbols": pairs})
+    resp.raise_for_status()
+    return {item["symbol"][:-4]: float(item["price"]) for item in resp.json()}
+
+
+@register_offshore_source("coinbase")
+def _offshore_from_coinbase(http: HttpClient, symbols: list) -> dict:
+    # 1 USD당 코인 수량 → 역수가 USD 가격
+    resp = http.get(f"{SOURCE_BASE_URLS['coinbase']}/v2/exchange-rates", params={"currency": "USD"})
+    resp.raise_for_status()
+    rates = resp.json()["data"]["rates"]
+    return {sym: 1 / float(rates[sym]) for sym in symbols if float(rates.get(sym) or 0) > 0}
+
+
+# ── 국내 거래소 어댑터 (교차 비교용) ─────────────────
+
+VENUES = {}   # Upbit은 fetch_upbit_tickers 배치 결과를 재사용하므로 등록하지 않음
+VENUE_NAMES = {"upbit": "Upbit", "bithumb": "Bithumb", "korbit": "Korbit", "coinone": "Coinone"}
+VENUE_BASE_URLS = {
+    name: os.environ.get(f"VENUE_BASE_URL_{name.upper()}") or default
+    for name, default in (
+        ("upbit",   "https://api.upbit.com"),
+        ("bithumb", "https://api.bithumb.com"),
+        ("korbit",  "https://api.korbit.co.kr"),
+        ("coinone", "https://api.coinone.co.kr"),
+    )
+}
+
+
+def register_venue(name: str):
+    """
+    국내 거래소 어댑터 fn(http, symbols) -> {symbol: KRW 가격} 등록 데코레이터
+    (거래소당 요청 1회 — 전 종목 / 다중 심볼 엔드포인트 사용)
+    """
+    def decorator(fn):
+        VENUES[name] = fn
+        return fn
+    return decorator
+
+
+@register_venue("bithumb")
+def _venue_bithumb(http: HttpClient, symbols: list) -> dict:
+    resp = http.get(f"{VENUE_BASE_URLS['bithumb']}/public/ticker/ALL_KRW")
+    resp.raise_for_status()
+    data = resp.json()
+    if data.get("status") != "0000":
+        raise ValueError(f"응답 상태 이상: {data.get('status')}")
+    return {sym: float(data["data"][sym]["closing_price"])
+            for sym in symbols if sym in data["data"]}
+
+
+@register_venue("korbit")
+def _venue_korbit(http: HttpClient, symbols: list) -> dict:
+    pairs = ",".join(f"{sym.lower()}_krw" for sym in symbols)
+    resp  = http.get(f"{VENUE_BASE_URLS['korbit']}/v2/tickers", params={"symbol": pairs})
+    resp.raise_for_status()
+    data = resp.json()
+    if not data.get("success"):
+        raise ValueError(f"응답 형식 이상: success={data.get('success')}")
+    return {item["symbol"].split("_")[0].upper(): float(item["close"]) for item in data["data"]}
+
+
+@register_venue("coinone")
+def _venue_coinone(http: HttpClient, symbols: list) -> dict:
+    resp = http.get(f"{VENUE_BASE_URLS['coinone']}/public/v2/ticker_new/KRW")
+    resp.raise_for_status()
+    data = resp.json()
+    if data.get("result") != "success":
+        raise ValueError(f"응답 상태 이상: {data.get('error_code')}")
+    wanted = set(symbols)
+    return {t["target_currency"].upper(): float(t["last"]) for t in data["tickers"]
+            if t["target_currency"].upper() in wanted}
+
+
+def fetch_venue_prices(venue: str, symbols: list, http: HttpClient = None) -> dict:
+    http   = http or get_http_client()
+    prices = VENUES[venue](http, symbols)
+    for price in prices.values():
+        _validate_positive(price)
+    if not prices:
+        raise ValueError(f"{VENUE_NAMES.get(venue, venue)}: 감시 자산 시세 없음")
+    return prices
+
+
+def extra_kimp_assets() -> list:
+    """USDT(기존 폴백 체인 · 스트림으로 조회) 외의 감시 자산"""
+    return [sym for sym in KIMP_ASSETS if sym != "USDT"]
+
+
+def fetch_offshore_prices(symbols: list, http: HttpClient = None) -> dict:
+    http   = http or get_http_client()
+    source = OFFSHORE_SOURCES[OFFSHORE_PRICE_SOURCE]
+    prices = source(http, symbols)
+    missing = [sym for sym in symbols if sym not in prices]
+    if missing:
+        raise ValueError(f"{OFFSHORE_PRICE_SOURCE}: 기준가 없음 ({', '.join(missing)})")
+    return prices
+
+
+# ═══════════════════════════════════════════════════════
+#  거래 시간 (시장 개장 캘린더)
+# ═══════════════════════════════════════════════════════
+
+# KRX 휴장일 (주말 제외 — 설 · 추석 · 대체공휴일 · 선거일 · 근로자의 날 · 연말 휴장일)
+# 목록에 없는 연도는 주말만 휴장으로 판단
+KRX_HOLIDAYS = frozenset([
+    "2025-01-01", "2025-01-27", "2025-01-28", "2025-01-29", "2025-01-30", "2025-03-03",
+    "2025-05-01", "2025-05-05", "2025-05-06", "2025-06-03", "2025-06-06", "2025-08-15",
+    "2025-10-03", "2025-10-06", "2025-10-07", "2025-10-08", "2025-10-09", "2025-12-25",
+    "2025-12-31",
+    "2026-01-01", "2026-02-16", "2026-02-17", "2026-02-18", "2026-03-02", "2026-05-01",
+    "2026-05-05", "2026-05-25", "2026-06-03", "2026-08-17", "2026-09-24", "2026-09-25",
+    "2026-10-05", "2026-10-09", "2026-12-25", "2026-12-31",
+    "2027-01-01", "2027-02-08", "2027-02-09", "2027-03-01", "2027-05-05", "2027-05-13",
+    "2027-08-16", "2027-09-14", "2027-09-15", "2027-09-16", "2027-10-04", "2027-10-11",
+    "2027-12-27", "2027-12-31",
+    *(d.strip() for d in MARKET_HOLIDAYS.split(",") if d.strip()),
+])
+
+
+def parse_session(spec: str) -> tuple:
+    """"09:00-15:30" → ((9, 0), (15, 30))"""
+    try:
+        start, end = spec.split("-")
+        return tuple(tuple(int(x) for x in part.strip().split(":")) for part in (start, end))
+    except ValueError:
+        raise ValueError(f"세션 형식 오류 (HH:MM-HH:MM): {spec!r}") from None
+
+
+@dataclass(frozen=True)
+class TradingCalendar:
+    """
+    시장 하나의 개장 시간 — 거래일마다 시작하는 세션 하나 (KST)
+
+    마감이 개장보다 이르거나 같으면 다음 날 마감하는 세션 (예: 09:00-02:00, 07:00-07:00)
+    """
+    name: str
+    label: str
+    open_time: tuple     # (시, 분)
+    close_time: tuple
+    weekdays: tuple = (0, 1, 2, 3, 4)   # 세션이 시작하는 요일 (월=0)
+    holidays: frozenset = frozenset()
+
+    def is_trading_day(self, day) -> bool:
+        return day.weekday() in self.weekdays and day.isoformat() not in self.holidays
+
+    def session(self, day) -> tuple:
+        """day에 시작하는 세션의 (개장, 마감) 시각"""
+        start = datetime(day.year, day.month, day.day, *self.open_time, tzinfo=KST)
+        end   = datetime(day.year, day.month, day.day, *self.close_time, tzinfo=KST)
+        if end <= start:
+            end += timedelta(days=1)
+        return start, end
+
+    def is_open(self, now: datetime) -> bool:
+        today = now.astimezone(KST).date()
+        for day in (today, today - timedelta(days=1)):   # 전날 시작한 야간 세션 포함
+            if self.is_trading_day(day):
+                start, end = self.session(day)
+                if start <= now < end:
+                    return True
+        return False
+
+    def last_close(self, now: datetime, lookback_days: int = 14) -> Optional[datetime]:
+        """now 이전에 끝난 가장 최근 세션의 마감 시각"""
+        today = now.astimezone(KST).date()
+        for i in range(lookback_days):
+            day = today - timedelta(days=i)
+            if self.is_trading_day(day):
+                _, end = self.session(day)
+                if end <= now:
+                    return end
+        return None
+
+
+MARKET_CALENDARS = {
+    "krx":  TradingCalendar("krx", "KRX", *parse_session(KRX_SESSION), holidays=KRX_HOLIDAYS),
+    "fx":   TradingCalendar("fx", "서울 외환", *parse_session(FX_SESSION), holidays=KRX_HOLIDAYS),
+    "gold": TradingCalendar("gold", "국제 금", *parse_session(GOLD_SESSION)),
+}
+
+# 자산 → 시장 (목록에 없는 자산은 24시간 거래 — Upbit)
+ASSET_MARKETS = {
+    "usd_krw":          "fx",
+    "krx_gold_krw_g":   "krx",
+    "intl_gold_usd_oz": "gold",
+}
+
+
+def closed_market_value(asset: str, now: datetime, store: TickStore = None) -> Optional[tuple]:
+    """
+    자산의 시장이 닫혀 있고 마감 후 안정 시간이 지난 뒤의 값이 기록돼 있으면 (값, 기록 시각) — 아니면 None
+
+    마감 직후에는 계속 조회해 최종 종가를 한 번 기록하고, 그 뒤로는 기록된 종가를 재사용합니다.
+    """
+    market = ASSET_MARKETS.get(asset)
+    if not MARKET_HOURS_ENABLED or market is None:
+        return None
+    calendar = MARKET_CALENDARS[market]
+    if calendar.is_open(now):
+        return None
+    closed_at = calendar.last_close(now)
+    if closed_at is None:
+        return None
+    settled = closed_at + timedelta(minutes=MARKET_CLOSE_SETTLE_MIN)
+    if now < settled:
+        return None
+    entry = (store or get_tick_store()).latest(require=(asset,))
+    if entry is None or entry["ts"] < settled.timestamp():
+        return None
+    return entry[asset], entry["ts"]
+
+
+# ═══════════════════════════════════════════════════════
+#  동시 수집
+# ═══════════════════════════════════════════════════════
+
+@dataclass
+class MarketSnapshot:
+    """
+    한 번의 수집 결과 — 실패한 항목은 None, 실패 사유는 errors에 기록
+    """
+    time: datetime
+    usd_krw: Optional[float] = None
+    upbit_usdt: Optional[float] = None
+    krx_gold_krw_g: Optional[float] = None
+    intl_gold_usd_oz: Optional[float] = None
+    coins: dict = field(default_factory=dict)     # 심볼 → Upbit KRW 가격 (USDT 외 감시 자산)
+    offshore: dict = field(default_factory=dict)  # 심볼 → 해외 USD 가격 (스테이블코인 제외)
+    venues: dict = field(default_factory=dict)    # 거래소 → {심볼: KRW 가격} (KIMP_VENUES)
+    errors: dict = field(default_factory=dict)
+    sources: dict = field(default_factory=dict)   # 자산 → 채택된 Provider id
+    latency: dict = field(default_factory=dict)   # 자산 → 체인 소요 시간(초)
+    cache: dict = field(default_factory=dict)     # 자산 → (hit / revalidated / stale / closed, age초)
+    elapsed: float = 0.0
+
+
+def format_cache_ages(snapshot: "MarketSnapshot") -> str:
+    """캐시에서 나온 항목과 나이 — "USD/KRW 12분 전(hit) · KRX 금현물 3초 전(revalidated)" """
+    parts = []
+    for asset, (status, age) in snapshot.cache.items():
+        age_str = f"{age / 60:.0f}분 전" if age >= 60 else f"{age:.0f}초 전"
+        parts.append(f"{ASSET_LABELS.get(asset, asset)} {age_str}({status})")
+    return " · ".join(parts)
+
+
+def collect_market_snapshot(now: datetime = None, http: HttpClient = None) -> MarketSnapshot:
+    """
+    네 가지 시세를 스레드 풀에서 동시에 조회합니다.
+
+    전체 소요 시간은 가장 느린 단일 소스 수준이며,
+    한 자산의 실패는 다른 자산의 수집에 영향을 주지 않습니다.
+    휴장 중인 시장의 자산은 조회하지 않고 기록된 종가를 사용합니다 (closed_market_value).
+    """
+    http     = http or get_http_client()
+    snapshot = MarketSnapshot(time=now or datetime.now(KST))
+    started  = time.monotonic()
+
+    assets = []
+    for asset in ASSET_LABELS:
+        closed = closed_market_value(asset, snapshot.time)
+        if closed is None:
+            assets.append(asset)
+            continue
+        value, recorded = closed
+        setattr(snapshot, asset, value)
+        snapshot.sources[asset] = f"closed:{ASSET_MARKETS[asset]}"
+        snapshot.cache[asset]   = ("closed", snapshot.time.timestamp() - recorded)
+        METRICS.inc("kimp_market_closed_skips_total", {"market": ASSET_MARKETS[asset]})
+    if len(assets) < len(ASSET_LABELS):
+        print("  [Market] 휴장 — 종가 재사용: " + ", ".join(
+            f"{ASSET_LABELS[a]}({MARKET_CALENDARS[ASSET_MARKETS[a]].label})"
+            for a in ASSET_LABELS if a not in assets))
+
+    extra   = extra_kimp_assets()
+    coins   = [sym for sym in extra if sym not in STABLECOINS]
+    others  = [v for v in KIMP_VENUES if v != "upbit"]   # Upbit 행은 기존 조회 결과 재사용
+    n_jobs  = len(assets) + bool(extra) + bool(coins) + len(others)
+
+    with ThreadPoolExecutor(max_workers=n_jobs, thread_name_prefix="fetch") as pool:
+        futures = {pool.submit(fetch_asset_detail, asset, http): asset for asset in assets}
+        if extra:
+            markets = [f"KRW-{sym}" for sym in extra]
+            futures[pool.submit(fetch_upbit_tickers, http, markets)] = "coins"
+        if coins:
+            futures[pool.submit(fetch_offshore_prices, coins, http)] = "offshore"
+        for venue in others:
+            futures[pool.submit(fetch_venue_prices, venue, KIMP_ASSETS, http)] = f"venue:{venue}"
+        for future in as_completed(futures):
+            asset = futures[future]
+            try:
+                result = future.result()
+                if asset.startswith("venue:"):
+                    snapshot.venues[asset[6:]] = result
+                elif asset == "coins":
+                    snapshot.coins = {m[4:]: p for m, p in result.items()}
+                elif asset == "offshore":
+                    snapshot.offshore = result
+                else:
+                    setattr(snapshot, asset, result.value)
+                    snapshot.sources[asset] = result.source
+                    snapshot.latency[asset] = round(result.elapsed, 3)
+                    if result.cache:
+                        snapshot.cache[asset] = result.cache
+            except Exception as e:
+                snapshot.errors[asset] = e
+
+    if others and "upbit" in KIMP_VENUES:
+        upbit = dict(snapshot.coins)
+        if snapshot.upbit_usdt is not None and "USDT" in KIMP_ASSETS:
+            upbit["USDT"] = snapshot.upbit_usdt
+        snapshot.venues["upbit"] = upbit
+    snapshot.venues = {v: snapshot.venues[v] for v in KIMP_VENUES if v in snapshot.venues}
+
+    snapshot.elapsed = time.monotonic() - started
+    print(f"  [Collect] 수집 완료 {snapshot.elapsed:.2f}s  "
+          f"(성공 {n_jobs - len(snapshot.errors)}/{n_jobs})")
+    if snapshot.cache:
+        print(f"  [Cache] {format_cache_ages(snapshot)}")
+    if extra and "coins" not in snapshot.errors:
+        print(f"  [Upbit] 배치 {len(extra)}개 마켓: "
+              + "  ".join(f"{sym} {p:,.0f}" for sym, p in snapshot.coins.items()))
+    return snapshot
+
+
+# ═══════════════════════════════════════════════════════
+#  김프 계산 (기존과 동일)
+# ═══════════════════════════════════════════════════════
+
+def calc_usdt_kimp(upbit_usdt: float, usd_krw: float) -> float:
+    return ((upbit_usdt - usd_krw) / usd_krw) * 100
+
+
+def calc_asset_kimps(snapshot: "MarketSnapshot") -> dict:
+    """
+    USDT 외 감시 자산의 김프 — 스테이블코인은 환율, 코인은 해외 USD 가격 × 환율 기준
+
+    Returns:
+        {심볼: (김프 %, Upbit KRW 가격, 기준 KRW 가격)}  (조회 실패 자산은 제외)
+    """
+    result = {}
+    for sym, price in snapshot.coins.items():
+        if sym in STABLECOINS:
+            ref = snapshot.usd_krw
+        elif sym in snapshot.offshore:
+            ref = snapshot.offshore[sym] * snapshot.usd_krw
+        else:
+            continue
+        result[sym] = ((price - ref) / ref * 100, price, ref)
+    return result
+
+
+def _numpy():
+    """
+    numpy는 기동 시간 예산(STARTUP_BUDGET_MS)을 넘기므로 거래소 행렬 계산 시에만 import
+    """
+    import numpy
+    return numpy
+
+
+@dataclass
+class VenueMatrix:
+    """
+    거래소 × 자산 김프 행렬 (조회 실패 칸은 NaN)
+
+    spread[j] = 자산 j의 거래소 간 최대 - 최소 김프 (%p)
+    best[j] / worst[j] = 김프가 가장 높은 / 낮은 거래소 인덱스
+    """
+    venues: list
+    assets: list
+    prices: object     # (V, A) KRW 가격
+    ref: object        # (A,)   기준 KRW 가격
+    premium: object    # (V, A) 김프 %
+    spread: object     # (A,)
+    best: object       # (A,)
+    worst: object      # (A,)
+
+    def cell(self, venue: str, asset: str) -> Optional[float]:
+        v = self.premium[self.venues.index(venue), self.assets.index(asset)]
+        return None if v != v else float(v)
+
+
+def calc_venue_matrix(snapshot: "MarketSnapshot") -> Optional[VenueMatrix]:
+    """
+    snapshot.venues로 거래소 × 자산 김프 행렬을 한 번에 계산
+    (기준가가 없거나 어느 거래소에도 시세가 없는 자산은 제외)
+    """
+    np = _numpy()
+    venues = list(snapshot.venues)
+    assets = [sym for sym in KIMP_ASSETS
+              if (sym in STABLECOINS or sym in snapshot.offshore)
+              and any(sym in snapshot.venues[v] for v in venues)]
+    if not venues or not assets or snapshot.usd_krw is None:
+        return None
+
+    prices = np.array([[snapshot.venues[v].get(sym, np.nan) for sym in assets] for v in venues],
+                      dtype=float)
+    ref = np.array([1.0 if sym in STABLECOINS else snapshot.offshore[sym] for sym in assets]
+                   ) * snapshot.usd_krw
+    premium = (prices / ref - 1.0) * 100
+    filled_hi = np.where(np.isnan(premium), -np.inf, premium)
+    filled_lo = np.where(np.isnan(premium),  np.inf, premium)
+    best  = filled_hi.argmax(axis=0)
+    worst = filled_lo.argmin(axis=0)
+    cols  = np.arange(len(assets))
+    spread = premium[best, cols] - premium[worst, cols]
+    return VenueMatrix(venues, assets, prices, ref, premium, spread, best, worst)
+
+
+def calc_gold_kimp(
+    krx_gold_krw_g: float,
+    intl_gold_usd_oz: float,
+    usd_krw: float,
+) -> tuple:
+    intl_gold_krw_g = (intl_gold_usd_oz * usd_krw) / TROY_OUNCE_TO_GRAM
+    kimp = ((krx_gold_krw_g - intl_gold_krw_g) / intl_gold_krw_g) * 100
+    return kimp, intl_gold_krw_g
+
+
+# ═══════════════════════════════════════════════════════
+#  알림
+# ═══════════════════════════════════════════════════════
+
+class TokenBucket:
+    """
+    토큰 버킷 — 초당 rate개 보충, 최대 burst개 저장. acquire()는 토큰이 생길 때까지 대기
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate   = rate
+        self.burst  = burst
+        self.tokens = float(burst)
+        self.stamp  = time.monotonic()
+        self._lock  = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp  = now
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            self.tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """서버가 retry_after를 주면 그만큼 토큰을 비워 후속 메시지도 대기"""
+        with self._lock:
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class RateLimited(RuntimeError):
+    """싱크가 429로 응답 — retry_after초 후 재시도"""
+
+    def __init__(self, retry_after: float, detail: str = ""):
+        super().__init__(f"429 rate limited (retry_after={retry_after:g}s) {detail}".strip())
+        self.retry_after = retry_after
+
+
+class NotificationSink:
+    """
+    알림 수신처 하나 — send()는 실패 시 예외, 429면 RateLimited
+    chat_id는 구독자 전송용 (Telegram만 사용)
+    """
+    name = "sink"
+    max_chars = None
+    bucket: Optional[TokenBucket] = None
+
+    def send(self, message: str, http: HttpClient, chat_id: str = None):
+        raise NotImplementedError
+
+
+class TelegramSink(NotificationSink):
+    name = "Telegram"
+    max_chars = TELEGRAM_MAX_CHARS
+
+    def __init__(self, token: str, chat_id: str, base_url: str = None,
+                 name: str = None, rate: float = None, burst: int = 3):
+        self.url     = f"{base_url or TELEGRAM_API_URL}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.name    = name or self.name
+        self.bucket  = TokenBucket(rate or TELEGRAM_RATE_PER_SEC, burst=burst)
+
+    def send(self, message: str, http: HttpClient, chat_id: str = None):
+        payload = {"chat_id": chat_id or self.chat_id, "text": message, "parse_mode": "HTML"}
+        resp = http.post(self.url, json=payload)
+        if resp.ok:
+            return
+        try:
+            body = resp.json()
+        except Exception:
+            body = {}
+        err = body.get("description", resp.text)
+        if resp.status_code == 429:
+            raise RateLimited(float(body.get("parameters", {}).get("retry_after", 1)), err)
+        raise RuntimeError(f"{resp.status_code} — {err}")
+
+
+class WebhookSink(NotificationSink):
+    """범용 JSON 웹훅 — {"text": 본문(HTML 태그 제거), "html": 원문}"""
+    name = "Webhook"
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def send(self, message: str, http: HttpClient, chat_id: str = None):
+        resp = http.post(self.url, json={"text": re.sub(r"<[^>]+>", "", message), "html": message})
+        if resp.status_code == 429:
+            raise RateLimited(float(resp.headers.get("Retry-After") or 1))
+        resp.raise_for_status()
+
+
+class DiscordSink(NotificationSink):
+    name = "Discord"
+    max_chars = 2000
+
+    def __init__(self, url: str):
+        self.url    = url
+        self.bucket = TokenBucket(DISCORD_RATE_PER_SEC, burst=5)
+
+    def send(self, message: str, http: HttpClient, chat_id: str = None):
+        content = re.sub(r"</?b>", "**", message)
+        content = re.sub(r"<[^>]+>", "", content)
+        resp = http.post(self.url, json={"content": content})
+        if resp.status_code == 429:
+            try:
+                retry_after = float(resp.json().get("retry_after", 1))
+            except Exception:
+                retry_after = float(resp.headers.get("Retry-After") or 1)
+            raise RateLimited(retry_after)
+        resp.raise_for_status()
+
+
+def split_message(message: str, limit: int) -> list:
+    """병합 메시지를 알림 경계(빈 줄)에서 limit자 이하 조각으로 분할 (한 블록이 넘치면 split_html)"""
+    if limit is None or len(message) <= limit:
+        return [message]
+    parts, current = [], ""
+    for block in message.split("\n\n"):
+        candidate = f"{current}\n\n{block}" if current else block
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            parts.append(current)
+        *full, current = split_html(block, limit)
+        parts.extend(full)
+    if current:
+        parts.append(current)
+    return parts
+
+
+_HTML_TAG = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9-]*)[^>]*>")
+
+
+def _open_tags(html: str) -> list:
+    """닫히지 않은 태그 [(이름, 여는 태그 원문)] (바깥쪽부터)"""
+    stack = []
+    for m in _HTML_TAG.finditer(html):
+        name = m.group(2).lower()
+        if not m.group(1):
+            stack.append((name, m.group(0)))
+        elif stack and stack[-1][0] == name:
+            stack.pop()
+    return stack
+
+
+def split_html(text: str, limit: int) -> list:
+    """
+    parse_mode=HTML 텍스트를 limit자 이하로 분할 — 줄 경계 우선, 태그 · 엔티티 중간은 자르지 않음
+    조각 끝에서 열린 태그를 닫고 다음 조각 앞에서 다시 열어 각 조각이 독립적으로 유효
+    """
+    parts = []
+    while len(text) > limit:
+        cut = limit
+        while True:
+            head = text[:cut]
+            newline = head.rfind("\n")
+            if newline > limit // 2:
+                head = head[:newline]
+            else:
+                if head.rfind("<") > head.rfind(">"):
+                    head = head[:head.rfind("<")]
+                if head.rfind("&") > head.rfind(";"):
+                    head = head[:head.rfind("&")]
+            head    = head or text[:cut]   # 태그 하나가 limit보다 긴 경우
+            opened  = _open_tags(head)
+            closing = "".join(f"</{name}>" for name, _ in reversed(opened))
+            if len(head) + len(closing) <= limit or cut <= 1:
+                break
+            cut = min(cut - 1, limit - len(closing))
+        parts.append(head + closing)
+        text = "".join(tag for _, tag in opened) + text[len(head):].lstrip("\n")
+    if text:
+        parts.append(text)
+    return parts
+
+
+class NotificationDispatcher:
+    """
+    비동기 알림 전송
+
+    - notify(messages): 같은 회차의 알림을 한 메시지로 병합해 큐에 넣고 즉시 반환
+    - 싱크마다 전용 전송 스레드 → 싱크 간 동시 전송, 싱크 안에서는 순서 유지
+    - 토큰 버킷 속도 제한, 실패 시 지수 백오프 재시도 (429는 retry_after 준수)
+    - flush()/close(): 1회 실행 종료 전 남은 메시지 전송 대기
+    - notify(messages, chat_id=...): 구독자 채팅 전용 싱크(subscriber_sink) 한 곳으로만 전송
+      (수천 채팅을 스레드 하나 + 봇 전체 속도 제한 토큰 버킷으로 처리)
+    - on_done(ok): 전송 스레드에서 모든 조각 전송 성공 / 포기 후 호출 (큐에 남은 채 close되면 호출 안 됨)
+    """
+
+    SEPARATOR = "\n\n— — —\n\n"
+
+    def __init__(self, sinks: list, http: HttpClient = None,
+                 subscriber_sink: NotificationSink = None):
+        self.sinks   = list(sinks)
+        self.subscriber_sink = subscriber_sink
+        self.http    = http or get_http_client()
+        every        = self.sinks + ([subscriber_sink] if subscriber_sink else [])
+        self.sent    = {sink.name: 0 for sink in every}
+        self.dropped = {sink.name: 0 for sink in every}
+        self._queues = {}
+        self._threads = []
+        for sink in every:
+            q = queue.Queue()
+            t = threading.Thread(target=self._worker, args=(sink, q),
+                                 name=f"notify-{sink.name}", daemon=True)
+            self._queues[sink.name] = q
+            self._threads.append(t)
+            t.start()
+
+    def notify(self, messages: list, chat_id: str = None, on_done: Callable = None) -> int:
+        """
+        알림 목록을 하나로 병합해 모든 싱크 큐에 추가 — 추가된 메시지 수(0/1) 반환
+        chat_id: 구독자 채팅 하나에만 전송 (on_done: 전송 결과 콜백)
+        """
+        messages = [m for m in messages if m]
+        if not messages:
+            return 0
+        merged = self.SEPARATOR.join(messages)
+        if chat_id is not None:
+            if self.subscriber_sink is None:
+                return 0
+            self._queues[self.subscriber_sink.name].put((merged, chat_id, on_done))
+            return 1
+        if not self.sinks:
+            print("  [Notify] 설정된 알림 수신처 없음 — 전송 건너뜀")
+            return 0
+        for sink in self.sinks:
+            self._queues[sink.name].put((merged, None, None))
+        return 1
+
+    def _worker(self, sink: NotificationSink, q: queue.Queue):
+        while True:
+            item = q.get()
+            try:
+                if item is None:
+                    return
+                message, chat_id, on_done = item
+                ok = all(self._deliver(sink, part, chat_id)
+                         for part in split_message(message, sink.max_chars))
+                if on_done:
+                    on_done(ok)
+            finally:
+                q.task_done()
+
+    def _deliver(self, sink: NotificationSink, message: str, chat_id: str = None) -> bool:
+        delay = NOTIFY_BACKOFF_SEC
+        target = f" → {chat_id}" if chat_id else ""
+        for attempt in range(NOTIFY_RETRIES + 1):
+            if sink.bucket:
+                sink.bucket.acquire()
+            try:
+                sink.send(message, self.http, chat_id)
+                self.sent[sink.name] += 1
+                print(f"  [{sink.name}] 알림 전송 성공{target}")
+                return True
+            except RateLimited as e:
+                err, wait = e, e.retry_after
+                if sink.bucket:     # 다음 acquire()가 retry_after만큼 대기
+                    sink.bucket.penalize(wait)
+                    wait = 0.0
+            except Exception as e:
+                err, wait = e, delay * random.uniform(0.8, 1.2)
+                delay *= 2
+            if attempt < NOTIFY_RETRIES:
+                print(f"  [{sink.name}] 전송 실패{target}: {err} — 재시도 {attempt + 1}/{NOTIFY_RETRIES}")
+                time.sleep(wait)
+        self.dropped[sink.name] += 1
+        print(f"  [{sink.name}] 전송 포기{target} ({NOTIFY_RETRIES + 1}회 시도): {err}")
+        return False
+
+    def flush_budget(self) -> float:
+        """
+        기본 대기 시간 — NOTIFY_FLUSH_SEC + 속도 제한 싱크가 남은 건수를 보내는 데 걸리는 시간
+        (구독자 수천 명이면 초당 25건 제한에 맞춰 늘어남, NOTIFY_FLUSH_MAX_SEC 상한)
+        """
+        backlog = max((q.unfinished_tasks / sink.bucket.rate
+                       for sink in self.sinks + [self.subscriber_sink]
+                       if sink is not None and sink.bucket
+                       for q in (self._queues[sink.name],)), default=0.0)
+        return min(NOTIFY_FLUSH_SEC + backlog, max(NOTIFY_FLUSH_SEC, NOTIFY_FLUSH_MAX_SEC))
+
+    def flush(self, timeout: float = None) -> bool:
+        """모든 싱크 큐가 빌 때까지 대기 (timeout 초과 시 False)"""
+        deadline = time.monotonic() + (timeout if timeout is not None else self.flush_budget())
+        for q in self._queues.values():
+            while q.unfinished_tasks:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.05)
+        return True
+
+    def close(self, timeout: float = None) -> bool:
+        done = self.flush(timeout)
+        for q in self._queues.values():
+            q.put(None)
+        if not done:
+            left = {name: q.unfinished_tasks for name, q in self._queues.items() if q.unfinished_tasks}
+            print("  [Notify] 전송 대기 시간 초과 — 남은 알림 버림 ("
+                  + ", ".join(f"{name} {n:,}건" for name, n in left.items()) + ")")
+        return done
+
+
+def configured_sinks() -> list:
+    sinks = []
+    if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+        sinks.append(TelegramSink(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID))
+    else:
+        print("  [Telegram] 토큰/채팅ID 미설정 — 알림 건너뜀")
+    if NOTIFY_WEBHOOK_URL:
+        sinks.append(WebhookSink(NOTIFY_WEBHOOK_URL))
+    if DISCORD_WEBHOOK_URL:
+        sinks.append(DiscordSink(DISCORD_WEBHOOK_URL))
+    return sinks
+
+
+def subscriber_sink() -> Optional[NotificationSink]:
+    """구독자 채팅 전송용 Telegram 싱크 — 봇 전체 초당 TELEGRAM_BROADCAST_RATE_PER_SEC건"""
+    if not (TELEGRAM_BOT_TOKEN and load_subscriptions()):
+        return None
+    return TelegramSink(TELEGRAM_BOT_TOKEN, None, name="Telegram 구독",
+                        rate=TELEGRAM_BROADCAST_RATE_PER_SEC, burst=int(TELEGRAM_BROADCAST_RATE_PER_SEC))
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier(http: HttpClient = None) -> NotificationDispatcher:
+    """
+    프로세스 공용 디스패처 (최초 호출 시 환경변수의 싱크로 생성)
+    """
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = NotificationDispatcher(configured_sinks(), http, subscriber_sink())
+        return _notifier
+
+
+def close_notifier(timeout: float = None):
+    global _notifier
+    with _notifier_lock:
+        notifier, _notifier = _notifier, None
+    if notifier is not None:
+        notifier.close(timeout)
+
+
+def send_telegram(message: str, http: HttpClient = None):
+    """단일 메시지 전송 (비동기 — 디스패처 큐에 추가)"""
+    get_notifier(http).notify([message])
+
+
+# ═══════════════════════════════════════════════════════
+#  Upbit 실시간 스트림 (WebSocket)
+# ═══════════════════════════════════════════════════════
+
+class UpbitTickerStream:
+    """
+    Upbit WebSocket ticker 구독 — 마켓별 최신 체결가를 메모리에 유지
+
+    - 연결이 끊기면 지수 백오프(지터 포함)로 재연결, 연결 성공 시 백오프 초기화
+    - 수신 대기 중 WS_RECV_TIMEOUT_SEC 동안 조용하면 ping (Upbit 120초 유휴 종료 방지)
+    - 체결마다 on_trade(market, price, ts) 콜백 호출 (수신 스레드에서 실행)
+    """
+
+    def __init__(self, markets=("KRW-USDT",), url: str = None, on_trade: Callable = None):
+        self.markets  = list(markets)
+        self.url      = url or UPBIT_WS_URL
+        self.on_trade = on_trade
+        self._latest  = {}  # market → (price, 수신 시각 monotonic)
+        self._lock    = threading.Lock()
+        self._stop    = threading.Event()
+        self._thread  = None
+        self._ws      = None
+        self.connects = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="upbit-ws", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout)
+
+    def latest(self, market: str = "KRW-USDT", max_age: float = None) -> Optional[float]:
+        """
+        최신 체결가 (없거나 max_age초보다 오래되면 None)
+        """
+        with self._lock:
+            item = self._latest.get(market)
+        if item is None:
+            return None
+        price, received = item
+        if max_age is not None and time.monotonic() - received > max_age:
+            return None
+        return price
+
+    def _subscribe_message(self) -> str:
+        return json.dumps([
+            {"ticket": f"kimp-monitor-{os.getpid()}"},
+            {"type": "ticker", "codes": self.markets, "isOnlyRealtime": True},
+        ])
+
+    def _handle(self, raw):
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        msg    = json.loads(raw)
+        market = msg.get("code") or msg.get("cd")
+        price  = msg.get("trade_price", msg.get("tp"))
+        if market is None or price is None:
+            return
+        price = float(price)
+        with self._lock:
+            self._latest[market] = (price, time.monotonic())
+        if self.on_trade:
+            self.on_trade(market, price, msg.get("trade_timestamp", msg.get("ttms")))
+
+    def _run(self):
+        import websocket  # websocket-client — 스트리밍을 쓸 때만 필요
+
+        backoff = WS_BACKOFF_MIN_SEC
+        while not self._stop.is_set():
+            try:
+                self._ws = websocket.create_connection(self.url, timeout=WS_RECV_TIMEOUT_SEC)
+                self._ws.send(self._subscribe_message())
+                self.connects += 1
+                backoff = WS_BACKOFF_MIN_SEC
+                print(f"  [Upbit WS] 연결됨: {self.url} ({', '.join(self.markets)})")
+
+                while not self._stop.is_set():
+                    try:
+                        raw = self._ws.recv()
+                    except websocket.WebSocketTimeoutException:
+                        self._ws.ping()
+                        continue
+                    if not raw:
+                        raise ConnectionError("서버가 연결을 닫았습니다")
+                    try:
+                        self._handle(raw)
+                    except (ValueError, KeyError, TypeError) as e:
+                        print(f"  [Upbit WS] 메시지 무시: {e}")
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                delay = backoff * random.uniform(0.8, 1.2)
+                print(f"  [Upbit WS] 연결 끊김: {e} — {delay:.1f}s 후 재연결")
+                self._stop.wait(delay)
+                backoff = min(backoff * 2, WS_BACKOFF_MAX_SEC)
+            finally:
+                if self._ws is not None:
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+
+
+def register_stream_provider(stream: UpbitTickerStream):
+    """
+    스트림의 최신가를 Upbit REST보다 앞선 Provider로 등록
+    (WS_MAX_AGE_SEC보다 오래된 값이면 실패 처리 → REST 폴백)
+    같은 프로세스에서 다시 호출하면 기존 항목을 새 스트림으로 교체
+    """
+    def fetch(http: HttpClient) -> float:
+        price = stream.latest("KRW-USDT", max_age=WS_MAX_AGE_SEC)
+        if price is None:
+            raise RuntimeError(f"스트림 최신가 없음 (최대 {WS_MAX_AGE_SEC:g}s)")
+        print(f"  [Upbit WS] USDT/KRW = {price:,.2f}  (스트림)")
+        return price
+
+    PROVIDERS[:] = [p for p in PROVIDERS if p.id != "upbit:ws"]
+    PROVIDERS.append(Provider("upbit:ws", "Upbit WS", "upbit_usdt", 0, fetch, _validate_positive))
+
+
+# ═══════════════════════════════════════════════════════
+#  메인
+# ═══════════════════════════════════════════════════════
+
+class TickAborted(RuntimeError):
+    """환율 없이는 어떤 김프도 계산할 수 없어 회차를 중단"""
+
+
+def _print_banner(now: datetime, mode: str = ""):
+    print(f"\n{'='*57}")
+    print(f"  김치프리미엄 모니터  |  {now.strftime('%Y-%m-%d %H:%M:%S KST')}{mode}")
+    print(f"  테더: 방향성 알림  |  금: 단계별 알림 ({GOLD_KIMP_STEP}%p 간격)")
+    print(f"{'='*57}")
+
+
+def premium_thresholds(symbol: str) -> tuple:
+    """
+    자산별 (low, high) 임계값 — KIMP_LOW_<SYM> / KIMP_HIGH_<SYM>, 미설정 시 USDT 임계값
+    """
+    if symbol == "USDT":
+        return USDT_KIMP_LOW, USDT_KIMP_HIGH
+    low  = os.environ.get(f"KIMP_LOW_{symbol}")
+    high = os.environ.get(f"KIMP_HIGH_{symbol}")
+    return (float(low) if low else USDT_KIMP_LOW,
+            float(high) if high else USDT_KIMP_HIGH)
+
+
+# ═══════════════════════════════════════════════════════
+#  알림 규칙 (선언형 → 평가 계획으로 컴파일)
+# ═══════════════════════════════════════════════════════
+#
+# ALERT_RULES_FILE 형식 (YAML / JSON 동일 구조):
+#
+#   metrics:                      # 파생 지표 — 틱마다 한 번 계산해 모든 규칙이 공유
+#     usdt_btc_gap: "btc_kimp - usdt_kimp"   # 틱 값 · 앞선 파생 지표 · 숫자 · + - * / · abs/min/max만 허용
+#   rules:
+#     - metric: usdt_kimp         # 틱 값 이름 (usdt_kimp · gold_kimp · <sym>_kimp · usd_krw · 파생 지표 ...)
+#       op: "<="                  # <= · < · >= · >
+#       threshold: -1.0
+#       hysteresis: 0.2           # 기준선 ± 이만큼 회복해야 상태 초기화 (기본 0)
+#       step: 0.5                 # 있으면 단계별 알림 (realert 기본 step)
+#       realert: worsen           # worsen(악화 시) · step(새 단계) · once · always · cooldown
+#       cooldown_min: 60          # realert=cooldown
+#       group: usdt               # 같은 그룹 규칙은 한쪽이 충족되면 나머지 상태 초기화 (기본: metric에서 _kimp 제거)
+#       id: usdt_low              # 알림 상태 키 (기본: <group>_low / <group>_high)
+#       template: "..."           # str.format — {value} {threshold} {cond} {reason} {emoji} {name} {time} {detail} + 틱 값
+#       record: [usd_krw]         # 알림 상태에 함께 저장할 틱 값
+#
+# 이름(metric · record · 식의 변수)은 tick_value_names()와 앞서 정의한 파생 지표만 허용 — 그 밖은 로드 시 오류.
+# 규칙 파일이 없으면 USDT_KIMP_* / GOLD_KIMP_* / KIMP_*_<SYM> 으로 기존과 같은 기본 규칙을 만듭니다.
+# 이상 변동 규칙(그룹 usdt_anomaly · gold_anomaly, 지표 <usdt|gold>_kimp_z_abs)과 거래소 교차 규칙
+# (그룹 venue_<sym>_low · venue_<sym>_high · spread_<sym>, 지표 venue_<sym>_min · _max · _spread)은
+# 파일이 같은 그룹을 정의하지 않으면 늘 덧붙습니다 — 기준 · 쿨다운 · 템플릿을 바꾸려면 같은 그룹으로 다시 정의하세요.
+
+PREMIUM_TEMPLATE = (
+    "{emoji} <b>{name} 김프 알림</b> ({cond}, {reason})\n"
+    "김프: <b>{value:+.2f}%</b>\n"
+    "{detail}"
+    "⏰ {time}"
+)
+GOLD_TEMPLATE = (
+    "{emoji} <b>{name} 김프 알림</b> ({cond}, {reason})\n"
+    "김프: <b>{value:+.2f}%</b>\n"
+    "{detail}"
+    "\n{driver_analysis}\n"
+    "\n⏰ {time}"
+)
+GOLD_RECORD = ("usd_krw", "intl_gold_usd_oz", "krx_gold_krw_g")
+
+
+
+
+def anomaly_template(metric: str, label: str) -> str:
+    """이상 변동 알림 본문 — update_anomaly_stats가 넣는 <metric>_* 틱 값으로 구성"""
+    return (
+        f"⚡ <b>{label} 이상 변동</b> (z={{{metric}_z:+.1f}}, 기준 |z|≥{{threshold:g}})\n"
+        f"김프: <b>{{{metric}:+.2f}}%</b>\n"
+        f"EWMA: {{{metric}_ewma:+.2f}}% ± {{{metric}_ewma_std:.2f}}%p (반감기 {STATS_HALFLIFE_MIN:g}분)\n"
+        f"분포: {{{metric}_dist}}\n"
+        "⏰ {time}"
+    )
+
+
+def venue_premium_template(group: str, side: str) -> str:
+    """거래소 교차 방향성 알림 본문 — side: min(최저 김프 거래소) / max(최고)"""
+    return (
+        f"{{emoji}} <b>{{name}} 김프 알림 — {{venue_{group}_{side}_name}}</b> ({{cond}}, {{reason}})\n"
+        f"김프: <b>{{value:+.2f}}%</b>  (거래소 간 괴리 {{venue_{group}_spread:.2f}}%p)\n"
+        f"{{venue_{group}_table}}\n"
+        "⏰ {time}"
+    )
+
+
+def venue_spread_template(group: str) -> str:
+    """거래소 간 괴리 알림 본문"""
+    return (
+        f"{{emoji}} <b>{{name}} 거래소 괴리</b> (괴리 {{cond}}p, {{reason}})\n"
+        f"괴리: <b>{{value:.2f}}%p</b>  ({{venue_{group}_max_name}} {{venue_{group}_max:+.2f}}% ↔ "
+        f"{{venue_{group}_min_name}} {{venue_{group}_min:+.2f}}%)\n"
+        f"{{venue_{group}_table}}\n"
+        "⏰ {time}"
+    )
+
+
+def tick_value_names() -> frozenset:
+    """
+    run_tick이 규칙 평가에 넘기는 틱 값 이름 (KIMP_ASSETS 반영) — 규칙 · 파생 지표의 이름 검사 기준
+    """
+    names = {"usd_krw", "usdt_kimp", "upbit_usdt", "usdt_detail",
+             "gold_kimp", "krx_gold_krw_g", "intl_gold_usd_oz", "intl_gold_krw_g",
+             "driver_analysis", "gold_detail"}
+    for sym in extra_kimp_assets():
+        group = sym.lower()
+        names |= {f"{group}_price", f"{group}_ref", f"{group}_kimp", f"{group}_detail"}
+    for metric in ANOMALY_METRICS:
+        names |= {f"{metric}_z", f"{metric}_z_abs", f"{metric}_ewma", f"{metric}_ewma_std", f"{metric}_dist"}
+    for sym in KIMP_ASSETS:
+        g = sym.lower()
+        names |= {f"venue_{g}_{k}" for k in ("min", "max", "spread", "min_name", "max_name", "table")}
+    return frozenset(names)
+
+_RULE_OPS = {
+    "<=": (operator.le, "low",  "≤"),
+    "<":  (operator.lt, "low",  "<"),
+    ">=": (operator.ge, "high", "≥"),
+    ">":  (operator.gt, "high", ">"),
+}
+_REALERT_POLICIES = ("worsen", "step", "once", "always", "cooldown")
+_METRIC_BINOPS = {ast.Add: operator.add, ast.Sub: operator.sub,
+                  ast.Mult: operator.mul, ast.Div: operator.truediv}
+_METRIC_UNARY  = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+_METRIC_FUNCS  = {"abs": abs, "min": min, "max": max}
+
+
+def compile_metric(expr: str, where: str, known: frozenset = None) -> tuple:
+    """
+    파생 지표 식 → (fn(values), 참조 이름 집합) — 허용 외 구문 · known에 없는 이름은 ValueError
+    (eval 대신 AST를 직접 평가)
+    """
+    try:
+        tree = ast.parse(str(expr), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"{where}: 식 오류 ({e.msg})")
+    names = set()
+
+    def build(node) -> Callable:
+        if isinstance(node, ast.Name):
+            name = node.id
+            if known is not None and name not in known:
+                raise ValueError(f"{where}: 알 수 없는 값 {name!r} (틱 값 · 앞서 정의한 파생 지표만 사용 가능)")
+            names.add(name)
+            return lambda values: values[name]
+        if (isinstance(node, ast.Constant) and isinstance(node.value, (int, float))
+                and not isinstance(node.value, bool)):
+            value = node.value
+            return lambda values: value
+        if isinstance(node, ast.BinOp) and type(node.op) in _METRIC_BINOPS:
+            op, left, right = _METRIC_BINOPS[type(node.op)], build(node.left), build(node.right)
+            return lambda values: op(left(values), right(values))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _METRIC_UNARY:
+            op, operand = _METRIC_UNARY[type(node.op)], build(node.operand)
+            return lambda values: op(operand(values))
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in _METRIC_FUNCS and node.args and not node.keywords):
+            fn, args = _METRIC_FUNCS[node.func.id], [build(arg) for arg in node.args]
+            return lambda values: fn(*(arg(values) for arg in args))
+        raise ValueError(f"{where}: 허용되지 않는 식 {ast.unparse(node)!r} "
+                         f"(틱 값 · 숫자 · + - * / · {'/'.join(_METRIC_FUNCS)}만 가능)")
+
+    return build(tree.body), frozenset(names)
+
+
+def premium_detail(symbol: str, price_krw: float, usd_krw: float, ref_usd: float = None) -> str:
+    """방향성 알림 본문 상세 — ref_usd가 있으면 코인(해외 USD 가격 기준)"""
+    detail = f"Upbit {symbol}: {price_krw:,.0f}원\n"
+    if ref_usd is not None:
+        detail += f"해외: ${ref_usd:,.2f}  ({ref_usd * usd_krw:,.0f}원)\n"
+    return detail + f"환율: {usd_krw:,.2f}원\n"
+
+
+def gold_detail(krx_gold: float, intl_gold_krw_g: float, intl_gold_oz: float, usd_krw: float) -> str:
+    return (
+        f"국내: {krx_gold:,.0f}원/g\n"
+        f"국제: {intl_gold_krw_g:,.0f}원/g  (${intl_gold_oz:,.2f}/oz)\n"
+        f"환율: {usd_krw:,.2f}원\n"
+    )
+
+
+def default_alert_rules() -> dict:
+    """
+    환경변수 임계값으로 만든 기본 규칙 — 테더 · 추가 자산은 방향성, 금은 단계별
+    """
+    rules = []
+    for sym in ("USDT", *extra_kimp_assets()):
+        low, high = premium_thresholds(sym)
+        rules += [
+            {"metric": f"{sym.lower()}_kimp", "op": "<=", "threshold": low, "emoji": ["🔵", "🟡"]},
+            {"metric": f"{sym.lower()}_kimp", "op": ">=", "threshold": high},
+        ]
+    for op, threshold in (("<=", GOLD_KIMP_LOW), (">=", GOLD_KIMP_HIGH)):
+        rules.append({"metric": "gold_kimp", "op": op, "threshold": threshold,
+                      "step": GOLD_KIMP_STEP, "template": GOLD_TEMPLATE, "record": list(GOLD_RECORD)})
+    return {"rules": rules + auxiliary_alert_rules()}
+
+
+def auxiliary_alert_rules() -> list:
+    """
+    김프 임계값과 별개로 늘 켜 두는 규칙 — 규칙 파일이 같은 그룹을 정의하지 않으면 파일 규칙 뒤에 덧붙입니다
+    (with_auxiliary_rules).
+
+    이상 변동: |z| ≥ ANOMALY_Z_THRESHOLD, ANOMALY_COOLDOWN_MIN분 쿨다운. hysteresis = 기준값이라
+              |z|가 내려와도 상태가 지워지지 않고 쿨다운으로만 재알림합니다.
+    거래소 교차 (KIMP_VENUES 2곳 이상): 최저 · 최고 김프 거래소가 자산 임계값을 넘을 때와
+              거래소 간 괴리가 VENUE_SPREAD_PP 이상일 때 — 악화 시에만 재알림
+    """
+    rules = []
+    for metric, label in ANOMALY_METRICS.items():
+        group = f"{metric.split('_')[0]}_anomaly"
+        rules.append({
+            "id": group, "group": group, "name": label.removesuffix(" 김프"),
+            "metric": f"{metric}_z_abs", "op": ">=", "threshold": ANOMALY_Z_THRESHOLD,
+            "hysteresis": ANOMALY_Z_THRESHOLD, "realert": "cooldown", "cooldown_min": ANOMALY_COOLDOWN_MIN,
+            "template": anomaly_template(metric, label), "record": [metric, f"{metric}_z"],
+        })
+    for sym in KIMP_ASSETS:
+        g, name   = sym.lower(), ASSET_NAMES.get(sym, sym)
+        low, high = premium_thresholds(sym)
+        rules += [
+            {"id": f"venue_{g}_low", "group": f"venue_{g}_low", "name": name, "metric": f"venue_{g}_min",
+             "op": "<=", "threshold": low, "emoji": "🔵", "template": venue_premium_template(g, "min")},
+            {"id": f"venue_{g}_high", "group": f"venue_{g}_high", "name": name, "metric": f"venue_{g}_max",
+             "op": ">=", "threshold": high, "emoji": "🔴", "template": venue_premium_template(g, "max")},
+            {"id": f"spread_{g}_high", "group": f"spread_{g}", "name": name, "metric": f"venue_{g}_spread",
+             "op": ">=", "threshold": VENUE_SPREAD_PP, "emoji": "↔️", "template": venue_spread_template(g)},
+        ]
+    return rules
+
+
+def with_auxiliary_rules(config: dict) -> dict:
+    """규칙 파일 설정 + 파일이 정의하지 않은 그룹의 auxiliary_alert_rules"""
+    rules   = list(config.get("rules") or [])
+    defined = {compile_rule(spec, i).group for i, spec in enumerate(rules)}
+    return dict(config, rules=rules + [spec for spec in auxiliary_alert_rules() if spec["group"] not in defined])
+
+
+def load_alert_rules(path: str = None) -> Optional[dict]:
+    """
+    규칙 파일 로드 (없으면 None) — 최상위가 목록이면 {"rules": 목록}으로 취급
+    """
+    path = path or ALERT_RULES_FILE
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError(f"{path}: YAML 규칙 파일에는 PyYAML이 필요합니다 (pip install pyyaml)")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return {"rules": data} if isinstance(data, list) else (data or {})
+
+
+@dataclass
+class CompiledRule:
+    """규칙 하나 — 비교 · 재알림 판단 · 메시지 생성에 필요한 값을 로드 시점에 확정"""
+    id: str
+    metric: str
+    group: str
+    name: str
+    op: str
+    threshold: float
+    direction: str      # low / high
+    test: Callable
+    hysteresis: float
+    step: Optional[float]
+    realert: str
+    cooldown_min: float
+    template: str
+    emoji: tuple        # (음수일 때, 그 외)
+    record: tuple
+
+    @property
+    def cond(self) -> str:
+        return f"{_RULE_OPS[self.op][2]}{self.threshold}%"
+
+    def recovered(self, value: float) -> bool:
+        if self.direction == "low":
+            return value > self.threshold + self.hysteresis
+        return value < self.threshold - self.hysteresis
+
+    def level(self, value: float) -> int:
+        distance = self.threshold - value if self.direction == "low" else value - self.threshold
+        return int(distance / self.step)
+
+    def decide(self, prev: Optional[dict], value: float, now: datetime, log: bool) -> tuple:
+        """
+        (알림 여부, 사유, 단계) — worsen/step 사유 · 로그 문구는 should_alert / should_alert_gold_step과 동일
+        """
+        level = self.level(value) if self.step else None
+        if prev is None:
+            if self.realert == "step":
+                return True, f"첫 알림 (기준 {self.threshold}% 돌파, Level {level})", level
+            return True, "첫 알림", level
 
-        if data.get("isSuccess") and data.get("result"):
-            item      = data["result"][0]
-            traded_at = item.get("localTradedAt", "")
-            rate      = float(item["closePrice"].replace(",", ""))
+        prev_value = prev["value"]
+        if self.realert == "worsen":
+            worse = value < prev_value if self.direction == "low" else value > prev_value
+            if worse:
+                return True, f"악화 ({prev_value:+.2f}% → {value:+.2f}%, {value - prev_value:+.2f}%p)", level
+            if log:
+                print(f"  [Filter] {self.id}: 이전 {prev_value:+.2f}% → 현재 {value:+.2f}% (개선 방향) — 알림 생략")
+            return False, "", level
 
-            if traded_at == today_kst:
-                print(f"  [Naver] USD/KRW = {rate:,.2f}  (당일 {traded_at})")
-            else:
-                print(
-                    f"  [Naver] USD/KRW = {rate:,.2f}"
-                    f"  (최근 거래일 {traded_at} — 오늘 {today_kst}, 주말/공휴일 허용)"
-                )
-            return rate
-    except Exception as e:
-        print(f"  [Naver] 환율 API 실패: {e}")
+        if self.realert == "step":
+            prev_level = prev.get("step_level", 0)
+            if level > prev_level:
+                sign = -1 if self.direction == "low" else 1
+                step_threshold = self.threshold + sign * level * self.step
+                return True, (
+                    f"Level {prev_level}→{level} "
+                    f"({step_threshold:+.0f}% 선 돌파, "
+                    f"이전 {prev_value:+.2f}% → 현재 {value:+.2f}%)"
+                ), level
+            if log and level < prev_level:
+                print(f"  [Filter] {self.id}: Level {prev_level}→{level} (개선 방향) — 알림 생략")
+            elif log:
+                print(f"  [Filter] {self.id}: Level {level} 유지 "
+                      f"({prev_value:+.2f}%→{value:+.2f}%) — 알림 생략")
+            return False, "", level
 
-    try:
-        print("  [Yahoo] 폴백: KRW=X 시도...")
-        ticker = yf.Ticker("KRW=X")
-        rate   = float(ticker.fast_info.last_price)
-        print(f"  [Yahoo] USD/KRW = {rate:,.2f}")
-        return rate
-    except Exception as e:
-        print(f"  [Yahoo] 환율 실패: {e}")
+        if self.realert == "cooldown":
+            elapsed = (now - datetime.fromisoformat(prev["time"])).total_seconds() / 60
+            if elapsed >= self.cooldown_min:
+                return True, f"재알림 ({elapsed:.0f}분 경과)", level
+            if log:
+                print(f"  [Filter] {self.id}: 쿨다운 {self.cooldown_min:g}분 중 ({elapsed:.0f}분 경과) — 알림 생략")
+            return False, "", level
 
+        if self.realert == "always":
+            return True, "지속", level
+        return False, "", level      # once
+
+    def render(self, value: float, reason: str, now: datetime, values: dict) -> str:
+        ctx = dict(values)
+        ctx.update(
+            value=value, threshold=self.threshold, cond=self.cond, reason=reason, name=self.name,
+            emoji=self.emoji[0] if value < 0 else self.emoji[1],
+            time=now.strftime("%H:%M KST"), detail=values.get(f"{self.group}_detail") or "",
+        )
+        ctx.setdefault("driver_analysis", "")
+        try:
+            return self.template.format(**ctx)
+        except (KeyError, ValueError, TypeError, IndexError) as e:
+            print(f"  [Rules] {self.id}: 템플릿 오류 ({e}) — 기본 형식으로 전송")
+            return PREMIUM_TEMPLATE.format(**{**ctx, "detail": ""})
+
+
+def compile_rule(spec: dict, index: int = 0) -> CompiledRule:
+    where = spec.get("id") or f"rules[{index}]"
     try:
-        print("  [er-api] 폴백: 일간 환율 시도...")
-        resp = requests.get("https://open.er-api.com/v6/latest/USD", timeout=10)
-        resp.raise_for_status()
-        rate = float(resp.json()["rates"]["KRW"])
-        print(f"  [er-api] USD/KRW = {rate:,.2f}  (주의: 일간 업데이트)")
-        return rate
-    except Exception as e:
-        print(f"  [er-api] 환율 실패: {e}")
+        metric    = str(spec["metric"])
+        op        = str(spec["op"])
+        threshold = float(spec["threshold"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"{where}: metric / op / threshold 필요 ({e})")
+    if op not in _RULE_OPS:
+        raise ValueError(f"{where}: 알 수 없는 비교 연산자 {op!r} (허용: {', '.join(_RULE_OPS)})")
+    test, direction, _ = _RULE_OPS[op]
+    step    = float(spec["step"]) if spec.get("step") is not None else None
+    realert = spec.get("realert") or ("step" if step else "worsen")
+    if realert not in _REALERT_POLICIES:
+        raise ValueError(f"{where}: 알 수 없는 재알림 정책 {realert!r} (허용: {', '.join(_REALERT_POLICIES)})")
+    if realert == "step" and not (step and step > 0):
+        raise ValueError(f"{where}: realert=step에는 양수 step 필요")
+    hysteresis = float(spec.get("hysteresis") or 0)
+    if hysteresis < 0:
+        raise ValueError(f"{where}: hysteresis는 0 이상")
 
-    raise RuntimeError(
-        "USD/KRW 환율을 가져올 수 있는 모든 소스(네이버·야후·er-api)가 응답하지 않습니다."
+    group = str(spec.get("group") or metric.removesuffix("_kimp"))
+    name  = spec.get("name") or ("금" if group == "gold" else ASSET_NAMES.get(group.upper(), group.upper()))
+    emoji = spec.get("emoji") or ("🔵" if direction == "low" else "🔴")
+    emoji = (emoji, emoji) if isinstance(emoji, str) else tuple(emoji)
+    return CompiledRule(
+        id=str(spec.get("id") or f"{group}_{direction}"), metric=metric, group=group, name=name,
+        op=op, threshold=threshold, direction=direction, test=test, hysteresis=hysteresis,
+        step=step, realert=realert, cooldown_min=float(spec.get("cooldown_min") or 0),
+        template=spec.get("template") or PREMIUM_TEMPLATE, emoji=emoji,
+        record=tuple(spec.get("record") or ()),
     )
 
 
-def get_krx_gold_price_per_gram() -> float:
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        )
-    }
+@dataclass
+class RuleGroup:
+    name: str
+    metric: str
+    label: str
+    rules: list
 
-    try:
-        url  = "https://api.stock.naver.com/marketindex/metals/M04020000"
-        resp = requests.get(url, headers=headers, timeout=15)
-        resp.raise_for_status()
-        data  = resp.json()
-        price = float(data["closePrice"].replace(",", ""))
-        print(f"  [KRX Gold] 국내 금현물 = {price:,.0f} 원/g  (네이버 API)")
-        return price
-    except Exception as e:
-        print(f"  [KRX Gold] 네이버 API 실패: {e}")
 
-    try:
-        url  = "https://finance.naver.com/marketindex/goldDetail.naver"
-        resp = requests.get(url, headers=headers, timeout=15)
-        resp.raise_for_status()
-        text = resp.text
-        for pattern in [r"([\d,]+\.\d+)\s*원/g", r"([\d,]+)\s*원/g"]:
-            match = re.search(pattern, text)
-            if match:
-                price = float(match.group(1).replace(",", ""))
-                print(f"  [KRX Gold] 국내 금현물 = {price:,.0f} 원/g  (데스크톱 파싱)")
-                return price
-    except Exception as e:
-        print(f"  [KRX Gold] 데스크톱 파싱 실패: {e}")
+class AlertPlan:
+    """
+    컴파일된 평가 계획 — 파생 지표를 틱마다 한 번 계산한 뒤 그룹 순서대로 규칙을 한 번씩 평가
 
-    raise RuntimeError("KRX 금현물 가격을 파싱할 수 없습니다.")
+    그룹: 같은 지표의 규칙 묶음 (예: usdt_low · usdt_high). 한 규칙이 충족되면 같은 그룹의
+    충족되지 않은 규칙 상태를 지우고, 아무것도 충족되지 않으면 hysteresis만큼 회복한 규칙 상태를 지웁니다.
+    """
 
+    def __init__(self, groups: list, derived: dict = None):
+        self.groups  = groups
+        self.derived = derived or {}   # 이름 → (식, compile_metric 함수, 참조하는 틱 값 이름)
 
-def get_international_gold_usd_per_oz() -> float:
-    try:
-        url  = "https://forex-data-feed.swissquote.com/public-quotes/bboquotes/instrument/XAU/USD"
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        data   = resp.json()
-        prices = data[0]["spreadProfilePrices"][0]
-        bid    = prices["bid"]
-        ask    = prices["ask"]
-        spot   = (bid + ask) / 2
-
-        if not (GOLD_PRICE_MIN_USD < spot < GOLD_PRICE_MAX_USD):
-            raise ValueError(
-                f"Swissquote 비정상값 감지: ${spot:,.2f}/oz"
-                f"  (허용 범위 ${GOLD_PRICE_MIN_USD:,}~${GOLD_PRICE_MAX_USD:,})"
-            )
+    def __len__(self) -> int:
+        return sum(len(g.rules) for g in self.groups)
 
-        print(f"  [Swissquote] XAU/USD = ${spot:,.2f}/oz  (bid ${bid:,.2f} / ask ${ask:,.2f})")
-        return spot
-    except Exception as e:
-        print(f"  [Swissquote] 실패: {e}")
+    def affected(self, changed) -> tuple:
+        """
+        바뀐 틱 값에 지표가 (파생 지표를 거쳐서라도) 의존하는 그룹 이름 — 체결 스트림이 해당 그룹만 평가
+        """
+        changed = set(changed)
+        deps    = {name: d for name, (_, _, d) in self.derived.items()}
+        return tuple(g.name for g in self.groups
+                     if g.metric in changed or not changed.isdisjoint(deps.get(g.metric, ())))
+
+    def compute(self, values: dict) -> dict:
+        values = dict(values)
+        for name, (_, fn, _) in self.derived.items():
+            try:
+                value = fn(values)
+                values[name] = value if math.isfinite(value) else None
+            except Exception:     # 값 누락(None/KeyError) · 0 나눗셈 · 오버플로 — 이 지표만 건너뜀
+                values[name] = None
+        return values
+
+    def evaluate(self, state: dict, values: dict, now: datetime, log: bool = True,
+                 groups: tuple = None) -> list:
+        """
+        Returns:
+            보낼 알림 메시지 목록 (규칙 순서)
+        """
+        values = self.compute(values) if self.derived else values
+        la     = state.setdefault("last_alert", {})
+        alerts = []
+        for group in self.groups:
+            if groups is not None and group.name not in groups:
+                continue
+            value = values.get(group.metric)
+            if value is None:
+                continue
+            active = [rule for rule in group.rules if rule.test(value, rule.threshold)]
+            if not active:
+                cleared = [rule.id for rule in group.rules if rule.id in la and rule.recovered(value)]
+                for key in cleared:
+                    la.pop(key)
+                if cleared and log:
+                    print(f"  [State] {group.label} 정상 복귀 → 상태 초기화")
+                continue
+            for rule in active:
+                send_it, reason, level = rule.decide(la.get(rule.id), value, now, log)
+                if send_it:
+                    alerts.append(rule.render(value, reason, now, values))
+                    extra = {col: round(values[col], TICK_COLUMNS.get(col, 4))
+                             for col in rule.record if values.get(col) is not None}
+                    update_alert_state(state, rule.id, value, now, step_level=level, extra=extra or None)
+            for rule in group.rules:
+                if rule not in active:
+                    la.pop(rule.id, None)
+        return alerts
+
+
+def compile_alert_rules(config: dict, known: frozenset = None) -> AlertPlan:
+    """
+    규칙 설정(dict) → AlertPlan. 오류는 ValueError (규칙 위치 포함)
+
+    known: 사용할 수 있는 틱 값 이름 (기본 tick_value_names()) — 오타 · 감시하지 않는 자산의 값은
+    런타임에 조용히 누락되는 대신 로드 시점에 오류
+    """
+    known   = set(tick_value_names() if known is None else known)
+    derived = {}
+    for name, expr in (config.get("metrics") or {}).items():
+        fn, names = compile_metric(expr, f"metrics.{name}", frozenset(known))
+        deps = set()   # 앞서 정의한 파생 지표는 그 지표가 참조하는 틱 값으로 펼침
+        for ref in names:
+            deps |= derived[ref][2] if ref in derived else {ref}
+        derived[name] = (expr, fn, frozenset(deps))
+        known.add(name)
+
+    groups, ids = {}, set()
+    for i, spec in enumerate(config.get("rules") or []):
+        rule = compile_rule(spec, i)
+        for name in (rule.metric, *rule.record):
+            if name not in known:
+                raise ValueError(f"rules[{i}]: 알 수 없는 값 {name!r} (틱 값 · 파생 지표만 사용 가능)")
+        if rule.id in ids:
+            raise ValueError(f"rules[{i}]: 중복 id {rule.id!r}")
+        ids.add(rule.id)
+        group = groups.get(rule.group)
+        if group is None:
+            group = groups[rule.group] = RuleGroup(rule.group, rule.metric, f"{rule.name} 김프", [])
+        elif group.metric != rule.metric:
+            raise ValueError(f"rules[{i}]: 그룹 {rule.group!r}의 지표가 섞여 있습니다 "
+                             f"({group.metric} / {rule.metric})")
+        group.rules.append(rule)
+    return AlertPlan(list(groups.values()), derived)
 
+
+_alert_plan = (None, None)   # (캐시 키, AlertPlan)
+
+
+def get_alert_plan() -> AlertPlan:
+    """
+    규칙 파일(mtime) 또는 기본 규칙 임계값이 바뀔 때만 다시 컴파일
+    """
+    global _alert_plan
+    auxiliary = (tuple((sym, premium_thresholds(sym)) for sym in KIMP_ASSETS), VENUE_SPREAD_PP,
+                 ANOMALY_Z_THRESHOLD, ANOMALY_COOLDOWN_MIN, STATS_HALFLIFE_MIN)
     try:
-        print("  [Yahoo] 폴백: GC=F 금 선물 시도...")
-        ticker = yf.Ticker("GC=F")
-        try:
-            price = float(ticker.fast_info.last_price)
-        except Exception:
-            hist = ticker.history(period="1d")
-            if hist.empty:
-                raise RuntimeError("yfinance 히스토리 데이터 없음")
-            price = float(hist["Close"].iloc[-1])
+        source = ("file", ALERT_RULES_FILE, os.path.getmtime(ALERT_RULES_FILE), auxiliary)
+    except OSError:
+        source = ("default", USDT_KIMP_LOW, USDT_KIMP_HIGH, GOLD_KIMP_LOW, GOLD_KIMP_HIGH,
+                  GOLD_KIMP_STEP, tuple((sym, premium_thresholds(sym)) for sym in extra_kimp_assets()), auxiliary)
+    key, plan = _alert_plan
+    if key == source:
+        return plan
+    config = with_auxiliary_rules(load_alert_rules()) if source[0] == "file" else default_alert_rules()
+    plan   = compile_alert_rules(config)
+    if source[0] == "file":
+        print(f"  [Rules] {ALERT_RULES_FILE}: 규칙 {len(plan)}개 · 그룹 {len(plan.groups)}개 컴파일")
+    _alert_plan = (source, plan)
+    return plan
 
-        if not (GOLD_PRICE_MIN_USD < price < GOLD_PRICE_MAX_USD):
-            raise ValueError(f"비정상 금값 감지: ${price:,.2f}/oz")
 
-        print(f"  [Yahoo] 국제 금 선물 = ${price:,.2f}/oz")
-        return price
-    except Exception as e:
-        print(f"  [Yahoo] 금 선물 실패: {e}")
+def evaluate_premium_alerts(state: dict, symbol: str, kimp: float, price_krw: float,
+                            usd_krw: float, now: datetime, ref_usd: float = None,
+                            log: bool = True) -> list:
+    """
+    자산 하나의 알림 규칙 평가 (그룹 "<심볼 소문자>") + 알림 상태 갱신
 
-    raise RuntimeError("국제 금 시세를 가져올 수 없습니다.")
+    ref_usd가 있으면 코인(해외 USD 가격 기준), 없으면 스테이블코인(환율 기준)으로 표시.
+    다른 그룹의 값은 넘기지 않으므로 기본 규칙 재현(replay) 전용 — 체결 스트림은 evaluate_trade_alerts.
 
+    Returns:
+        보낼 알림 메시지 목록
+    """
+    group  = symbol.lower()
+    values = {f"{group}_kimp": kimp, "usd_krw": usd_krw,
+              f"{group}_detail": premium_detail(symbol, price_krw, usd_krw, ref_usd)}
+    return get_alert_plan().evaluate(state, values, now, log=log, groups=(group,))
 
-# ═══════════════════════════════════════════════════════
-#  김프 계산 (기존과 동일)
-# ═══════════════════════════════════════════════════════
 
-def calc_usdt_kimp(upbit_usdt: float, usd_krw: float) -> float:
-    return ((upbit_usdt - usd_krw) / usd_krw) * 100
+def venue_values(matrix: VenueMatrix, usd_krw: float) -> dict:
+    """
+    거래소 교차 알림 규칙(venue_<sym>_low · venue_<sym>_high · spread_<sym>_high)이 쓰는 틱 값
 
+    venue_<sym>_min / _max: 최저 · 최고 김프 거래소의 김프, _min_name / _max_name: 그 거래소 표시명,
+    venue_<sym>_spread: 거래소 간 괴리 (%p), venue_<sym>_table: 거래소별 가격 · 김프 + 기준가 (알림 본문)
+    """
+    values = {}
+    for j, sym in enumerate(matrix.assets):
+        g    = sym.lower()
+        hi_v = matrix.venues[matrix.best[j]]
+        lo_v = matrix.venues[matrix.worst[j]]
+        rows = "\n".join(
+            f"  {VENUE_NAMES.get(v, v)}: {matrix.prices[i, j]:,.0f}원 ({matrix.premium[i, j]:+.2f}%)"
+            for i, v in enumerate(matrix.venues) if matrix.premium[i, j] == matrix.premium[i, j]
+        )
+        values.update({
+            f"venue_{g}_min":      float(matrix.premium[matrix.worst[j], j]),
+            f"venue_{g}_max":      float(matrix.premium[matrix.best[j], j]),
+            f"venue_{g}_spread":   float(matrix.spread[j]),
+            f"venue_{g}_min_name": VENUE_NAMES.get(lo_v, lo_v),
+            f"venue_{g}_max_name": VENUE_NAMES.get(hi_v, hi_v),
+            f"venue_{g}_table":    f"{rows}\n기준가: {matrix.ref[j]:,.0f}원  (환율 {usd_krw:,.2f}원)",
+        })
+    return values
 
-def calc_gold_kimp(
-    krx_gold_krw_g: float,
-    intl_gold_usd_oz: float,
-    usd_krw: float,
-) -> tuple:
-    intl_gold_krw_g = (intl_gold_usd_oz * usd_krw) / TROY_OUNCE_TO_GRAM
-    kimp = ((krx_gold_krw_g - intl_gold_krw_g) / intl_gold_krw_g) * 100
-    return kimp, intl_gold_krw_g
 
+def evaluate_usdt_alerts(state: dict, usdt_kimp: float, upbit_usdt: float,
+                         usd_krw: float, now: datetime, log: bool = True) -> list:
+    """
+    테더 김프 방향성 알림 판단 + 알림 상태 갱신
 
-# ═══════════════════════════════════════════════════════
-#  알림
-# ═══════════════════════════════════════════════════════
+    Returns:
+        보낼 알림 메시지 목록 (0~1건)
+    """
+    return evaluate_premium_alerts(state, "USDT", usdt_kimp, upbit_usdt, usd_krw, now, log=log)
 
-def send_telegram(message: str):
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        print("  [Telegram] 토큰/채팅ID 미설정 — 알림 건너뜀")
-        return
-    url     = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id":    TELEGRAM_CHAT_ID,
-        "text":       message,
-        "parse_mode": "HTML",
+
+def evaluate_gold_alerts(state: dict, gold_kimp: float, krx_gold: float,
+                         intl_gold_oz: float, intl_gold_krw_g: float, usd_krw: float,
+                         driver_analysis: str, now: datetime, log: bool = True) -> list:
+    """
+    금 김프 단계별 알림 판단 (그룹 "gold") + 알림 상태 갱신
+
+    Returns:
+        보낼 알림 메시지 목록 (0~1건)
+    """
+    values = {
+        "gold_kimp":        gold_kimp,
+        "usd_krw":          usd_krw,
+        "intl_gold_usd_oz": intl_gold_oz,
+        "krx_gold_krw_g":   krx_gold,
+        "intl_gold_krw_g":  intl_gold_krw_g,
+        "driver_analysis":  driver_analysis,
+        "gold_detail":      gold_detail(krx_gold, intl_gold_krw_g, intl_gold_oz, usd_krw),
     }
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        if resp.ok:
-            print("  [Telegram] 알림 전송 성공")
-        else:
-            try:
-                err = resp.json().get("description", resp.text)
-            except Exception:
-                err = resp.text
-            print(f"  [Telegram] 전송 실패: {resp.status_code} — {err}")
-    except Exception as e:
-        print(f"  [Telegram] 전송 오류: {e}")
+    return get_alert_plan().evaluate(state, values, now, log=log, groups=("gold",))
+
+
+_last_tick_values = None   # 직전 회차 run_tick의 전체 틱 값 (체결 스트림이 갱신해 평가)
+
+TRADE_VALUE_NAMES = ("usdt_kimp", "upbit_usdt", "usdt_detail")
+
+
+def evaluate_trade_alerts(state: dict, upbit_usdt: float, now: datetime,
+                          log: bool = False) -> tuple:
+    """
+    테더 체결 1건 평가 — 직전 회차의 전체 틱 값에 체결가를 반영해 계획 전체(파생 지표 포함)를 계산하고,
+    지표가 테더 값에 의존하는 그룹만 평가 (다른 그룹은 회차 평가 결과 유지)
+
+    Returns:
+        (테더 김프, 보낼 알림 메시지 목록) — 아직 회차가 없으면 (None, [])
+    """
+    base = _last_tick_values
+    if not base or base.get("usd_krw") is None:
+        return None, []
+    usd_krw   = base["usd_krw"]
+    usdt_kimp = calc_usdt_kimp(upbit_usdt, usd_krw)
+    values    = dict(base, usdt_kimp=usdt_kimp, upbit_usdt=upbit_usdt,
+                     usdt_detail=premium_detail("USDT", upbit_usdt, usd_krw))
+    plan = get_alert_plan()
+    return usdt_kimp, plan.evaluate(state, values, now, log=log, groups=plan.affected(TRADE_VALUE_NAMES))
 
 
 # ═══════════════════════════════════════════════════════
-#  메인
+#  구독자별 알림 (다중 채팅 · 임계값 인덱스)
 # ═══════════════════════════════════════════════════════
 
-def main():
-    now = datetime.now(KST)
-    print(f"\n{'='*57}")
-    print(f"  김치프리미엄 모니터  |  {now.strftime('%Y-%m-%d %H:%M:%S KST')}")
-    print(f"  테더: 방향성 알림  |  금: 단계별 알림 ({GOLD_KIMP_STEP}%p 간격)")
-    print(f"{'='*57}")
+@dataclass(frozen=True)
+class Subscription:
+    """채팅 하나의 구독 — thresholds: 자산 → (low, high, step 또는 None)"""
+    chat_id: str
+    assets: tuple
+    thresholds: dict
+    name: str = ""
+
+
+def parse_subscription(entry: dict) -> Subscription:
+    """
+    {"chat_id": "123", "assets": ["USDT", "GOLD"],
+     "thresholds": {"USDT": {"low": -1, "high": 3}, "GOLD": {"low": 0, "high": 5, "step": 0.5}}}
+
+    step이 있는 자산은 단계별 알림(금 방식), 없으면 방향성 알림(테더 방식)
+    """
+    chat_id = str(entry["chat_id"])
+    assets  = tuple(dict.fromkeys(a.upper() for a in entry.get("assets") or SUBSCRIPTION_DEFAULT_ASSETS))
+    custom  = {k.upper(): v for k, v in (entry.get("thresholds") or {}).items()}
+    thresholds = {}
+    for asset in assets:
+        c = custom.get(asset, {})
+        if asset == "GOLD":
+            low, high, step = GOLD_KIMP_LOW, GOLD_KIMP_HIGH, GOLD_KIMP_STEP
+        else:
+            (low, high), step = premium_thresholds(asset), None
+        low, high = float(c.get("low", low)), float(c.get("high", high))
+        step = float(c["step"]) if c.get("step") is not None else step
+        if low >= high or (step is not None and step <= 0):
+            raise ValueError(f"{chat_id}/{asset}: 임계값 오류 (low={low}, high={high}, step={step})")
+        thresholds[asset] = (low, high, step)
+    return Subscription(chat_id, assets, thresholds, entry.get("name", ""))
+
+
+_subscriptions_cache = (None, None, [])   # (경로, mtime, 목록)
 
-    # ── 0. 상태 로드 ────────────────────────────────────
-    print("\n[0] 알림 상태 로드")
-    state  = load_state()
-    alerts = []
 
-    # ── 1. USD/KRW 환율 ─────────────────────────────────
-    print("\n[1] USD/KRW 환율 조회")
+def load_subscriptions(path: str = None) -> list:
+    """
+    SUBSCRIBERS_FILE(JSON: 목록 또는 {"subscribers": [...]}) — 파일이 바뀔 때만 다시 파싱
+    """
+    global _subscriptions_cache
+    path = path or SUBSCRIBERS_FILE
     try:
-        usd_krw = get_usd_krw_rate()
-    except Exception as e:
-        msg = f"❌ USD/KRW 환율 조회 실패: {e}"
-        print(msg)
-        send_telegram(msg)
-        sys.exit(1)
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return []
+    cached_path, cached_mtime, subs = _subscriptions_cache
+    if (cached_path, cached_mtime) == (path, mtime):
+        return subs
+
+    subs = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        entries = data.get("subscribers", []) if isinstance(data, dict) else data
+        seen = set()
+        for entry in entries:
+            try:
+                sub = parse_subscription(entry)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"  [Subscribers] 항목 무시: {e}")
+                continue
+            if sub.chat_id in seen:
+                print(f"  [Subscribers] 중복 chat_id 무시: {sub.chat_id}")
+                continue
+            seen.add(sub.chat_id)
+            subs.append(sub)
+    except (OSError, ValueError) as e:
+        print(f"  [Subscribers] 로드 실패 ({path}): {e}")
+    _subscriptions_cache = (path, mtime, subs)
+    return subs
+
+
+class ThresholdIndex:
+    """
+    자산 하나의 구독자별 '무변화 구간' [lo, hi] 정렬 인덱스
+
+    구독자의 다음 이벤트(진입 · 악화 · 정상 복귀)는 김프가 자기 구간을 벗어날 때만 생기므로
+    lo 오름차순 · hi 오름차순 두 목록을 이분 탐색해 구간 밖 구독자만 꺼냅니다 — O(log N + hits).
+    경계값은 EPS만큼 넉넉히 후보에 넣고, 정확한 판단은 후보에 대해서만 수행
+    """
+    EPS = 1e-9
+
+    def __init__(self):
+        self.lows   = []   # (lo, chat_id) 정렬
+        self.highs  = []   # (hi, chat_id) 정렬
+        self.bounds = {}   # chat_id → (lo, hi)
+
+    def __len__(self) -> int:
+        return len(self.bounds)
+
+    def set(self, chat_id: str, lo: float, hi: float):
+        old = self.bounds.get(chat_id)
+        if old == (lo, hi):
+            return
+        if old is not None:
+            self.discard(chat_id)
+        bisect.insort(self.lows,  (lo, chat_id))
+        bisect.insort(self.highs, (hi, chat_id))
+        self.bounds[chat_id] = (lo, hi)
+
+    def discard(self, chat_id: str):
+        old = self.bounds.pop(chat_id, None)
+        if old is None:
+            return
+        del self.lows[bisect.bisect_left(self.lows, (old[0], chat_id))]
+        del self.highs[bisect.bisect_left(self.highs, (old[1], chat_id))]
+
+    def candidates(self, value: float) -> set:
+        """value가 구간 밖(또는 경계)인 구독자"""
+        i = bisect.bisect_left(self.lows, (value - self.EPS, ""))
+        j = bisect.bisect_right(self.highs, (value + self.EPS, "\uffff"))
+        hits = {chat_id for _, chat_id in self.lows[i:]}
+        hits.update(chat_id for _, chat_id in self.highs[:j])
+        return hits
+
+
+def _quiet_interval(entries: dict, asset: str, low: float, high: float,
+                    step: Optional[float]) -> tuple:
+    """
+    구독자의 현재 알림 상태에서 아무 일도 일어나지 않는 김프 구간
+
+    - 정상 범위:       (low, high)  — low 이하 · high 이상이면 첫 알림
+    - low 방향 알림 중: 방향성은 [직전 알림값, low], 단계별은 (다음 단계선, low]
+    - high 방향 알림 중: 대칭
+    """
+    prev_low  = entries.get(f"{asset.lower()}_low")
+    prev_high = entries.get(f"{asset.lower()}_high")
+    if prev_low is not None:
+        lo = low - (prev_low.get("step_level", 0) + 1) * step if step else prev_low["value"]
+        return lo, low
+    if prev_high is not None:
+        hi = high + (prev_high.get("step_level", 0) + 1) * step if step else prev_high["value"]
+        return high, hi
+    return low, high
+
+
+class SubscriberAlertEngine:
+    """
+    구독자별 알림 판단 — 상태는 state["subscribers"][chat_id] (last_alert와 같은 형식)
+
+    evaluate()는 자산마다 ThresholdIndex 후보만 판단하므로
+    구독자 수와 무관하게 '상태가 바뀌는 구독자 수'에 비례한 비용으로 끝납니다.
+
+    알림을 만든 채팅의 상태는 바로 갱신하되(전송 중 중복 알림 방지) 갱신 전 상태를 보관하고,
+    전송 결과(ack)가 실패이거나 settle(final=True) 때까지 확인되지 않으면 되돌려 다음 회차에 재시도합니다.
+    """
+
+    def __init__(self, subscriptions: list, state: dict):
+        self.subscriptions = subscriptions
+        self.subs   = {sub.chat_id: sub for sub in subscriptions}
+        self.state  = state
+        self.store  = state.setdefault("subscribers", {})
+        self.index  = {}
+        self.last_candidates = 0
+        self.outstanding = {}   # chat_id → [알림 전 상태, 미확인 전송 수, 실패 여부]
+        self._acks  = queue.SimpleQueue()   # 전송 스레드 → (chat_id, 성공 여부)
+        self._plans = {}        # (자산, low, high, step) → AlertPlan
+        for chat_id in list(self.store):
+            if chat_id not in self.subs:        # 구독 해지 → 상태 정리
+                del self.store[chat_id]
+        for sub in subscriptions:
+            for asset in sub.assets:
+                self._reindex(sub, asset)
+
+    def __len__(self) -> int:
+        return len(self.subs)
+
+    def _reindex(self, sub: Subscription, asset: str):
+        low, high, step = sub.thresholds[asset]
+        lo, hi = _quiet_interval(self.store.get(sub.chat_id, {}), asset, low, high, step)
+        self.index.setdefault(asset, ThresholdIndex()).set(sub.chat_id, lo, hi)
+
+    def evaluate(self, readings: dict, now: datetime) -> dict:
+        """
+        readings: 자산 → (김프 %, 알림 본문 상세)
+        Returns:
+            chat_id → 보낼 알림 메시지 목록
+        """
+        self.settle()
+        outbox, before = {}, {}
+        self.last_candidates = 0
+        for asset, (kimp, detail) in readings.items():
+            index = self.index.get(asset)
+            if index is None or kimp is None:
+                continue
+            candidates = index.candidates(kimp)
+            self.last_candidates += len(candidates)
+            for chat_id in sorted(candidates):
+                sub = self.subs[chat_id]
+                if chat_id not in before:
+                    before[chat_id] = copy.deepcopy(self.store.get(chat_id))
+                message = self._evaluate_one(sub, asset, kimp, detail, now)
+                self._reindex(sub, asset)
+                if message:
+                    outbox.setdefault(chat_id, []).append(message)
+        for chat_id in outbox:
+            entry = self.outstanding.setdefault(chat_id, [before[chat_id], 0, False])
+            entry[1] += 1
+        return outbox
+
+    def ack(self, chat_id: str, ok: bool):
+        """전송 결과 — 전송 스레드에서 호출 (반영은 settle()에서)"""
+        self._acks.put((chat_id, ok))
+
+    def settle(self, final: bool = False) -> list:
+        """
+        받은 ack 반영 — 실패한 채팅은 알림 전 상태로 복원
+        final=True (전송 종료 후): 결과를 받지 못한 채팅도 복원하고 목록 반환
+        """
+        while True:
+            try:
+                chat_id, ok = self._acks.get_nowait()
+            except queue.Empty:
+                break
+            entry = self.outstanding.get(chat_id)
+            if entry is None:
+                continue
+            entry[1] -= 1
+            entry[2] = entry[2] or not ok
+            if entry[1] <= 0:
+                del self.outstanding[chat_id]
+                if entry[2]:
+                    self._restore(chat_id, entry[0])
+        if not final:
+            return []
+        undelivered = list(self.outstanding)
+        for chat_id, (previous, _, _) in self.outstanding.items():
+            self._restore(chat_id, previous)
+        self.outstanding.clear()
+        return undelivered
+
+    def _restore(self, chat_id: str, previous: Optional[dict]):
+        if previous is None:
+            self.store.pop(chat_id, None)
+        else:
+            self.store[chat_id] = previous
+        sub = self.subs.get(chat_id)
+        if sub is not None:
+            for asset in sub.assets:
+                self._reindex(sub, asset)
+
+    def _plan(self, asset: str, low: float, high: float, step: Optional[float]) -> AlertPlan:
+        """
+        구독 기준 → 기본 규칙과 같은 형식의 규칙 계획 (같은 기준을 쓰는 구독자끼리 공유)
+        step이 있으면 단계별, 없으면 방향성 — 판단 · 메시지는 AlertPlan / PREMIUM_TEMPLATE 그대로
+        """
+        key  = (asset, low, high, step)
+        plan = self._plans.get(key)
+        if plan is None:
+            metric = f"{asset.lower()}_kimp"
+            plan = self._plans[key] = compile_alert_rules({"rules": [
+                {"metric": metric, "op": "<=", "threshold": low, "step": step,
+                 "emoji": "🔵" if step else ["🔵", "🟡"]},
+                {"metric": metric, "op": ">=", "threshold": high, "step": step},
+            ]}, known={metric})
+        return plan
+
+    def _evaluate_one(self, sub: Subscription, asset: str, kimp: float, detail: str,
+                      now: datetime) -> Optional[str]:
+        group   = asset.lower()
+        entries = self.store.setdefault(sub.chat_id, {})
+        alerts  = self._plan(asset, *sub.thresholds[asset]).evaluate(
+            {"last_alert": entries}, {f"{group}_kimp": kimp, f"{group}_detail": detail}, now, log=False)
+        if not entries:
+            del self.store[sub.chat_id]
+        return alerts[0] if alerts else None
+
+
+_subscriber_engine = None
+
+
+def settle_subscriber_deliveries():
+    """
+    알림 전송 종료(close_notifier) 후 · 상태 저장 전 — 전송되지 못한 구독자 상태를 되돌림
+    """
+    if _subscriber_engine is None:
+        return
+    undelivered = _subscriber_engine.settle(final=True)
+    if undelivered:
+        shown = ", ".join(undelivered[:10]) + (" …" if len(undelivered) > 10 else "")
+        print(f"  [Subscribers] 전송 못 한 구독자 {len(undelivered):,}명 — 다음 회차 재시도: {shown}")
+        METRICS.inc("kimp_subscriber_undelivered_total", value=len(undelivered))
+
+
+def get_subscriber_engine(state: dict) -> Optional[SubscriberAlertEngine]:
+    """
+    구독 파일이 있으면 엔진 반환 — 파일 변경 · 상태 객체 교체 시 인덱스 재구성
+    """
+    global _subscriber_engine
+    subs = load_subscriptions()
+    if not subs:
+        return None
+    engine = _subscriber_engine
+    if engine is None or engine.state is not state or engine.subscriptions is not subs:
+        engine = _subscriber_engine = SubscriberAlertEngine(subs, state)
+    return engine
+
+
+def run_tick(state: dict, http: HttpClient, now: datetime = None, lock=None) -> list:
+    """
+    한 회차: 수집 → 계산 → 알림 판단 → 전송 (상태 저장은 호출자 몫)
+
+    lock: state를 바꾸는 구간(알림 상태 · 통계 · 구독자)만 잡는 잠금 — 데몬의 체결 콜백과 공유.
+          시세 수집(HTTP)은 잠그지 않으므로 수집 중에도 체결마다 알림 판단이 진행됩니다.
+    환율 조회에 실패하면 TickAborted를 던집니다.
+    Returns:
+        전송한 알림 메시지 목록
+    """
+    now  = now or datetime.now(KST)
+    lock = lock or nullcontext()
+
+    # ── 1. 시세 동시 수집 ───────────────────────────────
+    print("\n[1] 시세 동시 수집 (환율 · Upbit · KRX 금 · 국제 금)")
+    with METRICS.span("collect"):
+        snapshot = collect_market_snapshot(now, http=http)
+
+    if snapshot.usd_krw is None:
+        raise TickAborted(f"USD/KRW 환율 조회 실패: {snapshot.errors.get('usd_krw')}")
+    usd_krw = snapshot.usd_krw
 
     # ── 2. 테더 김프 (기존 로직 유지) ───────────────────
     print("\n[2] 테더 김프 계산")
+    stage_started = time.monotonic()
+    anomaly_values = {}   # 이상 변동 규칙용 z-score · EWMA (3-3에서 함께 평가)
     usdt_kimp  = None
     upbit_usdt = None
+    driver_analysis = None
     try:
-        upbit_usdt = get_upbit_usdt_price()
+        if snapshot.upbit_usdt is None:
+            raise snapshot.errors["upbit_usdt"]
+        upbit_usdt = snapshot.upbit_usdt
         usdt_kimp  = calc_usdt_kimp(upbit_usdt, usd_krw)
         print(f"  ▶ 테더 김프 = {usdt_kimp:+.2f}%")
 
-        if usdt_kimp <= USDT_KIMP_LOW:
-            send_it, reason = should_alert(state, "usdt_low", usdt_kimp, now)
-            if send_it:
-                emoji     = "🔵" if usdt_kimp < 0 else "🟡"
-                alert_msg = (
-                    f"{emoji} <b>테더 김프 알림</b> (≤{USDT_KIMP_LOW}%, {reason})\n"
-                    f"김프: <b>{usdt_kimp:+.2f}%</b>\n"
-                    f"Upbit USDT: {upbit_usdt:,.0f}원\n"
-                    f"환율: {usd_krw:,.2f}원\n"
-                    f"⏰ {now.strftime('%H:%M KST')}"
-                )
-                alerts.append(alert_msg)
-                update_alert_state(state, "usdt_low", usdt_kimp, now)
-            state.get("last_alert", {}).pop("usdt_high", None)
-
-        elif usdt_kimp >= USDT_KIMP_HIGH:
-            send_it, reason = should_alert(state, "usdt_high", usdt_kimp, now)
-            if send_it:
-                alert_msg = (
-                    f"🔴 <b>테더 김프 알림</b> (≥{USDT_KIMP_HIGH}%, {reason})\n"
-                    f"김프: <b>{usdt_kimp:+.2f}%</b>\n"
-                    f"Upbit USDT: {upbit_usdt:,.0f}원\n"
-                    f"환율: {usd_krw:,.2f}원\n"
-                    f"⏰ {now.strftime('%H:%M KST')}"
-                )
-                alerts.append(alert_msg)
-                update_alert_state(state, "usdt_high", usdt_kimp, now)
-            state.get("last_alert", {}).pop("usdt_low", None)
-
-        else:
-            la = state.get("last_alert", {})
-            if "usdt_low" in la or "usdt_high" in la:
-                la.pop("usdt_low",  None)
-                la.pop("usdt_high", None)
-                print("  [State] 테더 정상 복귀 → 상태 초기화")
+        with lock:
+            anomaly_values.update(update_anomaly_stats(state, "usdt_kimp", usdt_kimp, now))
 
     except Exception as e:
         print(f"  ⚠ 테더 김프 계산 실패: {e}")
 
+    METRICS.stage("calc_usdt", stage_started)
+
     # ── 3. 금 김프 (★ 단계별 알림 + 원인 분석) ────────
     print("\n[3] 금 김프 계산")
+    stage_started = time.monotonic()
     gold_kimp       = None
     krx_gold        = None
     intl_gold_oz    = None
     intl_gold_krw_g = None
     try:
-        krx_gold                   = get_krx_gold_price_per_gram()
-        intl_gold_oz               = get_international_gold_usd_per_oz()
+        for name in ("krx_gold_krw_g", "intl_gold_usd_oz"):
+            if name in snapshot.errors:
+                raise snapshot.errors[name]
+        krx_gold                   = snapshot.krx_gold_krw_g
+        intl_gold_oz               = snapshot.intl_gold_usd_oz
         gold_kimp, intl_gold_krw_g = calc_gold_kimp(krx_gold, intl_gold_oz, usd_krw)
 
         print(f"  ▶ 금 김프 = {gold_kimp:+.2f}%")
@@ -672,93 +4723,125 @@ def main():
         print(f"    단계 기준: {GOLD_KIMP_LOW}% 이하 진입 시, {GOLD_KIMP_STEP}%p 간격 알림")
 
         # 원인 분석 (알림 여부와 무관하게 항상 수행)
-        driver_analysis = analyze_gold_kimp_driver(
-            state, usd_krw, intl_gold_oz, krx_gold
-        )
+        with METRICS.span("driver_analysis"):
+            driver_analysis = analyze_gold_kimp_driver(
+                state, usd_krw, intl_gold_oz, krx_gold
+            )
         print(f"  {driver_analysis}")
 
-        # ── 하락 방향 알림 (단계별) ──
-        if gold_kimp <= GOLD_KIMP_LOW:
-            send_it, reason, step_level = should_alert_gold_step(
-                state, "gold_low", gold_kimp, "low", now
-            )
-            if send_it:
-                alert_msg = (
-                    f"🔵 <b>금 김프 알림</b> (≤{GOLD_KIMP_LOW}%, {reason})\n"
-                    f"김프: <b>{gold_kimp:+.2f}%</b>\n"
-                    f"국내: {krx_gold:,.0f}원/g\n"
-                    f"국제: {intl_gold_krw_g:,.0f}원/g  (${intl_gold_oz:,.2f}/oz)\n"
-                    f"환율: {usd_krw:,.2f}원\n"
-                    f"\n{driver_analysis}\n"
-                    f"\n⏰ {now.strftime('%H:%M KST')}"
-                )
-                alerts.append(alert_msg)
-                update_alert_state(
-                    state, "gold_low", gold_kimp, now,
-                    step_level=step_level,
-                    extra={
-                        "usd_krw": round(usd_krw, 2),
-                        "intl_gold_usd_oz": round(intl_gold_oz, 2),
-                        "krx_gold_krw_g": round(krx_gold, 0),
-                    }
-                )
-            else:
-                # 알림은 안 보내지만, 비교용 데이터는 갱신
-                # (다음 알림의 원인 분석 정확도를 위해)
-                pass
+        with lock:
+            anomaly_values.update(update_anomaly_stats(state, "gold_kimp", gold_kimp, now))
 
-            # 반대 방향 상태 클리어
-            state.get("last_alert", {}).pop("gold_high", None)
+    except Exception as e:
+        print(f"  ⚠ 금 김프 계산 실패: {e}")
 
-        # ── 상승 방향 알림 (단계별) ──
-        elif gold_kimp >= GOLD_KIMP_HIGH:
-            send_it, reason, step_level = should_alert_gold_step(
-                state, "gold_high", gold_kimp, "high", now
-            )
-            if send_it:
-                alert_msg = (
-                    f"🔴 <b>금 김프 알림</b> (≥{GOLD_KIMP_HIGH}%, {reason})\n"
-                    f"김프: <b>{gold_kimp:+.2f}%</b>\n"
-                    f"국내: {krx_gold:,.0f}원/g\n"
-                    f"국제: {intl_gold_krw_g:,.0f}원/g  (${intl_gold_oz:,.2f}/oz)\n"
-                    f"환율: {usd_krw:,.2f}원\n"
-                    f"\n{driver_analysis}\n"
-                    f"\n⏰ {now.strftime('%H:%M KST')}"
-                )
-                alerts.append(alert_msg)
-                update_alert_state(
-                    state, "gold_high", gold_kimp, now,
-                    step_level=step_level,
-                    extra={
-                        "usd_krw": round(usd_krw, 2),
-                        "intl_gold_usd_oz": round(intl_gold_oz, 2),
-                        "krx_gold_krw_g": round(krx_gold, 0),
-                    }
-                )
-            state.get("last_alert", {}).pop("gold_low", None)
+    METRICS.stage("calc_gold", stage_started)
+    if usdt_kimp is not None:
+        METRICS.set("kimp_premium_percent", round(usdt_kimp, 4), {"asset": "USDT"})
+    if gold_kimp is not None:
+        METRICS.set("kimp_premium_percent", round(gold_kimp, 4), {"asset": "GOLD"})
 
-        # ── 정상 범위 복귀 ──
-        else:
-            la = state.get("last_alert", {})
-            if "gold_low" in la or "gold_high" in la:
-                la.pop("gold_low",  None)
-                la.pop("gold_high", None)
-                print("  [State] 금 김프 정상 복귀 → 상태 초기화")
+    # ── 3-1. 다중 자산 김프 (KIMP_ASSETS) ──────────────
+    asset_kimps = {}
+    stage_started = time.monotonic()
+    if extra_kimp_assets():
+        print(f"\n[3-1] 다중 자산 김프 ({' · '.join(extra_kimp_assets())}, 기준가: {OFFSHORE_PRICE_SOURCE})")
+        for name in ("coins", "offshore"):
+            if name in snapshot.errors:
+                print(f"  ⚠ {name} 조회 실패: {snapshot.errors[name]}")
+        asset_kimps = calc_asset_kimps(snapshot)
+        for sym, (kimp, price, ref) in asset_kimps.items():
+            print(f"  ▶ {sym:<5} 김프 = {kimp:+.2f}%  (Upbit {price:,.0f} / 기준 {ref:,.0f})")
 
-    except Exception as e:
-        print(f"  ⚠ 금 김프 계산 실패: {e}")
+    for sym, (kimp, _, _) in asset_kimps.items():
+        METRICS.set("kimp_premium_percent", round(kimp, 4), {"asset": sym})
+
+    # ── 3-2. 거래소 교차 비교 (KIMP_VENUES) ────────────
+    matrix_values = {}   # 거래소 교차 알림 규칙용 (3-3에서 함께 평가)
+    if len(snapshot.venues) > 1:
+        print(f"\n[3-2] 거래소 × 자산 김프 ({' · '.join(VENUE_NAMES.get(v, v) for v in snapshot.venues)})")
+        for name in KIMP_VENUES:
+            if f"venue:{name}" in snapshot.errors:
+                print(f"  ⚠ {VENUE_NAMES.get(name, name)} 조회 실패: {snapshot.errors[f'venue:{name}']}")
+        matrix = calc_venue_matrix(snapshot)
+        if matrix is not None:
+            print("  " + " " * 9 + "".join(f"{sym:>10}" for sym in matrix.assets))
+            for i, venue in enumerate(matrix.venues):
+                cells = "".join(f"{k:>+9.2f}%" if k == k else f"{'-':>10}" for k in matrix.premium[i])
+                print(f"  {VENUE_NAMES.get(venue, venue):<9}{cells}")
+            print("  " + "괴리(%p) " + "".join(f"{d:>10.2f}" for d in matrix.spread))
+            matrix_values = venue_values(matrix, usd_krw)
+
+    METRICS.stage("calc_assets", stage_started)
+
+    # ── 3-3. 알림 규칙 (컴파일된 평가 계획 1회 실행) ───
+    values = {"usd_krw": usd_krw, **anomaly_values, **matrix_values}
+    if usdt_kimp is not None:
+        values.update(usdt_kimp=usdt_kimp, upbit_usdt=upbit_usdt,
+                      usdt_detail=premium_detail("USDT", upbit_usdt, usd_krw))
+    if gold_kimp is not None:
+        values.update(gold_kimp=gold_kimp, krx_gold_krw_g=krx_gold, intl_gold_usd_oz=intl_gold_oz,
+                      intl_gold_krw_g=intl_gold_krw_g, driver_analysis=driver_analysis or "",
+                      gold_detail=gold_detail(krx_gold, intl_gold_krw_g, intl_gold_oz, usd_krw))
+    for sym, (kimp, price, ref) in asset_kimps.items():
+        group = sym.lower()
+        values[f"{group}_price"] = price
+        values[f"{group}_ref"]   = ref
+        if len(snapshot.venues) < 2:   # 거래소 교차 비교 중이면 venue_<sym>_* 규칙(최고/최저 거래소 기준)으로 알림
+            values[f"{group}_kimp"]   = kimp
+            values[f"{group}_detail"] = premium_detail(sym, price, usd_krw, snapshot.offshore.get(sym))
+    global _last_tick_values
+    with METRICS.span("alert_rules"), lock:
+        plan   = get_alert_plan()
+        alerts = plan.evaluate(state, values, now)
+        _last_tick_values = values
+
+    # ── 3-4. 구독자별 알림 (채팅마다 기준 · 상태) ──────
+    with lock:
+        engine = get_subscriber_engine(state)
+    if engine is not None:
+        print(f"\n[3-4] 구독자 알림 ({len(engine):,}명)")
+        readings = {}
+        if usdt_kimp is not None:
+            readings["USDT"] = (usdt_kimp, values["usdt_detail"])
+        if gold_kimp is not None:
+            readings["GOLD"] = (gold_kimp, values["gold_detail"]
+                                + (f"\n{driver_analysis}\n\n" if driver_analysis else ""))
+        for sym, (kimp, price, _) in asset_kimps.items():
+            readings[sym] = (kimp, premium_detail(sym, price, usd_krw, snapshot.offshore.get(sym)))
+        with METRICS.span("subscribers"), lock:
+            outbox = engine.evaluate(readings, now)
+        if outbox:
+            notifier = get_notifier(http)
+            for chat_id, messages in outbox.items():
+                if not notifier.notify(messages, chat_id=chat_id,
+                                       on_done=lambda ok, chat_id=chat_id: engine.ack(chat_id, ok)):
+                    engine.ack(chat_id, False)
+        print(f"  [Subscribers] 후보 {engine.last_candidates:,}명 판단 → {len(outbox):,}명 알림")
+        METRICS.set("kimp_subscribers", len(engine))
+        METRICS.inc("kimp_subscriber_alerts_total", value=sum(len(m) for m in outbox.values()))
 
-    # ── 이력 기록 (환율/금값 포함) ───────────────────────
-    add_history(state, usdt_kimp, gold_kimp, now,
-                usd_krw=usd_krw,
-                intl_gold_usd_oz=intl_gold_oz,
-                krx_gold_krw_g=krx_gold)
+    # ── 이력 기록 (스냅샷 전체 + 출처/소요 시간) ────────
+    with METRICS.span("record_tick"):
+        record_tick(snapshot, usdt_kimp, gold_kimp)
+        if _gold_series is not None:   # 데몬: 누적 시계열에 O(1) 추가
+            _gold_series.append(snapshot.time.timestamp(), {
+                "usd_krw":          snapshot.usd_krw,
+                "intl_gold_usd_oz": snapshot.intl_gold_usd_oz,
+                "krx_gold_krw_g":   snapshot.krx_gold_krw_g,
+            })
+
+    if _read_api_cache is not None:
+        with METRICS.span("api_publish"):
+            _read_api_cache.publish(snapshot, tick_values(snapshot, usdt_kimp, gold_kimp), values, asset_kimps)
 
     # ── 4. 결과 요약 출력 ───────────────────────────────
     print(f"\n{'─'*57}")
     usdt_str = f"{usdt_kimp:+.2f}%" if usdt_kimp is not None else "N/A"
     gold_str = f"{gold_kimp:+.2f}%" if gold_kimp is not None else "N/A"
     print(f"  요약  : 테더 김프 = {usdt_str}  |  금 김프 = {gold_str}")
+    if asset_kimps:
+        print("          " + "  |  ".join(f"{sym} {k:+.2f}%" for sym, (k, _, _) in asset_kimps.items()))
     print(f"  조건  : 테더 ≤{USDT_KIMP_LOW}% 또는 ≥{USDT_KIMP_HIGH}%")
     print(f"          금   ≤{GOLD_KIMP_LOW}% 또는 ≥{GOLD_KIMP_HIGH}% (단계: {GOLD_KIMP_STEP}%p)")
 
@@ -784,6 +4867,8 @@ def main():
             f"테더 김프: <b>{usdt_str}</b>\n"
             f"금 김프: <b>{gold_str}</b>\n"
         )
+        for sym, (kimp, _, _) in asset_kimps.items():
+            report += f"{ASSET_NAMES.get(sym, sym)} 김프: <b>{kimp:+.2f}%</b>\n"
         if usdt_kimp is not None and upbit_usdt is not None:
             report += (
                 f"\n[테더 상세]\n"
@@ -800,27 +4885,274 @@ def main():
                 f"  기준: ≤{GOLD_KIMP_LOW}% 또는 ≥{GOLD_KIMP_HIGH}% (단계: {GOLD_KIMP_STEP}%p)\n"
             )
             # 수동 조회에도 원인 분석 포함
-            if 'driver_analysis' in dir():
+            if driver_analysis:
                 report += f"\n{driver_analysis}\n"
+        if snapshot.cache:
+            report += f"\n캐시: {format_cache_ages(snapshot)}\n"
         report += f"\n⏰ {now.strftime('%Y-%m-%d %H:%M KST')}"
         alerts.append(report)
 
-    # ── 6. 알림 전송 ────────────────────────────────────
+    # ── 6. 알림 전송 (병합 후 백그라운드 전송) ──────────
     print(f"\n[4] 알림 전송 ({len(alerts)}건)")
     if alerts:
-        for msg in alerts:
-            send_telegram(msg)
+        with METRICS.span("notify_enqueue"):
+            queued = get_notifier(http).notify(alerts)
+        if queued:
+            print(f"  [Notify] {len(alerts)}건 → 1개 메시지로 병합, 백그라운드 전송")
     else:
         print("  알림 없음 (조건 미충족 / 같은 단계 내 변동 / 개선 방향)")
 
-    # ── 7. 상태 저장 ────────────────────────────────────
-    print("\n[5] 상태 저장")
+    return alerts
+
+
+def persist_state(state: dict):
+    store_source_latency(state)
+    store_source_health(state)
     save_state(state)
 
+
+def main():
+    now = datetime.now(KST)
+    _print_banner(now)
+
+    # ── 0. 상태 로드 ────────────────────────────────────
+    print("\n[0] 알림 상태 로드")
+    METRICS.begin_run()
+    with METRICS.span("load_state"):
+        state = load_state()
+    http  = get_http_client()
+    load_source_latency(state)
+    load_source_health(state)
+
+    try:
+        run_tick(state, http, now)
+    except TickAborted as e:
+        msg = f"❌ {e}"
+        print(msg)
+        send_telegram(msg, http=http)
+        with METRICS.span("notify_flush"):
+            close_notifier()
+        METRICS.end_run()
+        METRICS.write_json()
+        sys.exit(1)
+
+    # ── 7. 알림 전송 완료 대기 → 상태 저장 ─────────────
+    # 구독자 상태는 전송 결과를 반영한 뒤 저장 (못 보낸 채팅은 되돌려 다음 회차에 재시도)
+    with METRICS.span("notify_flush"):
+        close_notifier()
+    settle_subscriber_deliveries()
+    print("\n[5] 상태 저장")
+    with METRICS.span("save_state"):
+        persist_state(state)
+        get_tick_store().checkpoint()   # Actions 캐시는 ticks.db 본 파일만 보관
+    METRICS.end_run()
+    METRICS.write_json()
+
     print(f"\n{'='*57}")
     print(f"  완료  |  {datetime.now(KST).strftime('%H:%M:%S KST')}")
     print(f"{'='*57}\n")
 
 
+# ═══════════════════════════════════════════════════════
+#  데몬 모드
+# ═══════════════════════════════════════════════════════
+
+def run_daemon(interval: float = None, stop: threading.Event = None,
+               stream: bool = False):
+    """
+    상주 프로세스로 interval초마다 회차를 실행합니다.
+
+    상태 · HTTP 커넥션 · 응답시간 표본은 메모리에 유지하고,
+    state.json 저장은 STATE_SAVE_INTERVAL_SEC 주기와 종료 시에만 수행합니다.
+    회차가 주기보다 오래 걸리면 밀린 회차는 건너뜁니다 (고정 주기 유지).
+
+    stream=True: Upbit WebSocket을 구독해 체결마다 직전 회차 환율로
+    테더 김프를 재계산하고 알림을 판단합니다 (회차 수집도 스트림 가격 우선).
+    """
+    interval = max(interval or POLL_INTERVAL_SEC, POLL_INTERVAL_MIN_SEC)
+    stop     = stop or threading.Event()
+
+    def _on_signal(signum, frame):
+        print(f"\n  [Daemon] 종료 신호 수신 ({signal.Signals(signum).name})")
+        stop.set()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT,  _on_signal)
+        signal.signal(signal.SIGTERM, _on_signal)
+
+    if not os.environ.get("STATE_BACKEND"):
+        configure_state_backend("file")
+    print(f"  [Daemon] 시작: {interval:g}초 간격, 상태 저장 {STATE_SAVE_INTERVAL_SEC:g}초 주기 "
+          f"({get_state_backend().name})")
+    state = load_state()
+    http  = get_http_client()
+    load_source_latency(state)
+    load_source_health(state)
+    print(f"  [Daemon] 금 김프 분해 시계열: {len(get_gold_attribution_series()):,}틱 적재")
+
+    state_lock = threading.Lock()
+    ticker     = None
+    metrics_server = None
+    if METRICS_PORT.lower() != "off":
+        try:
+            metrics_server = MetricsServer().start()
+            print(f"  [Metrics] Prometheus 엔드포인트: {metrics_server.url}")
+        except OSError as e:
+            print(f"  [Metrics] 엔드포인트 시작 실패 ({METRICS_HOST}:{METRICS_PORT}): {e}")
+
+    global _read_api_cache
+    api_server = None
+    if API_PORT.lower() != "off":
+        try:
+            cache      = ReadApiCache()
+            api_server = ReadApiServer(cache).start()
+            _read_api_cache = cache
+            print(f"  [API] 읽기 API: {api_server.url}/snapshot · /history/<{','.join(cache.windows)}> · /drivers "
+                  f"(이력 {len(cache.ts):,}틱 적재)")
+        except OSError as e:
+            print(f"  [API] 시작 실패 ({API_HOST}:{API_PORT}): {e}")
+
+    def _on_trade(market: str, price: float, ts):
+        with state_lock:
+            usdt_kimp, alerts = evaluate_trade_alerts(state, price, datetime.now(KST))
+        if alerts:
+            print(f"  [Upbit WS] 체결 {price:,.2f} → 테더 김프 {usdt_kimp:+.2f}% — 알림")
+            get_notifier(http).notify(alerts)
+
+    if stream:
+        ticker = UpbitTickerStream(["KRW-USDT"], on_trade=_on_trade)
+        register_stream_provider(ticker)
+        ticker.start()
+
+    fx_down    = False
+    last_saved = time.monotonic()
+    next_run   = time.monotonic()
+
+    while not stop.is_set():
+        now = datetime.now(KST)
+        _print_banner(now, "  (daemon)")
+        METRICS.begin_run()
+        try:
+            run_tick(state, http, now, lock=state_lock)   # 수집 중에는 잠그지 않음
+            fx_down = False
+        except TickAborted as e:
+            msg = f"❌ {e}"
+            print(msg)
+            # 장애 지속 중에는 최초 1회만 알림
+            if not fx_down:
+                send_telegram(msg, http=http)
+            fx_down = True
+        except Exception as e:
+            print(f"  ⚠ 회차 실패: {e}")
+
+        if time.monotonic() - last_saved >= STATE_SAVE_INTERVAL_SEC:
+            print("\n  [Daemon] 주기 상태 저장")
+            with state_lock, METRICS.span("save_state"):
+                persist_state(state)
+            last_saved = time.monotonic()
+        METRICS.end_run()
+
+        next_run += interval
+        delay = next_run - time.monotonic()
+        if delay < 0:
+            skipped   = int(-delay // interval) + 1
+            next_run += skipped * interval
+            delay     = next_run - time.monotonic()
+            print(f"  [Daemon] 회차 지연 — {skipped}회 건너뜀")
+        stop.wait(delay)
+
+    if ticker:
+        ticker.stop()
+    if metrics_server:
+        metrics_server.stop()
+    if api_server:
+        api_server.stop()
+        _read_api_cache = None
+    close_notifier()
+    settle_subscriber_deliveries()
+    print("\n  [Daemon] 종료 — 상태 저장")
+    persist_state(state)
+    http.close()
+
+
+# ═══════════════════════════════════════════════════════
+#  기동 시간 측정
+# ═══════════════════════════════════════════════════════
+
+HEAVY_MODULES = ("yfinance", "pandas", "numpy")
+
+
+def measure_startup(runs: int = 5) -> int:
+    """
+    새 인터프리터에서 `import monitor` 시간을 runs회 측정합니다.
+
+    무거운 폴백 의존성(HEAVY_MODULES)이 import 시점에 로드되거나
+    중앙값이 STARTUP_BUDGET_MS를 넘으면 1을 반환 (CI 검증용 종료 코드)
+    """
+    probe = (
+        "import sys, time, json\n"
+        "t = time.perf_counter()\n"
+        "import monitor\n"
+        "ms = (time.perf_counter() - t) * 1000\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'ms': ms, 'heavy': heavy}))\n"
+    )
+    here    = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    heavy   = set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", probe], cwd=here,
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        samples.append(result["ms"])
+        heavy.update(result["heavy"])
+
+    samples.sort()
+    median = samples[len(samples) // 2]
+    print(f"  [Startup] import monitor: 중앙값 {median:.0f}ms "
+          f"(최소 {samples[0]:.0f} / 최대 {samples[-1]:.0f}, {runs}회, 예산 {STARTUP_BUDGET_MS:g}ms)")
+    if heavy:
+        print(f"  [Startup] ⚠ import 시점에 무거운 모듈 로드됨: {sorted(heavy)}")
+    ok = not heavy and median <= STARTUP_BUDGET_MS
+    print(f"  [Startup] {'통과' if ok else '실패'}")
+    return 0 if ok else 1
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="김치프리미엄 모니터")
+    parser.add_argument("--daemon", action="store_true",
+                        help="상주 모드 (인프로세스 스케줄러)")
+    parser.add_argument("--interval", type=float, default=None,
+                        help=f"데몬 폴링 간격(초), 기본 {POLL_INTERVAL_SEC:g} (최소 {POLL_INTERVAL_MIN_SEC:g})")
+    parser.add_argument("--stream", action="store_true",
+                        help="데몬 모드에서 Upbit WebSocket 실시간 체결 구독")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="콜드 스타트(import) 시간 측정 후 종료")
+    parser.add_argument("--health", action="store_true",
+                        help="저장된 소스별 건강도(성공률 · 지연 · 서킷 상태) 출력 후 종료")
+    parser.add_argument("--attribution", nargs="?", const=ATTRIBUTION_HORIZONS, metavar="HORIZONS",
+                        help=f"기간별 금 김프 변동 분해 출력 후 종료 (기본 {ATTRIBUTION_HORIZONS})")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.startup_time:
+        sys.exit(measure_startup())
+    elif args.health:
+        state = load_state()
+        load_source_latency(state)
+        load_source_health(state)
+        print(format_source_health())
+    elif args.attribution:
+        horizons = [h.strip() for h in args.attribution.split(",") if h.strip()]
+        days     = max(parse_horizon(h) for h in horizons) / 86400
+        series   = GoldAttributionSeries.from_store(days=max(days, ATTRIBUTION_HISTORY_DAYS))
+        print(f"  [Attribution] 틱 {len(series):,}건 (환율 · 국제금 · 국내금 기여도, %p)")
+        for h in horizons:
+            attr = series.window(parse_horizon(h))
+            print("  " + (format_gold_attribution(attr, h) if attr else f"{h:<5} 데이터 부족"))
+    elif args.daemon:
+        run_daemon(args.interval, stream=args.stream)
+    else:
+        main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+과거 시세 리플레이 — 현재 알림 규칙이 과거 구간에서 어떻게 동작했을지 재현
+김프 계산은 NumPy 배열 연산, 알림 상태 머신은 구간(segment) 단위 단일 패스
+
+재현 대상은 기본 규칙(monitor.default_alert_rules — 테더 방향성 · 금 단계별)뿐입니다.
+ALERT_RULES_FILE 규칙(파생 지표 · cooldown 등)은 리플레이 · 스윕 · --verify 모두 반영하지 않습니다.
+
+입력: CSV / Parquet / ticks.db (컬럼: time, usd_krw, upbit_usdt, krx_gold_krw_g, intl_gold_usd_oz)
+사용: python replay.py history.csv [--verify] [--out alerts.csv]
+"""
+
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import sys
+import time
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+
+import monitor
+
+PRICE_COLUMNS = ("usd_krw", "upbit_usdt", "krx_gold_krw_g", "intl_gold_usd_oz")
+
+
+# ═══════════════════════════════════════════════════════
+#  입력
+# ═══════════════════════════════════════════════════════
+
+@dataclass
+class PriceSeries:
+    """
+    시간순 시세 배열 (결측은 NaN) — time은 epoch 초
+    """
+    time: np.ndarray
+    usd_krw: np.ndarray
+    upbit_usdt: np.ndarray
+    krx_gold_krw_g: np.ndarray
+    intl_gold_usd_oz: np.ndarray
+
+    def __len__(self):
+        return len(self.time)
+
+    def sorted(self) -> "PriceSeries":
+        order = np.argsort(self.time, kind="stable")
+        return PriceSeries(*(getattr(self, f)[order] for f in ("time", *PRICE_COLUMNS)))
+
+
+def _parse_time(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    dt = datetime.fromisoformat(str(value))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=monitor.KST)
+    return dt.timestamp()
+
+
+def _to_float(value) -> float:
+    if value is None or value == "":
+        return np.nan
+    return float(str(value).replace(",", ""))
+
+
+def load_csv(path: str) -> PriceSeries:
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return PriceSeries(
+        np.array([_parse_time(r["time"]) for r in rows], dtype=float),
+        *(np.array([_to_float(r.get(col)) for r in rows], dtype=float) for col in PRICE_COLUMNS),
+    ).sorted()
+
+
+def load_parquet(path: str) -> PriceSeries:
+    import pandas as pd  # pyarrow 또는 fastparquet 필요
+
+    df = pd.read_parquet(path)
+    times = df["time"]
+    if np.issubdtype(times.dtype, np.datetime64):
+        if times.dt.tz is None:
+            times = times.dt.tz_localize(monitor.KST)
+        epoch = times.map(lambda t: t.timestamp()).to_numpy(dtype=float)
+    else:
+        epoch = np.array([_parse_time(t) for t in times], dtype=float)
+    return PriceSeries(
+        epoch,
+        *(df[col].to_numpy(dtype=float) if col in df else np.full(len(df), np.nan)
+          for col in PRICE_COLUMNS),
+    ).sorted()
+
+
+def load_tick_db(path: str) -> PriceSeries:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            f"SELECT ts, {', '.join(PRICE_COLUMNS)} FROM ticks ORDER BY ts"
+        ).fetchall()
+    finally:
+        conn.close()
+    data = np.array(rows, dtype=float).reshape(-1, 1 + len(PRICE_COLUMNS))
+    return PriceSeries(*(data[:, i] for i in range(data.shape[1])))
+
+
+def load_series(path: str) -> PriceSeries:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        return load_parquet(path)
+    if ext in (".db", ".sqlite", ".sqlite3"):
+        return load_tick_db(path)
+    return load_csv(path)
+
+
+# ═══════════════════════════════════════════════════════
+#  벡터화 계산
+# ═══════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class Thresholds:
+    usdt_low:  float
+    usdt_high: float
+    gold_low:  float
+    gold_high: float
+    gold_step: float
+
+    @classmethod
+    def from_monitor(cls) -> "Thresholds":
+        return cls(monitor.USDT_KIMP_LOW, monitor.USDT_KIMP_HIGH,
+                   monitor.GOLD_KIMP_LOW, monitor.GOLD_KIMP_HIGH, monitor.GOLD_KIMP_STEP)
+
+
+def compute_premiums(series: PriceSeries) -> tuple:
+    """
+    (usdt_kimp, gold_kimp) 배열 — monitor.calc_usdt_kimp / calc_gold_kimp와 같은 식
+    """
+    usdt_kimp = ((series.upbit_usdt - series.usd_krw) / series.usd_krw) * 100
+    intl_gold_krw_g = (series.intl_gold_usd_oz * series.usd_krw) / monitor.TROY_OUNCE_TO_GRAM
+    gold_kimp = ((series.krx_gold_krw_g - intl_gold_krw_g) / intl_gold_krw_g) * 100
+    return usdt_kimp, gold_kimp
+
+
+def _zone_segments(values: np.ndarray, low: float, high: float):
+    """
+    유효값(NaN 제외)을 구역(-1 하단 / +1 상단)별 연속 구간으로 분할
+    정상 구간은 알림 상태를 초기화하므로 구간 경계가 곧 상태 리셋 지점입니다.
+    Yields:
+        (zone, 원본 인덱스 배열)
+    """
+    valid = np.flatnonzero(~np.isnan(values))
+    if valid.size == 0:
+        return
+    v    = values[valid]
+    zone = np.where(v <= low, -1, np.where(v >= high, 1, 0))
+    cuts = np.flatnonzero(np.diff(zone)) + 1
+    for idx in np.split(np.arange(valid.size), cuts):
+        z = int(zone[idx[0]])
+        if z != 0:
+            yield z, valid[idx]
+
+
+@dataclass
+class ReplayAlert:
+    index: int
+    time: float
+    key: str
+    value: float
+    step_level: int = None
+
+
+def directional_alerts(values: np.ndarray, low: float, high: float,
+                       prefix: str = "usdt") -> list:
+    """
+    should_alert()와 같은 방향성 규칙: 구간 첫 틱 + 직전 알림값보다 악화된 틱
+    (직전 알림값은 live와 동일하게 소수 4자리 반올림 값)
+    """
+    alerts = []
+    for zone, idx in _zone_segments(values, low, high):
+        key  = f"{prefix}_low" if zone < 0 else f"{prefix}_high"
+        prev = None
+        for i, v in zip(idx.tolist(), values[idx].tolist()):
+            if prev is None or (v < prev if zone < 0 else v > prev):
+                alerts.append(ReplayAlert(i, 0.0, key, v))
+                prev = round(v, 4)
+    return alerts
+
+
+def step_alerts(values: np.ndarray, low: float, high: float, step: float,
+                prefix: str = "gold") -> list:
+    """
+    should_alert_gold_step()과 같은 단계 규칙: 구간 첫 틱 + 단계(level)가 올라간 틱
+    """
+    alerts = []
+    for zone, idx in _zone_segments(values, low, high):
+        key = f"{prefix}_low" if zone < 0 else f"{prefix}_high"
+        v   = values[idx]
+        distance = (low - v) if zone < 0 else (v - high)
+        levels   = np.floor(distance / step).astype(np.int64)
+        # 단계는 구간 내 누적 최대를 넘을 때만 알림 → 누적 최대가 바뀌는 지점
+        running = np.maximum.accumulate(levels)
+        fire    = np.empty(levels.size, dtype=bool)
+        fire[0]  = True
+        fire[1:] = running[1:] > running[:-1]
+        for j in np.flatnonzero(fire).tolist():
+            alerts.append(ReplayAlert(int(idx[j]), 0.0, key, float(v[j]), int(levels[j])))
+    return alerts
+
+
+@dataclass
+class ReplayResult:
+    usdt_kimp: np.ndarray
+    gold_kimp: np.ndarray
+    alerts: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+def replay(series: PriceSeries, th: Thresholds = None) -> ReplayResult:
+    th      = th or Thresholds.from_monitor()
+    started = time.perf_counter()
+    usdt_kimp, gold_kimp = compute_premiums(series)
+    alerts = (
+        directional_alerts(usdt_kimp, th.usdt_low, th.usdt_high)
+        + step_alerts(gold_kimp, th.gold_low, th.gold_high, th.gold_step)
+    )
+    # live 경로와 같은 순서: 같은 틱이면 테더 → 금
+    alerts.sort(key=lambda a: (a.index, a.key.startswith("gold")))
+    for a in alerts:
+        a.time = float(series.time[a.index])
+    return ReplayResult(usdt_kimp, gold_kimp, alerts, time.perf_counter() - started)
+
+
+# ═══════════════════════════════════════════════════════
+#  live 경로와 대조 (--verify)
+# ═══════════════════════════════════════════════════════
+
+def replay_live(series: PriceSeries, th: Thresholds = None) -> list:
+    """
+    monitor.evaluate_usdt_alerts / evaluate_gold_alerts를 틱마다 그대로 호출 (느림, 검증용)
+    규칙 파일은 끄고 기본 규칙으로 평가 — 알림 키는 알림 상태에서 새로 기록된 키
+    """
+    th = th or Thresholds.from_monitor()
+    saved = {name: getattr(monitor, name) for name in
+             ("USDT_KIMP_LOW", "USDT_KIMP_HIGH", "GOLD_KIMP_LOW", "GOLD_KIMP_HIGH", "GOLD_KIMP_STEP",
+              "ALERT_RULES_FILE")}
+    monitor.USDT_KIMP_LOW, monitor.USDT_KIMP_HIGH = th.usdt_low, th.usdt_high
+    monitor.GOLD_KIMP_LOW, monitor.GOLD_KIMP_HIGH = th.gold_low, th.gold_high
+    monitor.GOLD_KIMP_STEP = th.gold_step
+    monitor.ALERT_RULES_FILE = ""
+
+    state  = {"last_alert": {}}
+    la     = state["last_alert"]
+    alerts = []
+    try:
+        with redirect_stdout(io.StringIO()):
+            for i in range(len(series)):
+                fx = series.usd_krw[i]
+                if np.isnan(fx):
+                    continue
+                fx  = float(fx)
+                now = datetime.fromtimestamp(series.time[i], monitor.KST)
+                upbit = float(series.upbit_usdt[i])
+                if not np.isnan(upbit):
+                    kimp   = monitor.calc_usdt_kimp(upbit, fx)
+                    before = dict(la)
+                    if monitor.evaluate_usdt_alerts(state, kimp, upbit, fx, now):
+                        alerts.append(ReplayAlert(i, series.time[i], _alerted_key(before, la), kimp))
+                krx, intl = float(series.krx_gold_krw_g[i]), float(series.intl_gold_usd_oz[i])
+                if not (np.isnan(krx) or np.isnan(intl)):
+                    kimp, intl_krw = monitor.calc_gold_kimp(krx, intl, fx)
+                    before = dict(la)
+                    if monitor.evaluate_gold_alerts(state, kimp, krx, intl, intl_krw, fx, "", now):
+                        key = _alerted_key(before, la)
+                        alerts.append(ReplayAlert(i, series.time[i], key, kimp, la[key].get("step_level")))
+    finally:
+        for name, value in saved.items():
+            setattr(monitor, name, value)
+    return alerts
+
+
+def _alerted_key(before: dict, after: dict) -> str:
+    """이번 평가에서 update_alert_state가 새로 쓴 상태 키 (항목을 새 dict로 교체하므로 동일성 비교)"""
+    return next(key for key, entry in after.items() if before.get(key) is not entry)
+
+
+def _alert_keys(alerts: list) -> list:
+    return [(a.index, a.key, a.step_level) for a in alerts]
+
+
+# ═══════════════════════════════════════════════════════
+#  CLI
+# ═══════════════════════════════════════════════════════
+
+def write_alerts_csv(path: str, alerts: list):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time", "key", "value", "step_level"])
+        for a in alerts:
+            writer.writerow([
+                datetime.fromtimestamp(a.time, monitor.KST).isoformat(),
+                a.key, f"{a.value:.4f}", "" if a.step_level is None else a.step_level,
+            ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="과거 시세로 알림 규칙 리플레이")
+    parser.add_argument("path", help="CSV / Parquet / ticks.db")
+    parser.add_argument("--usdt-low",  type=float, default=monitor.USDT_KIMP_LOW)
+    parser.add_argument("--usdt-high", type=float, default=monitor.USDT_KIMP_HIGH)
+    parser.add_argument("--gold-low",  type=float, default=monitor.GOLD_KIMP_LOW)
+    parser.add_argument("--gold-high", type=float, default=monitor.GOLD_KIMP_HIGH)
+    parser.add_argument("--gold-step", type=float, default=monitor.GOLD_KIMP_STEP)
+    parser.add_argument("--out", help="알림 목록 CSV 저장 경로")
+    parser.add_argument("--verify", action="store_true",
+                        help="live 알림 함수로 틱별 재계산해 결과 일치 확인")
+    args = parser.parse_args(argv)
+
+    th = Thresholds(args.usdt_low, args.usdt_high, args.gold_low, args.gold_high, args.gold_step)
+    series = load_series(args.path)
+    result = replay(series, th)
+
+    counts = {}
+    for a in result.alerts:
+        counts[a.key] = counts.get(a.key, 0) + 1
+    span = ""
+    if len(series):
+        first = datetime.fromtimestamp(series.time[0], monitor.KST)
+        last  = datetime.fromtimestamp(series.time[-1], monitor.KST)
+        span  = f"  ({first:%Y-%m-%d %H:%M} ~ {last:%Y-%m-%d %H:%M})"
+    print(f"  [Replay] 틱 {len(series):,}건{span}")
+    print(f"  [Replay] 기준: 테더 ≤{th.usdt_low}% / ≥{th.usdt_high}%, "
+          f"금 ≤{th.gold_low}% / ≥{th.gold_high}% (단계 {th.gold_step}%p)")
+    if monitor.ALERT_RULES_FILE and os.path.exists(monitor.ALERT_RULES_FILE):
+        print(f"  [Replay] {monitor.ALERT_RULES_FILE} 규칙은 반영하지 않음 — 기본 규칙만 재현")
+    print(f"  [Replay] 알림 {len(result.alerts)}건 {counts}  — {result.elapsed * 1000:.1f}ms")
+
+    if args.out:
+        write_alerts_csv(args.out, result.alerts)
+        print(f"  [Replay] 저장: {args.out}")
+
+    if args.verify:
+        started = time.perf_counter()
+        live    = replay_live(series, th)
+        same    = _alert_keys(live) == _alert_keys(result.alerts)
+        print(f"  [Verify] live 경로 {len(live)}건 ({time.perf_counter() - started:.2f}s) — "
+              f"{'일치' if same else '불일치'}")
+        if not same:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+로컬 스탠드인 서버 — 외부 시세 소스 없이 모니터를 검증하기 위한 가짜 업스트림
+(Upbit WebSocket ticker, 국내 거래소 REST 시세, 알림 수신처)
+표준 라이브러리만 사용 (네트워크 · 추가 의존성 불필요)
+"""
+
+import base64
+import hashlib
+import json
+import socketserver
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+# ═══════════════════════════════════════════════════════
+#  Upbit WebSocket ticker 스탠드인
+# ═══════════════════════════════════════════════════════
+
+def _ws_frame(payload: bytes, opcode: int = 0x2) -> bytes:
+    """서버 → 클라이언트 프레임 (마스킹 없음, FIN=1)"""
+    header = bytes([0x80 | opcode])
+    n = len(payload)
+    if n < 126:
+        header += bytes([n])
+    elif n < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", n)
+    else:
+        header += bytes([127]) + struct.pack("!Q", n)
+    return header + payload
+
+
+def _ws_read_frame(rfile) -> tuple:
+    """클라이언트 → 서버 프레임 읽기 (opcode, payload)"""
+    head = rfile.read(2)
+    if len(head) < 2:
+        raise ConnectionError("클라이언트 연결 종료")
+    b1, b2 = head
+    opcode = b1 & 0x0F
+    n = b2 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", rfile.read(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", rfile.read(8))[0]
+    mask = rfile.read(4) if b2 & 0x80 else b"\0\0\0\0"
+    data = rfile.read(n)
+    return opcode, bytes(c ^ mask[i % 4] for i, c in enumerate(data))
+
+
+class UpbitWebSocketStub:
+    """
+    Upbit `/websocket/v1` ticker를 흉내 내는 로컬 서버
+
+    구독 메시지를 받으면 prices를 interval초 간격으로 순환 전송합니다.
+    drop_after=N 이면 연결마다 N건 전송 후 끊어서 재연결 경로를 재현합니다.
+
+        with UpbitWebSocketStub([1390, 1391]) as stub:
+            stream = UpbitTickerStream(url=stub.url)
+    """
+
+    def __init__(self, prices, market: str = "KRW-USDT", interval: float = 0.05,
+                 drop_after: int = None, host: str = "127.0.0.1", port: int = 0):
+        self.prices      = list(prices)
+        self.market      = market
+        self.interval    = interval
+        self.drop_after  = drop_after
+        self.connections = 0
+        self.subscriptions = []
+        self._stop = threading.Event()
+
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stub._handle(self)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"ws://{host}:{port}/websocket/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handle(self, handler):
+        # ── HTTP Upgrade 핸드셰이크 ──
+        headers = {}
+        handler.rfile.readline()
+        while True:
+            line = handler.rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+        accept = base64.b64encode(
+            hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest()
+        ).decode()
+        handler.wfile.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        self.connections += 1
+
+        sent = 0
+        try:
+            # ── 구독 메시지 ──
+            opcode, payload = _ws_read_frame(handler.rfile)
+            self.subscriptions.append(json.loads(payload.decode()))
+
+            # ── 체결 전송 (Upbit처럼 바이너리 프레임) ──
+            while not self._stop.is_set():
+                price = self.prices[sent % len(self.prices)]
+                msg = {
+                    "type": "ticker",
+                    "code": self.market,
+                    "trade_price": price,
+                    "trade_timestamp": int(time.time() * 1000),
+                    "stream_type": "REALTIME",
+                }
+                handler.wfile.write(_ws_frame(json.dumps(msg).encode()))
+                sent += 1
+                if self.drop_after and sent >= self.drop_after:
+                    handler.wfile.write(_ws_frame(b"\x03\xe8", opcode=0x8))
+                    break
+                time.sleep(self.interval)
+        except (ConnectionError, OSError):
+            pass
+
+
+# ═══════════════════════════════════════════════════════
+#  HTTP JSON 스탠드인 (국내 거래소 등)
+# ═══════════════════════════════════════════════════════
+
+class JsonHttpStub:
+    """
+    경로별 JSON 응답을 돌려주는 로컬 HTTP 서버
+
+    routes: {"/path": dict | list | fn(query, body) -> (status, body[, content_type])}
+    body는 POST JSON 본문(파싱 결과, 없으면 None).
+    요청은 (method, path, query, body) 튜플로 requests에 기록됩니다.
+
+        with JsonHttpStub(venue_routes(prices)) as stub:
+            monitor.VENUE_BASE_URLS["bithumb"] = stub.url
+    """
+
+    def __init__(self, routes: dict, host: str = "127.0.0.1", port: int = 0):
+        self.routes   = dict(routes)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self, "GET")
+
+            def do_POST(self):
+                stub._handle(self, "POST")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handle(self, handler, method: str):
+        parts = urlsplit(handler.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        length = int(handler.headers.get("Content-Length") or 0)
+        raw    = handler.rfile.read(length) if length else b""
+        try:
+            data = json.loads(raw) if raw else None
+        except ValueError:
+            data = raw
+        self.requests.append((method, parts.path, query, data))
+
+        route = self.routes.get(parts.path)
+        content_type = "application/json"
+        if route is None:
+            status, body = 404, {"error": f"no route: {parts.path}"}
+        elif callable(route):
+            status, body, *rest = route(query, data)
+            content_type = rest[0] if rest else content_type
+        else:
+            status, body = 200, route
+
+        if isinstance(body, str):
+            payload = body.encode("utf-8")
+        elif isinstance(body, bytes):
+            payload = body
+        else:
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        try:
+            handler.send_response(status)
+            handler.send_header("Content-Type", content_type)
+            handler.send_header("Content-Length", str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+        except (ConnectionError, OSError):
+            pass   # 클라이언트가 타임아웃으로 먼저 끊음
+
+
+def venue_routes(prices: dict) -> dict:
+    """
+    국내 거래소 시세 응답 라우트 — prices: {"upbit": {"BTC": 1.5e8, ...}, "bithumb": {...}, ...}
+    각 거래소의 실제 응답 형식(전 종목 / 다중 심볼 엔드포인트)을 흉내 냅니다.
+    """
+    routes = {}
+
+    if "upbit" in prices:
+        def upbit(query, _body):
+            table = prices["upbit"]
+            try:
+                return 200, [{"market": m, "trade_price": table[m[4:]]}
+                             for m in query.get("markets", "").split(",")]
+            except KeyError as e:
+                return 404, {"error": {"name": 404, "message": f"Code not found: {e}"}}
+        routes["/v1/ticker"] = upbit
+
+    if "bithumb" in prices:
+        data = {sym: {"closing_price": str(p)} for sym, p in prices["bithumb"].items()}
+        data["date"] = str(int(time.time() * 1000))
+        routes["/public/ticker/ALL_KRW"] = {"status": "0000", "data": data}
+
+    if "korbit" in prices:
+        def korbit(query, _body):
+            table = prices["korbit"]
+            pairs = [p for p in query.get("symbol", "").split(",") if p]
+            return 200, {"success": True, "data": [
+                {"symbol": p, "close": str(table[p.split("_")[0].upper()])}
+                for p in pairs if p.split("_")[0].upper() in table
+            ]}
+        routes["/v2/tickers"] = korbit
+
+    if "coinone" in prices:
+        routes["/public/v2/ticker_new/KRW"] = {
+            "result": "success", "error_code": "0",
+            "tickers": [{"quote_currency": "krw", "target_currency": sym.lower(), "last": str(p)}
+                        for sym, p in prices["coinone"].items()],
+        }
+    return routes
+
+
+def notify_routes(token: str = "TEST", rate_limit_first: int = 0, retry_after: float = 0.2) -> dict:
+    """
+    알림 수신처 라우트 — Telegram sendMessage · 범용 웹훅(/webhook) · Discord 웹훅(/discord)
+
+    rate_limit_first=N 이면 각 수신처가 처음 N건을 429로 거절 (retry_after 재현)
+    """
+    counts = {}
+
+    def limited(name, ok_body, limit_body):
+        def route(_query, _body):
+            counts[name] = counts.get(name, 0) + 1
+            if counts[name] <= rate_limit_first:
+                return 429, limit_body
+            return 200, ok_body
+        return route
+
+    return {
+        f"/bot{token}/sendMessage": limited(
+            "telegram", {"ok": True, "result": {"message_id": 1}},
+            {"ok": False, "error_code": 429, "description": "Too Many Requests",
+             "parameters": {"retry_after": retry_after}},
+        ),
+        "/webhook": limited("webhook", {"ok": True}, {"error": "slow down"}),
+        "/discord": limited("discord", b"", {"message": "You are being rate limited.",
+                                              "retry_after": retry_after, "global": False}),
+    }
+
+
+# ═══════════════════════════════════════════════════════
+#  시세 소스 스탠드인 (벤치마크 · 장애 주입)
+# ═══════════════════════════════════════════════════════
+
+MARKET_PRICES = {
+    "usd_krw":          1385.5,
+    "upbit_usdt":       1402.0,
+    "krx_gold_krw_g":   150_000.0,
+    "intl_gold_usd_oz": 3300.0,
+}
+
+GOLD_DETAIL_HTML = """<html><head><meta charset="utf-8"><title>국내 금</title></head><body>
+<div class="spot"><h3>국내 금 시세</h3>{padding}
+<p class="no_today"><em>{price} 원/g</em></p>
+</div></body></html>"""
+
+
+class MarketDataStub(JsonHttpStub):
+    """
+    monitor.py가 쓰는 시세 소스 · Telegram을 한 서버에서 흉내 내는 스탠드인
+
+    faults[endpoint] (요청 시점에 읽으므로 실행 중 변경 가능):
+      delay:      응답 지연(초)
+      status:     HTTP 오류 코드로 응답 (fail_first=N 이면 처음 N건만)
+      invalid:    형식은 맞지만 검증 범위를 벗어난 값
+      retry_after: status=429일 때 Telegram 형식 retry_after(초)
+
+    endpoint: upbit · naver-fx · naver-metals · naver-desktop · swissquote · er-api · telegram
+    counts[endpoint]에 요청 수를 집계합니다.
+    """
+
+    def __init__(self, prices: dict = None, faults: dict = None, token: str = "TEST",
+                 host: str = "127.0.0.1", port: int = 0):
+        self.prices = dict(MARKET_PRICES, **(prices or {}))
+        self.faults = faults if faults is not None else {}
+        self.counts = {}
+        self._count_lock = threading.Lock()
+        p = self.prices
+
+        def upbit(query, _body, invalid):
+            price = 0 if invalid else p["upbit_usdt"]
+            return 200, [{"market": m, "trade_price": price}
+                         for m in query.get("markets", "KRW-USDT").split(",")]
+
+        def naver_fx(_query, _body, invalid):
+            rate = 99_999.0 if invalid else p["usd_krw"]
+            return 200, {"isSuccess": True, "result": [{
+                "localTradedAt": time.strftime("%Y-%m-%d"), "closePrice": f"{rate:,.2f}"}]}
+
+        def naver_metals(_query, _body, invalid):
+            return 200, {"closePrice": "0" if invalid else f"{p['krx_gold_krw_g']:,.0f}"}
+
+        def naver_desktop(_query, _body, invalid):
+            price = "—" if invalid else f"{p['krx_gold_krw_g']:,.2f}"
+            html  = GOLD_DETAIL_HTML.format(price=price, padding="<p>시세 안내</p>\n" * 200)
+            return 200, html, "text/html; charset=utf-8"
+
+        def swissquote(_query, _body, invalid):
+            spot = 50_000.0 if invalid else p["intl_gold_usd_oz"]
+            return 200, [{"topo": {"platform": "SwissquoteLtd"},
+                          "spreadProfilePrices": [{"spreadProfile": "prime",
+                                                   "bid": spot - 0.5, "ask": spot + 0.5}]}]
+
+        def er_api(_query, _body, invalid):
+            return 200, {"result": "success", "rates": {"KRW": 10.0 if invalid else p["usd_krw"]}}
+
+        def telegram(_query, _body, invalid):
+            if invalid:
+                return 400, {"ok": False, "error_code": 400, "description": "Bad Request"}
+            return 200, {"ok": True, "result": {"message_id": 1}}
+
+        routes = {
+            "/v1/ticker":                                  ("upbit", upbit),
+            "/front-api/marketIndex/prices":               ("naver-fx", naver_fx),
+            "/marketindex/metals/M04020000":               ("naver-metals", naver_metals),
+            "/marketindex/goldDetail.naver":               ("naver-desktop", naver_desktop),
+            "/public-quotes/bboquotes/instrument/XAU/USD": ("swissquote", swissquote),
+            "/v6/latest/USD":                              ("er-api", er_api),
+            f"/bot{token}/sendMessage":                    ("telegram", telegram),
+        }
+        super().__init__({path: self._faulty(name, fn) for path, (name, fn) in routes.items()},
+                         host, port)
+
+    def _faulty(self, name: str, fn):
+        def route(query, body):
+            with self._count_lock:
+                self.counts[name] = n = self.counts.get(name, 0) + 1
+            fault = self.faults.get(name) or {}
+            if fault.get("delay"):
+                time.sleep(fault["delay"])
+            status = fault.get("status")
+            if status and n <= fault.get("fail_first", n):
+                return status, {"ok": False, "error_code": status,
+                                "description": f"stub fault: {name}",
+                                "parameters": {"retry_after": fault.get("retry_after", 0.2)}}
+            return fn(query, body, bool(fault.get("invalid")))
+        return route
+
+    def reset_counts(self) -> dict:
+        with self._count_lock:
+            counts, self.counts = self.counts, {}
+        return counts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Upbit WebSocket / 국내 거래소 HTTP 스탠드인 서버")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--price", type=float, nargs="+", default=[1390.0, 1392.0, 1388.0])
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--venues", action="store_true",
+                        help="WebSocket 대신 국내 거래소 HTTP 스탠드인 실행 (고정 시세)")
+    args = parser.parse_args()
+
+    if args.venues:
+        base = {"USDT": args.price[0], "BTC": 150_000_000.0, "ETH": 5_000_000.0}
+        table = {venue: {sym: p * (1 + 0.002 * i) for sym, p in base.items()}
+                 for i, venue in enumerate(("upbit", "bithumb", "korbit", "coinone"))}
+        stub = JsonHttpStub(venue_routes(table), port=args.port).start()
+        names = ("UPBIT", "BITHUMB", "KORBIT", "COINONE")
+        print(f"  [Stub] {stub.url}  (VENUE_BASE_URL_{{{','.join(names)}}}로 지정)")
+    else:
+        stub = UpbitWebSocketStub(args.price, interval=args.interval, port=args.port).start()
+        print(f"  [Stub] {stub.url}  (UPBIT_WS_URL로 지정 후 monitor.py --daemon --stream)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
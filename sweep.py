@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+알림 임계값 스윕 — USDT_KIMP_LOW/HIGH, GOLD_KIMP_LOW/HIGH/STEP 조합별 알림 특성 비교
+김프 시계열은 한 번만 계산해 .npy로 저장하고, 워커 프로세스들이 읽기 전용 mmap으로 공유
+
+테더 규칙(low/high)과 금 규칙(low/high/step)은 서로 독립이므로
+두 그리드를 따로 스윕합니다 (곱집합 평가 불필요).
+replay.py와 같이 기본 규칙만 모델링합니다 (ALERT_RULES_FILE 규칙은 반영하지 않음).
+
+사용:
+  python sweep.py ticks.db --usdt-low=-3:0:0.25 --usdt-high=1:5:0.5 \\
+                           --gold-low=-4:0:0.5 --gold-high=2:10:1 --gold-step=0.25,0.5,1
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import replay
+
+# 워커 프로세스 공유 배열 (initializer에서 mmap으로 연결)
+_TIME = None
+_SERIES = {}
+
+
+# ═══════════════════════════════════════════════════════
+#  그리드
+# ═══════════════════════════════════════════════════════
+
+def parse_grid(spec: str) -> list:
+    """
+    "start:stop:step" (양끝 포함) · "a,b,c" · "a" 형식
+    """
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        if step <= 0:
+            raise argparse.ArgumentTypeError(f"step은 양수여야 합니다: {spec}")
+        n = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 10) for i in range(n)]
+    return [float(x) for x in spec.split(",")]
+
+
+def build_configs(args) -> list:
+    configs = []
+    for low, high in itertools.product(args.usdt_low, args.usdt_high):
+        if low < high:
+            configs.append(("usdt", low, high, None))
+    for low, high, step in itertools.product(args.gold_low, args.gold_high, args.gold_step):
+        if low < high and step > 0:
+            configs.append(("gold", low, high, step))
+    return configs
+
+
+# ═══════════════════════════════════════════════════════
+#  평가 (워커)
+# ═══════════════════════════════════════════════════════
+
+def _init_worker(time_path: str, series_paths: dict):
+    global _TIME
+    _TIME = np.load(time_path, mmap_mode="r")
+    for name, path in series_paths.items():
+        _SERIES[name] = np.load(path, mmap_mode="r")
+
+
+def evaluate(config: tuple, noise_window: float) -> dict:
+    """
+    설정 하나의 알림 특성
+
+    - alerts / alerts_per_day / episodes: 알림 수, 일평균, 임계 이탈 구간 수
+    - lag_min: 구간 극값 시점에 마지막 알림이 얼마나 오래됐는지 (중앙값, 분)
+    - gap_pp:  극값과 마지막 알림값의 차이 — 알리지 못한 추가 악화 (평균, %p)
+    - noise:   noise_window분보다 짧은 구간(임계 부근 깜빡임)에서 나온 알림 비율
+    """
+    kind, low, high, step = config
+    values = _SERIES[kind]
+    times  = _TIME
+
+    if kind == "usdt":
+        alerts = replay.directional_alerts(values, low, high)
+    else:
+        alerts = replay.step_alerts(values, low, high, step)
+    alert_idx = np.fromiter((a.index for a in alerts), dtype=np.int64, count=len(alerts))
+
+    lags, gaps = [], []
+    noisy = 0
+    episodes = 0
+    for zone, idx in replay._zone_segments(values, low, high):
+        episodes += 1
+        lo = np.searchsorted(alert_idx, idx[0])
+        hi = np.searchsorted(alert_idx, idx[-1], side="right")
+        if hi - lo and (times[idx[-1]] - times[idx[0]]) < noise_window * 60:
+            noisy += hi - lo
+
+        v = values[idx]
+        e = idx[int(np.argmin(v) if zone < 0 else np.argmax(v))]
+        k = np.searchsorted(alert_idx, e, side="right") - 1
+        if k >= lo:
+            last = alert_idx[k]
+            lags.append((times[e] - times[last]) / 60)
+            gaps.append(abs(values[e] - values[last]))
+
+    span_days = max((times[-1] - times[0]) / 86400, 1e-9) if len(times) else 1.0
+    return {
+        "kind":           kind,
+        "low":            low,
+        "high":           high,
+        "step":           "" if step is None else step,
+        "alerts":         len(alerts),
+        "alerts_per_day": round(len(alerts) / span_days, 3),
+        "episodes":       episodes,
+        "lag_min":        round(float(np.median(lags)), 2) if lags else 0.0,
+        "gap_pp":         round(float(np.mean(gaps)), 4) if gaps else 0.0,
+        "noise":          round(noisy / len(alerts), 4) if alerts else 0.0,
+    }
+
+
+def _evaluate_chunk(configs: list, noise_window: float) -> list:
+    return [evaluate(c, noise_window) for c in configs]
+
+
+# ═══════════════════════════════════════════════════════
+#  실행
+# ═══════════════════════════════════════════════════════
+
+def run_sweep(series: replay.PriceSeries, configs: list, workers: int = None,
+              noise_window: float = 30.0, chunk: int = 64) -> list:
+    """
+    김프 배열을 .npy로 한 번 저장한 뒤 프로세스 풀에서 mmap 공유로 평가
+    """
+    usdt_kimp, gold_kimp = replay.compute_premiums(series)
+    workers = workers or os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory(prefix="kimp-sweep-") as tmp:
+        time_path = os.path.join(tmp, "time.npy")
+        np.save(time_path, series.time)
+        series_paths = {}
+        for name, arr in (("usdt", usdt_kimp), ("gold", gold_kimp)):
+            series_paths[name] = os.path.join(tmp, f"{name}.npy")
+            np.save(series_paths[name], arr)
+
+        chunks = [configs[i:i + chunk] for i in range(0, len(configs), chunk)]
+        if workers == 1:
+            _init_worker(time_path, series_paths)
+            return [r for c in chunks for r in _evaluate_chunk(c, noise_window)]
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(time_path, series_paths)) as pool:
+            results = pool.map(_evaluate_chunk, chunks, itertools.repeat(noise_window))
+            return [r for part in results for r in part]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="알림 임계값 그리드 스윕 (멀티코어)")
+    parser.add_argument("path", help="CSV / Parquet / ticks.db")
+    parser.add_argument("--usdt-low",  type=parse_grid, default=[])
+    parser.add_argument("--usdt-high", type=parse_grid, default=[])
+    parser.add_argument("--gold-low",  type=parse_grid, default=[])
+    parser.add_argument("--gold-high", type=parse_grid, default=[])
+    parser.add_argument("--gold-step", type=parse_grid, default=[1.0])
+    parser.add_argument("--workers", type=int, default=None, help="기본: CPU 코어 수")
+    parser.add_argument("--noise-window", type=float, default=30.0,
+                        help="이보다 짧은(분) 이탈 구간의 알림을 노이즈로 집계")
+    parser.add_argument("--sort", default="noise",
+                        choices=["alerts", "alerts_per_day", "lag_min", "gap_pp", "noise"])
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--out", help="전체 결과 CSV 저장 경로")
+    args = parser.parse_args(argv)
+
+    configs = build_configs(args)
+    if not configs:
+        parser.error("평가할 조합이 없습니다 (--usdt-low/--usdt-high 또는 --gold-low/--gold-high 지정)")
+
+    series  = replay.load_series(args.path)
+    started = time.perf_counter()
+    results = run_sweep(series, configs, args.workers, args.noise_window)
+    elapsed = time.perf_counter() - started
+    print(f"  [Sweep] 틱 {len(series):,}건 × 조합 {len(configs):,}개 — "
+          f"{elapsed:.2f}s ({args.workers or os.cpu_count()} 프로세스)")
+
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"  [Sweep] 저장: {args.out}")
+
+    for kind in ("usdt", "gold"):
+        rows = [r for r in results if r["kind"] == kind and r["alerts"]]
+        if not rows:
+            continue
+        rows.sort(key=lambda r: (r[args.sort], r["gap_pp"]))
+        print(f"\n  [{kind}] 상위 {min(args.top, len(rows))}개 ({args.sort} 오름차순)")
+        print(f"  {'low':>7} {'high':>7} {'step':>5} {'알림':>6} {'/일':>7} {'구간':>5} "
+              f"{'lag(분)':>8} {'gap(%p)':>8} {'noise':>6}")
+        for r in rows[:args.top]:
+            print(f"  {r['low']:>7.2f} {r['high']:>7.2f} {str(r['step']):>5} {r['alerts']:>6} "
+                  f"{r['alerts_per_day']:>7.2f} {r['episodes']:>5} {r['lag_min']:>8.1f} "
+                  f"{r['gap_pp']:>8.3f} {r['noise']:>6.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+테스트 공통 — 저장소 루트의 monitor / stubs 모듈을 import 경로에 추가
+외부 네트워크 없이 stubs.py 스탠드인 서버만 사용합니다.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import monitor  # noqa: E402
+from stubs import MarketDataStub  # noqa: E402
+
+
+@pytest.fixture
+def market(monkeypatch, tmp_path):
+    """
+    MarketDataStub을 띄우고 monitor의 모든 외부 엔드포인트 · 저장 경로를 그쪽으로 돌림
+    (bench.point_monitor_at / reset_monitor와 같은 설정을 monkeypatch로 — 테스트 후 복원)
+    """
+    stub = MarketDataStub().start()
+    for name in monitor.SOURCE_BASE_URLS:
+        monkeypatch.setitem(monitor.SOURCE_BASE_URLS, name, stub.url)
+    for name in monitor.VENUE_BASE_URLS:
+        monkeypatch.setitem(monitor.VENUE_BASE_URLS, name, stub.url)
+    settings = {
+        "TELEGRAM_API_URL": stub.url, "TELEGRAM_BOT_TOKEN": "TEST", "TELEGRAM_CHAT_ID": "1",
+        "NOTIFY_WEBHOOK_URL": "", "DISCORD_WEBHOOK_URL": "", "SUBSCRIBERS_FILE": "",
+        "ALERT_RULES_FILE": "", "MARKET_HOURS_ENABLED": False,
+        "KIMP_ASSETS": ["USDT"], "KIMP_VENUES": ["upbit"],
+        "HTTP_TIMEOUT": 2.0, "HTTP_CACHE_ENABLED": False, "HEDGE_DELAY_SEC": 1.0,
+        "TICK_DB": str(tmp_path / "ticks.db"), "METRICS_FILE": str(tmp_path / "metrics.json"),
+        "PROVIDERS": [p for p in monitor.PROVIDERS if "yahoo" not in p.id],
+        "METRICS": monitor.Metrics(), "_source_latency": {}, "_source_health": {},
+        "_http_client": None, "_tick_store": None, "_notifier": None, "_gold_series": None,
+        "_read_api_cache": None, "_alert_plan": (None, None), "_subscriber_engine": None,
+        "_last_tick_values": None,
+        "_state_backend": monitor.MemoryStateBackend(),
+    }
+    for name, value in settings.items():
+        monkeypatch.setattr(monitor, name, value)
+    yield stub
+    monitor.close_notifier(timeout=5)
+    if monitor._http_client is not None:
+        monitor._http_client.close()
+    if monitor._tick_store is not None:
+        monitor._tick_store.close()
+    stub.stop()
@@ -0,0 +1,193 @@
+"""
+폴백 체인 · 헤징 — 지연된 1순위와 빠른 2순위 소스 (MarketDataStub)
+"""
+
+import time
+
+import pytest
+
+import monitor
+from stubs import MarketDataStub
+
+PATHS = {
+    "upbit":        "/v1/ticker",
+    "naver-fx":     "/front-api/marketIndex/prices",
+    "naver-metals": "/marketindex/metals/M04020000",
+    "er-api":       "/v6/latest/USD",
+}
+HEDGE_DELAY = 0.2
+
+
+@pytest.fixture(autouse=True)
+def fresh_sources(monkeypatch):
+    """소스 건강도 · 지연 표본 · 메트릭을 테스트마다 새로 시작"""
+    monkeypatch.setattr(monitor, "_source_health", {})
+    monkeypatch.setattr(monitor, "_source_latency", {})
+    monkeypatch.setattr(monitor, "METRICS", monitor.Metrics())
+    monkeypatch.setattr(monitor, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(monitor, "HEDGE_DELAY_SEC", HEDGE_DELAY)
+
+
+@pytest.fixture
+def http():
+    client = monitor.HttpClient(timeout=2.0, retries=0)
+    yield client
+    client.session.close()
+
+
+def provider(pid: str, stub: MarketDataStub, *endpoints: str, priority: int = 0,
+             fallback_only: bool = False) -> monitor.Provider:
+    """endpoints를 차례로 GET한 뒤 고정값을 돌려주는 Provider (요청 사이마다 취소 확인)"""
+    def fetch(http):
+        for name in endpoints:
+            http.get(f"{stub.url}{PATHS[name]}").raise_for_status()
+        return 1385.0
+    return monitor.Provider(pid, pid, "usd_krw", priority, fetch, fallback_only=fallback_only)
+
+
+def wait_idle(stub: MarketDataStub, seconds: float) -> dict:
+    time.sleep(seconds)
+    return stub.reset_counts()
+
+
+def test_fast_secondary_wins_and_slow_primary_is_cancelled(http):
+    with MarketDataStub(faults={"upbit": {"delay": 0.6}}) as stub:
+        chain = [provider("primary", stub, "upbit", "naver-fx", priority=0),
+                 provider("secondary", stub, "er-api", priority=1)]
+        result = monitor.fetch_with_fallback("환율", chain, http)
+        counts = wait_idle(stub, 0.8)
+
+    assert result.source == "secondary"
+    assert HEDGE_DELAY <= result.elapsed < HEDGE_DELAY + 0.3
+    # 1순위는 첫 요청 응답 후 취소 — 두 번째 요청(naver-fx)을 보내지 않음
+    assert counts == {"upbit": 1, "er-api": 1}
+
+
+def test_primary_within_budget_launches_no_hedge(http):
+    with MarketDataStub(faults={"upbit": {"delay": 0.05}}) as stub:
+        chain = [provider("primary", stub, "upbit", priority=0),
+                 provider("secondary", stub, "er-api", priority=1)]
+        result = monitor.fetch_with_fallback("환율", chain, http)
+        counts = wait_idle(stub, 0.1)
+
+    assert result.source == "primary"
+    assert counts == {"upbit": 1}
+
+
+def test_fast_failure_starts_next_source_immediately(http):
+    with MarketDataStub(faults={"upbit": {"delay": 1.0}, "naver-fx": {"status": 500}}) as stub:
+        chain = [provider("slow", stub, "upbit", priority=0),
+                 provider("broken", stub, "naver-fx", priority=1),
+                 provider("good", stub, "er-api", priority=2)]
+        result = monitor.fetch_with_fallback("환율", chain, http)
+        wait_idle(stub, 1.1)
+
+    assert result.source == "good"
+    # 헤지 1회(예산 1개) + 실패 즉시 다음 소스 — 예산을 두 번 기다리지 않음
+    assert result.elapsed < 2 * HEDGE_DELAY
+    assert monitor.peek_source_health("broken").failures == 1
+
+
+def test_all_sources_failing_raises(http):
+    with MarketDataStub(faults={"upbit": {"status": 503}, "er-api": {"status": 503}}) as stub:
+        chain = [provider("a", stub, "upbit", priority=0),
+                 provider("b", stub, "er-api", priority=1)]
+        with pytest.raises(RuntimeError, match="가져올 수 없습니다"):
+            monitor.fetch_with_fallback("환율", chain, http)
+
+    assert monitor.peek_source_health("a").failures == 1
+    assert monitor.peek_source_health("b").failures == 1
+
+
+# ── 서킷 브레이커 · 버려진 헤지 집계 ─────────────────
+
+@pytest.fixture
+def fast_breaker(monkeypatch):
+    monkeypatch.setattr(monitor, "BREAKER_FAILURES", 3)
+    monkeypatch.setattr(monitor, "BREAKER_COOLDOWN_SEC", 0.3)
+    monkeypatch.setattr(monitor, "HEALTH_REPROBE_SEC", 0.2)
+
+
+def breaker_chain(stub):
+    # steady는 fallback_only — 지연 기반 재정렬과 무관하게 flaky가 항상 먼저
+    return [provider("flaky", stub, "naver-fx", priority=0),
+            provider("steady", stub, "er-api", priority=1, fallback_only=True)]
+
+
+def test_breaker_opens_after_consecutive_failures_and_skips_source(http, fast_breaker):
+    with MarketDataStub(faults={"naver-fx": {"status": 500}}) as stub:
+        for run in range(3):
+            assert monitor.fetch_with_fallback("환율", breaker_chain(stub), http).source == "steady"
+            assert monitor.peek_source_health("flaky").is_open() == (run == 2)
+        stub.reset_counts()
+
+        # 쿨다운 중에는 체인에서 제외 — 요청 자체를 보내지 않음
+        result = monitor.fetch_with_fallback("환율", breaker_chain(stub), http)
+        counts = stub.reset_counts()
+
+    assert result.source == "steady"
+    assert counts == {"er-api": 1}
+    health = monitor.peek_source_health("flaky")
+    assert (health.failures, health.consecutive) == (3, 3)
+    assert monitor.METRICS.counters[("kimp_source_failures_total",
+                                     monitor._label_key({"source": "flaky", "reason": "http"}))] == 3
+
+
+def test_breaker_half_open_reprobe_closes_on_success(http, fast_breaker):
+    with MarketDataStub(faults={"naver-fx": {"status": 500}}) as stub:
+        for _ in range(3):
+            monitor.fetch_with_fallback("환율", breaker_chain(stub), http)
+        stub.faults.pop("naver-fx")
+        time.sleep(0.35)        # 쿨다운 종료 → 오래 시도되지 않은 소스로 맨 앞에서 재측정
+        result = monitor.fetch_with_fallback("환율", breaker_chain(stub), http)
+
+    assert result.source == "flaky"
+    health = monitor.peek_source_health("flaky")
+    assert not health.is_open() and health.consecutive == 0 and health.successes == 1
+
+
+def test_breaker_half_open_reprobe_reopens_on_failure(http, fast_breaker):
+    with MarketDataStub(faults={"naver-fx": {"status": 500}}) as stub:
+        for _ in range(3):
+            monitor.fetch_with_fallback("환율", breaker_chain(stub), http)
+        time.sleep(0.35)
+        stub.reset_counts()
+        monitor.fetch_with_fallback("환율", breaker_chain(stub), http)
+        reprobe = stub.reset_counts()
+        monitor.fetch_with_fallback("환율", breaker_chain(stub), http)
+        after = stub.reset_counts()
+
+    assert reprobe == {"naver-fx": 1, "er-api": 1}   # 시험 요청 1회
+    assert after == {"er-api": 1}                     # 한 번 더 실패하면 바로 다시 열림
+    health = monitor.peek_source_health("flaky")
+    assert health.consecutive == 4 and health.open_until > health.last_attempt
+
+
+def test_hedge_abandoned_within_budget_is_neither_success_nor_failure(http):
+    # primary 0.35s 응답 · secondary는 0.2s에 시작해 0.15s만에 버려짐 (예산 0.2s 안)
+    with MarketDataStub(faults={"upbit": {"delay": 0.35}, "er-api": {"delay": 0.6}}) as stub:
+        chain = [provider("primary", stub, "upbit", priority=0),
+                 provider("secondary", stub, "er-api", priority=1)]
+        result = monitor.fetch_with_fallback("환율", chain, http)
+        wait_idle(stub, 0.6)
+
+    assert result.source == "primary"
+    secondary = monitor.peek_source_health("secondary")
+    assert (secondary.successes, secondary.failures, secondary.recent) == (0, 0, "")
+    abandoned = monitor.METRICS.histograms[("kimp_source_request_seconds",
+                                            monitor._label_key({"source": "secondary", "outcome": "abandoned"}))]
+    assert abandoned[len(monitor.LATENCY_BUCKETS)] == 1
+    assert monitor.peek_source_health("primary").successes == 1
+
+
+def test_hedge_loser_past_budget_counts_as_timeout(http):
+    with MarketDataStub(faults={"upbit": {"delay": 0.6}}) as stub:
+        chain = [provider("primary", stub, "upbit", priority=0),
+                 provider("secondary", stub, "er-api", priority=1)]
+        monitor.fetch_with_fallback("환율", chain, http)
+        wait_idle(stub, 0.6)
+
+    primary = monitor.peek_source_health("primary")
+    assert (primary.successes, primary.failures, primary.consecutive) == (0, 1, 1)
+    assert monitor.METRICS.counters[("kimp_source_failures_total",
+                                     monitor._label_key({"source": "primary", "reason": "timeout"}))] == 1
@@ -0,0 +1,61 @@
+"""
+공용 HTTP 클라이언트 — 재시도 정책 · 실패 분류 (MarketDataStub)
+"""
+
+import time
+
+import pytest
+import requests
+
+import monitor
+from stubs import MARKET_PRICES, MarketDataStub
+
+UPBIT = "/v1/ticker"
+
+
+@pytest.fixture
+def http():
+    client = monitor.HttpClient(timeout=0.3, retries=1)
+    yield client
+    client.session.close()
+
+
+def test_read_timeout_is_not_retried(http):
+    with MarketDataStub(faults={"upbit": {"delay": 1.0}}) as stub:
+        started = time.monotonic()
+        with pytest.raises(requests.Timeout) as info:
+            http.get(f"{stub.url}{UPBIT}", params={"markets": "KRW-USDT"})
+        elapsed = time.monotonic() - started
+        counts = stub.reset_counts()
+
+    assert counts["upbit"] == 1
+    assert elapsed < 0.3 * 2
+    assert monitor.failure_reason(info.value) == "timeout"
+
+
+def test_retryable_status_is_retried_once(http):
+    with MarketDataStub(faults={"upbit": {"status": 503, "fail_first": 1}}) as stub:
+        resp = http.get(f"{stub.url}{UPBIT}", params={"markets": "KRW-USDT"})
+        counts = stub.reset_counts()
+
+    assert resp.status_code == 200
+    assert resp.json()[0]["trade_price"] == MARKET_PRICES["upbit_usdt"]
+    assert counts["upbit"] == 2
+
+
+def test_post_is_never_retried(http):
+    with MarketDataStub(faults={"telegram": {"status": 503}}) as stub:
+        resp = http.post(f"{stub.url}/botTEST/sendMessage", json={"chat_id": "1", "text": "x"})
+        counts = stub.reset_counts()
+
+    assert resp.status_code == 503
+    assert counts["telegram"] == 1
+
+
+def test_connection_refused_is_connection_failure(http):
+    with MarketDataStub() as stub:
+        url = stub.url
+    with pytest.raises(requests.ConnectionError) as info:
+        http.get(f"{url}{UPBIT}")
+    assert monitor.failure_reason(info.value) == "connection"
+
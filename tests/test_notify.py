@@ -0,0 +1,129 @@
+"""
+알림 디스패처 — 속도 제한 · 429 retry_after · 메시지 분할 (JsonHttpStub + notify_routes)
+"""
+
+import re
+import time
+
+import pytest
+
+import monitor
+from stubs import JsonHttpStub, notify_routes
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(monitor, "NOTIFY_RETRIES", 2)
+    monkeypatch.setattr(monitor, "NOTIFY_BACKOFF_SEC", 0.01)
+
+
+@pytest.fixture
+def http():
+    client = monitor.HttpClient(timeout=2.0, retries=0)
+    yield client
+    client.session.close()
+
+
+def sent_texts(stub: JsonHttpStub, path: str) -> list:
+    return [body["text"] for method, p, _, body in stub.requests if method == "POST" and p == path]
+
+
+def balanced(html: str) -> bool:
+    return not monitor._open_tags(html) and html.count("<") == html.count(">")
+
+
+def test_telegram_429_waits_retry_after(http):
+    with JsonHttpStub(notify_routes(rate_limit_first=1, retry_after=0.3)) as stub:
+        sink = monitor.TelegramSink("TEST", "42", base_url=stub.url, rate=50)
+        dispatcher = monitor.NotificationDispatcher([sink], http)
+        started = time.monotonic()
+        assert dispatcher.notify(["<b>알림</b>"]) == 1
+        assert dispatcher.close(timeout=5)
+        elapsed = time.monotonic() - started
+
+    assert elapsed >= 0.3
+    assert dispatcher.sent["Telegram"] == 1 and dispatcher.dropped["Telegram"] == 0
+    assert sent_texts(stub, "/botTEST/sendMessage") == ["<b>알림</b>"] * 2
+    assert stub.requests[-1][3] == {"chat_id": "42", "text": "<b>알림</b>", "parse_mode": "HTML"}
+
+
+def test_discord_429_waits_retry_after(http):
+    with JsonHttpStub(notify_routes(rate_limit_first=2, retry_after=0.2)) as stub:
+        sink = monitor.DiscordSink(f"{stub.url}/discord")
+        dispatcher = monitor.NotificationDispatcher([sink], http)
+        started = time.monotonic()
+        dispatcher.notify(["<b>금</b> 김프"])
+        assert dispatcher.close(timeout=5)
+        elapsed = time.monotonic() - started
+
+    assert elapsed >= 0.4
+    assert dispatcher.sent["Discord"] == 1
+    contents = [body["content"] for _, p, _, body in stub.requests if p == "/discord"]
+    assert contents == ["**금** 김프"] * 3
+
+
+def test_token_bucket_paces_messages(http):
+    with JsonHttpStub(notify_routes()) as stub:
+        sink = monitor.TelegramSink("TEST", "42", base_url=stub.url, rate=20, burst=1)
+        dispatcher = monitor.NotificationDispatcher([sink], http)
+        started = time.monotonic()
+        for i in range(5):
+            dispatcher.notify([f"메시지 {i}"])
+        assert dispatcher.close(timeout=5)
+        elapsed = time.monotonic() - started
+
+    assert elapsed >= 4 / 20 * 0.9        # 버스트 1 이후 초당 20건
+    assert sent_texts(stub, "/botTEST/sendMessage") == [f"메시지 {i}" for i in range(5)]
+
+
+def test_subscriber_send_reports_result(http):
+    def failing(_query, body):
+        if body["chat_id"] == "bad":
+            return 400, {"ok": False, "description": "Bad Request: chat not found"}
+        return 200, {"ok": True, "result": {}}
+
+    results = {}
+    with JsonHttpStub({"/botTEST/sendMessage": failing}) as stub:
+        sink = monitor.TelegramSink("TEST", None, base_url=stub.url, name="Subscribers", rate=100)
+        dispatcher = monitor.NotificationDispatcher([], http, sink)
+        for chat_id in ("good", "bad"):
+            dispatcher.notify(["알림"], chat_id=chat_id,
+                              on_done=lambda ok, chat_id=chat_id: results.__setitem__(chat_id, ok))
+        assert dispatcher.close(timeout=5)
+
+    assert results == {"good": True, "bad": False}
+    assert dispatcher.sent["Subscribers"] == 1 and dispatcher.dropped["Subscribers"] == 1
+    assert len(stub.requests) == 1 + (monitor.NOTIFY_RETRIES + 1)
+
+
+def test_long_merged_message_is_split_into_valid_parts(http):
+    alerts = [f"🔴 <b>테더 김프 알림 {i}</b>\n" + "".join(f"<i>줄 {j} &amp; 값</i>\n" for j in range(60))
+              for i in range(6)]
+    with JsonHttpStub(notify_routes()) as stub:
+        sink = monitor.TelegramSink("TEST", "42", base_url=stub.url, rate=100)
+        dispatcher = monitor.NotificationDispatcher([sink], http)
+        dispatcher.notify(alerts)
+        assert dispatcher.close(timeout=5)
+
+    parts = sent_texts(stub, "/botTEST/sendMessage")
+    assert len(parts) > 1
+    assert all(len(part) <= monitor.TELEGRAM_MAX_CHARS for part in parts)
+    assert all(balanced(part) for part in parts)
+    strip = lambda s: re.sub(r"\s+", "", re.sub(r"<[^>]+>", "", s))
+    assert strip("".join(parts)) == strip(dispatcher.SEPARATOR.join(alerts))
+
+
+def test_split_html_keeps_tags_and_entities_intact():
+    text = "<b>" + "가나다 &amp; 라마 " * 40 + "</b>"
+    parts = monitor.split_html(text, 50)
+    assert all(len(part) <= 50 for part in parts)
+    assert all(balanced(part) for part in parts)
+    assert all(part.startswith("<b>") and part.endswith("</b>") for part in parts)
+    assert all(re.search(r"&(?!amp;)", part) is None for part in parts)
+    assert "".join(re.sub(r"</?b>", "", part) for part in parts) == re.sub(r"</?b>", "", text)
+
+
+def test_split_message_prefers_alert_boundaries():
+    a, b = "A" * 30, "B" * 30
+    assert monitor.split_message(f"{a}\n\n{b}", 40) == [a, b]
+    assert monitor.split_message(f"{a}\n\n{b}", None) == [f"{a}\n\n{b}"]
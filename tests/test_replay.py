@@ -0,0 +1,51 @@
+"""
+벡터화 리플레이 ↔ live 알림 경로 대조 (replay.py --verify와 같은 검사, 합성 시계열)
+"""
+
+import numpy as np
+import pytest
+
+import replay
+
+TH = replay.Thresholds(usdt_low=-0.5, usdt_high=1.5, gold_low=0.0, gold_high=3.0, gold_step=0.5)
+TICKS = 4000
+
+
+def synthetic_series(seed: int, vol: float, gaps: float = 0.0, quantize: bool = False) -> replay.PriceSeries:
+    """
+    임계값을 자주 넘나드는 테더 · 금 김프 랜덤 워크 (gaps: 결측 비율, quantize: 원 단위 호가 · 정체 구간)
+    """
+    rng  = np.random.default_rng(seed)
+    t    = 1_767_225_600 + 60.0 * np.arange(TICKS)
+    fx   = 1400 + np.cumsum(rng.normal(0, 0.3, TICKS))
+    usdt = 0.5 + np.cumsum(rng.normal(0, vol, TICKS))
+    gold = 1.5 + np.cumsum(rng.normal(0, vol, TICKS))
+    usdt = 0.5 + (usdt - usdt.mean()) / usdt.std() * 1.5      # 구간 [-1, 2] 안팎을 오가도록 정규화
+    gold = 1.5 + (gold - gold.mean()) / gold.std() * 2.5
+    intl = 3300 + np.cumsum(rng.normal(0, 2, TICKS))
+    upbit = fx * (1 + usdt / 100)
+    krx   = intl * fx / replay.monitor.TROY_OUNCE_TO_GRAM * (1 + gold / 100)
+    if quantize:
+        upbit, krx = np.round(upbit), np.round(krx, -1)
+        hold = rng.random(TICKS) < 0.3                         # 직전 틱 값 그대로
+        for arr in (upbit, krx):
+            for i in np.flatnonzero(hold[1:]) + 1:
+                arr[i] = arr[i - 1]
+    for arr in (fx, upbit, krx, intl):
+        arr[rng.random(TICKS) < gaps] = np.nan
+    return replay.PriceSeries(t, fx, upbit, krx, intl)
+
+
+@pytest.mark.parametrize("series", [
+    synthetic_series(1, vol=0.05),
+    synthetic_series(2, vol=0.2, gaps=0.05),
+    synthetic_series(3, vol=0.1, quantize=True),
+], ids=["smooth", "volatile-gaps", "quantized"])
+def test_replay_matches_live_alert_path(series, monkeypatch):
+    monkeypatch.setattr(replay.monitor, "_alert_plan", (None, None))
+    result = replay.replay(series, TH)
+    live   = replay.replay_live(series, TH)
+    assert replay._alert_keys(result.alerts) == replay._alert_keys(live)
+    keys = {a.key for a in live}
+    assert keys == {"usdt_low", "usdt_high", "gold_low", "gold_high"}   # 모든 규칙이 실제로 발동
+    assert len(live) > 50
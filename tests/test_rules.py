@@ -0,0 +1,173 @@
+"""
+알림 규칙 계획 (AlertPlan) — 파생 지표 · 체결 스트림 평가
+"""
+
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import monitor
+
+
+def use_rules(monkeypatch, tmp_path, config: dict):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(config), encoding="utf-8")
+    monkeypatch.setattr(monitor, "ALERT_RULES_FILE", str(path))
+
+
+def test_trade_evaluates_cross_group_metric(market, monkeypatch, tmp_path):
+    state, now = {"last_alert": {}}, datetime.now(monitor.KST)
+    monitor.run_tick(state, monitor.get_http_client(), now)
+    base = monitor._last_tick_values
+    gap  = base["gold_kimp"] - base["usdt_kimp"]
+    use_rules(monkeypatch, tmp_path, {
+        "metrics": {"gold_usdt_gap": "gold_kimp - usdt_kimp"},
+        "rules": [
+            {"id": "gap_high", "metric": "gold_usdt_gap", "op": ">=", "threshold": round(gap + 1, 2),
+             "template": "gap {value:+.2f}"},
+            {"id": "gold_any", "metric": "gold_kimp", "op": ">=", "threshold": -100, "realert": "always",
+             "template": "gold {value:+.2f}"},
+        ],
+    })
+    assert monitor.get_alert_plan().affected(monitor.TRADE_VALUE_NAMES) == ("gold_usdt_gap",)
+
+    # 테더 김프가 2%p 낮아지는 체결 — 금 그룹 값은 직전 회차 그대로
+    price = base["upbit_usdt"] - 0.02 * base["usd_krw"]
+    kimp, alerts = monitor.evaluate_trade_alerts(state, price, now)
+    assert kimp < base["usdt_kimp"]
+    assert alerts == [f"gap {base['gold_kimp'] - kimp:+.2f}"]
+    assert "gold_any" not in state["last_alert"]   # 체결과 무관한 그룹은 평가하지 않음
+
+
+def test_trade_before_first_tick_is_ignored(market):
+    assert monitor.evaluate_trade_alerts({"last_alert": {}}, 1400.0, datetime.now(monitor.KST)) == (None, [])
+
+
+def test_derived_metric_dependencies_expand_earlier_metrics():
+    plan = monitor.compile_alert_rules({
+        "metrics": {"a": "usdt_kimp * 2", "b": "a - gold_kimp"},
+        "rules": [{"id": "b_high", "metric": "b", "op": ">=", "threshold": 1},
+                  {"id": "fx_high", "metric": "usd_krw", "op": ">=", "threshold": 1500}],
+    })
+    assert plan.derived["b"][2] == {"usdt_kimp", "gold_kimp"}
+    assert plan.affected({"gold_kimp"}) == ("b",)
+    assert plan.affected({"usd_krw"}) == ("usd_krw",)
+
+
+def test_unknown_names_are_rejected_at_compile_time(monkeypatch):
+    monkeypatch.setattr(monitor, "KIMP_ASSETS", ["USDT"])
+    rule = {"id": "x", "metric": "usdt_kimp", "op": ">=", "threshold": 1}
+    cases = [
+        ({"metrics": {"gap": "btc_kimp - usdt_kimp"}}, "metrics.gap: 알 수 없는 값 'btc_kimp'"),
+        ({"metrics": {"gap": "usdt_kimpp * 2"}}, "알 수 없는 값 'usdt_kimpp'"),
+        ({"metrics": {"a": "b + 1", "b": "usdt_kimp"}}, "알 수 없는 값 'b'"),   # 뒤에 정의한 지표
+        ({"rules": [dict(rule, metric="gold_kimpp")]}, "rules[0]: 알 수 없는 값 'gold_kimpp'"),
+        ({"rules": [dict(rule, record=["usd_krww"])]}, "알 수 없는 값 'usd_krww'"),
+    ]
+    for config, message in cases:
+        try:
+            monitor.compile_alert_rules(config)
+        except ValueError as e:
+            assert message in str(e)
+        else:
+            raise AssertionError(f"{config} 컴파일 통과")
+
+    monkeypatch.setattr(monitor, "KIMP_ASSETS", ["USDT", "BTC"])
+    plan = monitor.compile_alert_rules({"metrics": {"gap": "btc_kimp - usdt_kimp"},
+                                        "rules": [dict(rule, metric="gap")]})
+    assert len(plan) == 1
+
+
+def test_anomaly_alerts_run_as_plan_rules_with_cooldown(monkeypatch):
+    monkeypatch.setattr(monitor, "ALERT_RULES_FILE", "")
+    monkeypatch.setattr(monitor, "_alert_plan", (None, None))
+    plan  = monitor.get_alert_plan()
+    state = {"last_alert": {}}
+    t0    = datetime(2026, 1, 5, 9, 0, tzinfo=monitor.KST)
+    for i in range(monitor.ANOMALY_MIN_SAMPLES + 10):
+        monitor.update_anomaly_stats(state, "usdt_kimp", 1.0 + 0.01 * (i % 3), t0 + timedelta(minutes=i))
+
+    def tick(minutes: float, kimp: float) -> list:
+        now    = t0 + timedelta(minutes=60 + minutes)
+        values = {"usdt_kimp": kimp, **monitor.update_anomaly_stats(state, "usdt_kimp", kimp, now)}
+        return plan.evaluate(state, values, now, log=False, groups=("usdt_anomaly",))
+
+    alerts = tick(0, 3.0)
+    assert len(alerts) == 1
+    assert alerts[0].startswith(f"⚡ <b>테더 김프 이상 변동</b> (z=+")
+    assert f"기준 |z|≥{monitor.ANOMALY_Z_THRESHOLD:g})\n김프: <b>+3.00%</b>\nEWMA: +1.0" in alerts[0]
+    assert state["last_alert"]["usdt_anomaly"]["usdt_kimp"] == 3.0
+
+    assert tick(5, 1.0) == []                                   # 정상 복귀해도 상태 유지
+    assert "usdt_anomaly" in state["last_alert"]
+    assert tick(10, -3.0) == []                                 # 쿨다운 중
+    assert len(tick(monitor.ANOMALY_COOLDOWN_MIN + 1, -6.0)) == 1
+
+
+def test_rules_file_keeps_default_anomaly_rules_unless_redefined(monkeypatch, tmp_path):
+    rule = {"id": "usdt_low", "metric": "usdt_kimp", "op": "<=", "threshold": -1}
+    use_rules(monkeypatch, tmp_path, {"rules": [rule]})
+    monkeypatch.setattr(monitor, "_alert_plan", (None, None))
+    assert [g.name for g in monitor.get_alert_plan().groups][:3] == ["usdt", "usdt_anomaly", "gold_anomaly"]
+
+    custom = {"id": "usdt_z", "group": "usdt_anomaly", "metric": "usdt_kimp_z_abs", "op": ">=", "threshold": 6}
+    use_rules(monkeypatch, tmp_path, {"rules": [rule, custom]})
+    monkeypatch.setattr(monitor, "_alert_plan", (None, None))
+    plan = monitor.get_alert_plan()
+    assert [g.name for g in plan.groups][:3] == ["usdt", "usdt_anomaly", "gold_anomaly"]
+    assert [r.id for r in plan.groups[1].rules] == ["usdt_z"]
+
+
+def venue_tick(state: dict, bithumb_kimp: float, now: datetime) -> list:
+    fx = 1400.0
+    snapshot = SimpleNamespace(usd_krw=fx, offshore={}, venues={
+        "upbit":   {"USDT": fx * 1.005},
+        "bithumb": {"USDT": fx * (1 + bithumb_kimp / 100)},
+    })
+    values = monitor.venue_values(monitor.calc_venue_matrix(snapshot), fx)
+    return monitor.get_alert_plan().evaluate(state, values, now, log=False)
+
+
+@pytest.fixture
+def venue_rules(monkeypatch):
+    for name, value in {"KIMP_ASSETS": ["USDT"], "USDT_KIMP_LOW": -1.0, "USDT_KIMP_HIGH": 3.0,
+                        "VENUE_SPREAD_PP": 1.0, "ALERT_RULES_FILE": "", "_alert_plan": (None, None)}.items():
+        monkeypatch.setattr(monitor, name, value)
+
+
+def test_venue_alerts_run_as_plan_rules(venue_rules):
+    state = {"last_alert": {}}
+    now   = datetime(2026, 1, 5, 9, 0, tzinfo=monitor.KST)
+    table = ("  Upbit: 1,407원 (+0.50%)\n  Bithumb: 1,372원 (-2.00%)\n"
+             "기준가: 1,400원  (환율 1,400.00원)\n⏰ 09:00 KST")
+    assert venue_tick(state, -2.0, now) == [
+        f"🔵 <b>테더 김프 알림 — Bithumb</b> (≤-1.0%, 첫 알림)\n"
+        f"김프: <b>-2.00%</b>  (거래소 간 괴리 2.50%p)\n{table}",
+        f"↔️ <b>테더 거래소 괴리</b> (괴리 ≥1.0%p, 첫 알림)\n"
+        f"괴리: <b>2.50%p</b>  (Upbit +0.50% ↔ Bithumb -2.00%)\n{table}",
+    ]
+    assert venue_tick(state, -1.5, now) == []                   # 개선 방향 — 재알림 없음
+    assert set(state["last_alert"]) == {"venue_usdt_low", "spread_usdt_high"}
+    alerts = venue_tick(state, -2.5, now)
+    assert [a.split("\n")[0] for a in alerts] == [
+        "🔵 <b>테더 김프 알림 — Bithumb</b> (≤-1.0%, 악화 (-2.00% → -2.50%, -0.50%p))",
+        "↔️ <b>테더 거래소 괴리</b> (괴리 ≥1.0%p, 악화 (+2.50% → +3.00%, +0.50%p))",
+    ]
+    assert venue_tick(state, -0.2, now) == []                   # 기준 복귀 — 상태 초기화
+    assert state["last_alert"] == {}
+
+
+def test_venue_rules_follow_rules_file(venue_rules, monkeypatch, tmp_path):
+    use_rules(monkeypatch, tmp_path, {"rules": [
+        {"id": "spread_usdt_high", "group": "spread_usdt", "metric": "venue_usdt_spread",
+         "op": ">=", "threshold": 3.0, "realert": "cooldown", "cooldown_min": 30,
+         "template": "{venue_usdt_max_name}-{venue_usdt_min_name} {value:.1f}%p"},
+    ]})
+    state = {"last_alert": {}}
+    now   = datetime(2026, 1, 5, 9, 0, tzinfo=monitor.KST)
+    assert len(venue_tick(state, -2.0, now)) == 1               # 기본 venue_usdt_low만 (괴리 2.5 < 3.0)
+    assert venue_tick(state, -3.0, now)[0] == "Upbit-Bithumb 3.5%p"          # 파일 규칙이 앞
+    assert "Upbit-Bithumb" not in "".join(venue_tick(state, -4.0, now + timedelta(minutes=10)))  # 쿨다운
+    assert venue_tick(state, -4.0, now + timedelta(minutes=31))[0] == "Upbit-Bithumb 4.5%p"
@@ -0,0 +1,56 @@
+"""
+상태 저장소 — GitStateBackend 커밋 대상 · 디바운스 (로컬 bare 저장소로 push)
+"""
+
+import shutil
+import subprocess
+from datetime import datetime
+
+import pytest
+
+import monitor
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git 필요")
+
+
+def git(cwd, *args) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@pytest.fixture
+def repo(tmp_path):
+    remote, work = tmp_path / "remote.git", tmp_path / "work"
+    git(tmp_path, "init", "-q", "--bare", str(remote))
+    git(tmp_path, "clone", "-q", str(remote), str(work))
+    git(work, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "--allow-empty", "-m", "init")
+    git(work, "push", "-q", "origin", "HEAD")
+    return work
+
+
+def test_git_backend_commits_only_state_json(repo):
+    store = monitor.TickStore(str(repo / "ticks.db"))
+    store.append(datetime.now(monitor.KST), {"usd_krw": 1385.0})
+    store.checkpoint()
+    backend = monitor.GitStateBackend(str(repo / "state.json"), interval_min=60)
+    try:
+        backend.save({"last_alert": {"usdt_low": {"value": -1.2, "time": "2026-01-01T00:00:00+09:00"}}})
+    finally:
+        store.close()
+
+    assert git(repo, "show", "--name-only", "--format=", "HEAD").split() == ["state.json"]
+    assert "ticks.db" in git(repo, "status", "--porcelain", "--untracked-files=all")
+    assert git(repo, "rev-parse", "HEAD").strip() in git(repo, "ls-remote", "origin")
+
+
+def test_git_backend_debounces_unchanged_alert_state(repo):
+    backend = monitor.GitStateBackend(str(repo / "state.json"), interval_min=60)
+    state = {"last_alert": {}}
+    backend.save(state)
+    first = git(repo, "rev-parse", "HEAD")
+    state["history_note"] = "값만 바뀜"
+    backend.save(state)
+    assert git(repo, "rev-parse", "HEAD") == first
+
+    state["last_alert"]["gold_high"] = {"value": 5.1, "time": "2026-01-01T00:00:00+09:00"}
+    backend.save(state)
+    assert git(repo, "rev-parse", "HEAD") != first
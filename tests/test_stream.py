@@ -0,0 +1,81 @@
+"""
+Upbit WebSocket 스트림 — 재연결 · 스트림 Provider 등록 (UpbitWebSocketStub)
+"""
+
+import time
+
+import pytest
+
+import monitor
+from stubs import UpbitWebSocketStub
+
+pytest.importorskip("websocket")
+
+
+def wait_until(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+@pytest.fixture
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(monitor, "WS_BACKOFF_MIN_SEC", 0.05)
+    monkeypatch.setattr(monitor, "WS_BACKOFF_MAX_SEC", 0.1)
+
+
+def test_stream_reconnects_after_server_close(fast_backoff):
+    trades = []
+    with UpbitWebSocketStub([1390.0, 1391.0, 1392.0], interval=0.01, drop_after=2) as stub:
+        stream = monitor.UpbitTickerStream(url=stub.url, on_trade=lambda m, p, ts: trades.append(p))
+        stream.start()
+        try:
+            assert wait_until(lambda: stream.connects >= 3)
+        finally:
+            stream.stop()
+
+    assert stub.connections >= 3
+    # 재연결마다 같은 구독 메시지를 다시 보냄
+    assert all(sub[1] == {"type": "ticker", "codes": ["KRW-USDT"], "isOnlyRealtime": True}
+               for sub in stub.subscriptions)
+    # 연결마다 처음 2건(1390, 1391)을 받고 끊김
+    assert trades[:4] == [1390.0, 1391.0, 1390.0, 1391.0]
+    assert stream.latest("KRW-USDT") in (1390.0, 1391.0)
+
+
+def test_stream_latest_expires_with_max_age(fast_backoff):
+    with UpbitWebSocketStub([1400.0], interval=0.01) as stub:
+        stream = monitor.UpbitTickerStream(url=stub.url)
+        stream.start()
+        try:
+            assert wait_until(lambda: stream.latest("KRW-USDT") is not None)
+        finally:
+            stream.stop()
+    assert stream.latest("KRW-USDT", max_age=60) == 1400.0
+    time.sleep(0.05)
+    assert stream.latest("KRW-USDT", max_age=0.01) is None
+    assert stream.latest("KRW-BTC") is None
+
+
+def test_register_stream_provider_replaces_previous(monkeypatch):
+    monkeypatch.setattr(monitor, "PROVIDERS", list(monitor.PROVIDERS))
+
+    class FixedStream:
+        def __init__(self, price):
+            self.price = price
+
+        def latest(self, market, max_age=None):
+            return self.price
+
+    monitor.register_stream_provider(FixedStream(1401.0))
+    monitor.register_stream_provider(FixedStream(1402.0))
+    ws = [p for p in monitor.PROVIDERS if p.id == "upbit:ws"]
+    assert len(ws) == 1
+    assert ws[0].fetch(None) == 1402.0
+
+    monitor.register_stream_provider(FixedStream(None))
+    with pytest.raises(RuntimeError):
+        [p for p in monitor.PROVIDERS if p.id == "upbit:ws"][0].fetch(None)
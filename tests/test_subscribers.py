@@ -0,0 +1,104 @@
+"""
+구독자별 알림 — 임계값 인덱스 경계 · 무변화 구간 전이 · 전송 실패 후 상태 복원
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import monitor
+
+NOW = datetime(2026, 1, 5, 9, 0, tzinfo=monitor.KST)
+
+
+def test_index_candidates_include_exact_boundaries():
+    index = monitor.ThresholdIndex()
+    index.set("a", -1.0, 3.0)
+    index.set("b", -2.0, 1.0)
+    assert index.candidates(0.0) == set()
+    assert index.candidates(-1.0) == {"a"}                 # lo 경계 포함
+    assert index.candidates(1.0) == {"b"}                  # hi 경계 포함
+    assert index.candidates(-1.0 + 1e-12) == {"a"}         # EPS 이내는 후보 (정확한 판단은 엔진)
+    assert index.candidates(-1.0 + 1e-6) == set()
+    assert index.candidates(-2.0) == {"a", "b"}
+    assert index.candidates(3.0) == {"a", "b"}
+
+    index.set("a", -1.5, -1.0)                             # 구간 이동 — 이전 경계는 남지 않음
+    assert index.candidates(2.0) == {"a", "b"}
+    assert index.candidates(-1.2) == set()
+    index.discard("a")
+    assert len(index) == 1 and index.candidates(-5.0) == {"b"}
+
+
+@pytest.mark.parametrize("entries, step, expected", [
+    ({}, None, (-1.0, 3.0)),                                                         # 정상 범위
+    ({"usdt_low": {"value": -1.7}}, None, (-1.7, -1.0)),                             # 방향성 low 알림 중
+    ({"usdt_high": {"value": 3.4}}, None, (3.0, 3.4)),                               # 방향성 high 알림 중
+    ({"usdt_low": {"value": -1.7, "step_level": 1}}, 0.5, (-2.0, -1.0)),             # 다음 단계선까지
+    ({"usdt_high": {"value": 3.2, "step_level": 0}}, 0.5, (3.0, 3.5)),
+])
+def test_quiet_interval_transitions(entries, step, expected):
+    assert monitor._quiet_interval(entries, "USDT", -1.0, 3.0, step) == expected
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    for name, value in {"USDT_KIMP_LOW": -1.0, "USDT_KIMP_HIGH": 3.0, "ALERT_RULES_FILE": "",
+                        "KIMP_ASSETS": ["USDT"], "_alert_plan": (None, None)}.items():
+        monkeypatch.setattr(monitor, name, value)
+    subs = [monitor.parse_subscription({"chat_id": "a", "assets": ["USDT"]}),
+            monitor.parse_subscription({"chat_id": "b", "assets": ["USDT"],
+                                        "thresholds": {"USDT": {"low": -2, "high": 2, "step": 0.5}}})]
+    return monitor.SubscriberAlertEngine(subs, {"last_alert": {}})
+
+
+def reading(kimp: float) -> dict:
+    return {"USDT": (kimp, "상세\n")}
+
+
+def test_engine_messages_match_default_rules(engine):
+    outbox = engine.evaluate(reading(-1.5), NOW)
+    expected = monitor.get_alert_plan().evaluate(
+        {"last_alert": {}}, {"usdt_kimp": -1.5, "usdt_detail": "상세\n"}, NOW, log=False)
+    assert outbox == {"a": expected}
+    assert engine.index["USDT"].bounds["a"] == (-1.5, -1.0)
+
+
+def test_engine_transitions_only_touch_candidates(engine):
+    assert set(engine.evaluate(reading(-1.5), NOW)) == {"a"}
+    assert engine.evaluate(reading(-1.2), NOW) == {}                 # 개선 — 구간 안
+    assert engine.last_candidates == 0
+    outbox = engine.evaluate(reading(-2.1), NOW)                     # a 악화 · b 단계별 첫 진입
+    assert "악화 (-1.50% → -2.10%, -0.60%p)" in outbox["a"][0]
+    assert "첫 알림 (기준 -2.0% 돌파, Level 0)" in outbox["b"][0]
+    assert engine.index["USDT"].bounds["b"] == (-2.5, -2.0)
+    assert set(engine.evaluate(reading(-2.4), NOW)) == {"a"}         # b: 같은 단계 (a는 악화)
+    assert "Level 0→1" in engine.evaluate(reading(-2.6), NOW)["b"][0]
+
+    assert engine.evaluate(reading(0.0), NOW) == {}                  # 정상 복귀 — 상태 초기화
+    assert engine.store == {}
+    assert engine.index["USDT"].bounds == {"a": (-1.0, 3.0), "b": (-2.0, 2.0)}
+
+
+def test_failed_send_restores_state_for_retry(engine):
+    engine.evaluate(reading(-1.5), NOW)
+    engine.ack("a", True)
+    engine.settle()
+    delivered = dict(engine.store["a"])
+
+    outbox = engine.evaluate(reading(-1.8), NOW + timedelta(minutes=1))
+    assert "악화" in outbox["a"][0]
+    engine.ack("a", False)
+    engine.settle()
+    assert engine.store["a"] == delivered                            # 알림 전 상태로 복원
+    assert engine.index["USDT"].bounds["a"] == (-1.5, -1.0)
+    assert "악화" in engine.evaluate(reading(-1.8), NOW + timedelta(minutes=2))["a"][0]   # 재시도
+
+
+def test_final_settle_restores_unacknowledged(engine):
+    assert set(engine.evaluate(reading(-2.2), NOW)) == {"a", "b"}
+    engine.ack("b", True)
+    assert engine.settle(final=True) == ["a"]
+    assert "a" not in engine.store and "b" in engine.store
+    assert engine.outstanding == {}
+    assert set(engine.evaluate(reading(-2.2), NOW)) == {"a"}         # a만 다시 첫 알림
@@ -0,0 +1,58 @@
+"""
+회차 실행 (run_tick) — 스탠드인 시세로 수집 → 계산 → 알림 판단 (MarketDataStub)
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import monitor
+
+
+class RecordingLock:
+    """잡고 있던 시간을 기록하는 잠금 (데몬 state_lock 대역)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.holds = []
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._since = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.holds.append(time.monotonic() - self._since)
+        self._lock.release()
+
+    def acquire(self, timeout: float) -> bool:
+        if self._lock.acquire(timeout=timeout):
+            self._lock.release()
+            return True
+        return False
+
+
+def test_run_tick_computes_premiums(market):
+    state = {"last_alert": {}}
+    monitor.run_tick(state, monitor.get_http_client(), datetime.now(monitor.KST))
+    latest = monitor.get_tick_store().latest(require=("usd_krw",))
+    fx, usdt = market.prices["usd_krw"], market.prices["upbit_usdt"]
+    assert latest["usd_krw"] == fx
+    assert abs(latest["usdt_kimp"] - monitor.calc_usdt_kimp(usdt, fx)) < 1e-3
+
+
+def test_state_lock_is_not_held_while_collecting(market):
+    market.faults["upbit"] = {"delay": 0.5}
+    lock  = RecordingLock()
+    state = {"last_alert": {}}
+    tick  = threading.Thread(target=monitor.run_tick,
+                             args=(state, monitor.get_http_client(), datetime.now(monitor.KST)),
+                             kwargs={"lock": lock})
+    started = time.monotonic()
+    tick.start()
+    time.sleep(0.2)
+    # 수집(Upbit 0.5s 지연) 중 — 체결 콜백이 기다리지 않고 잠금을 얻어야 함
+    assert lock.acquire(timeout=0.05)
+    tick.join(5)
+    assert time.monotonic() - started >= 0.5
+    assert lock.holds and max(lock.holds) < 0.2
@@ -0,0 +1,101 @@
+"""
+틱 저장소 — 원시 틱 기록 · OHLC 봉 upsert · 보존 기간 정리 · 봉 백필
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import monitor
+
+NOW = datetime(2026, 1, 10, 12, 0, 30, tzinfo=monitor.KST)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(monitor, "HTTP_CACHE_DB", str(tmp_path / "http_cache.db"))
+    store = monitor.TickStore(str(tmp_path / "ticks.db"))
+    yield store
+    store.close()
+
+
+def bars(store, res: int, series: str = "usd_krw") -> list:
+    return [(start, ohlc) for start, _, ohlc in store.iter_bars(res, columns=(series,))]
+
+
+def test_append_rounds_and_keeps_metadata(store):
+    store.append(NOW, {"usd_krw": 1385.456, "usdt_kimp": 1.234567}, sources={"usd_krw": "fx:naver"},
+                 latency={"usd_krw": 0.12}, errors={"upbit_usdt": "시간 초과"})
+    store.append(NOW + timedelta(seconds=30), {"usdt_kimp": 1.5})
+    assert store.count() == 2
+    latest = store.latest(require=("usd_krw",))
+    assert (latest["usd_krw"], latest["usdt_kimp"], latest["gold_kimp"]) == (1385.46, 1.2346, None)
+    assert latest["sources"] == {"usd_krw": "fx:naver"} and latest["errors"] == {"upbit_usdt": "시간 초과"}
+    assert [r["usdt_kimp"] for r in store.iter_range(NOW, columns=("usdt_kimp",))] == [1.2346, 1.5]
+    with pytest.raises(ValueError):
+        store.latest(require=("usd_krw; DROP TABLE ticks",))
+
+
+def test_iter_range_pages_through_equal_timestamps(store):
+    for i in range(5):
+        store.append(NOW + timedelta(seconds=i // 2), {"usd_krw": 1380.0 + i})   # 같은 ts 2건씩
+    rows = list(store.iter_range(columns=("usd_krw",), batch=2))
+    assert [r["usd_krw"] for r in rows] == [1380.0, 1381.0, 1382.0, 1383.0, 1384.0]
+    assert [r["usd_krw"] for r in store.iter_range(NOW + timedelta(seconds=1), NOW + timedelta(seconds=2),
+                                                   columns=("usd_krw",))] == [1382.0, 1383.0]
+
+
+def test_bars_upsert_ohlc_per_resolution(store):
+    for seconds, fx in ((0, 1385.0), (10, 1390.0), (20, 1380.0), (60, 1386.0), (3660, 1400.0)):
+        store.append(NOW + timedelta(seconds=seconds), {"usd_krw": fx})
+    minute = NOW.replace(second=0).timestamp()
+    assert bars(store, 60) == [(minute, (1385.0, 1390.0, 1380.0, 1380.0)),
+                               (minute + 60, (1386.0, 1386.0, 1386.0, 1386.0)),
+                               (minute + 3660, (1400.0,) * 4)]
+    hour = NOW.replace(minute=0, second=0).timestamp()
+    assert bars(store, 3600) == [(hour, (1385.0, 1390.0, 1380.0, 1386.0)), (hour + 3600, (1400.0,) * 4)]
+    day = NOW.replace(hour=0, minute=0, second=0).timestamp()      # 일봉 경계 = KST 자정
+    assert bars(store, 86400) == [(day, (1385.0, 1400.0, 1380.0, 1400.0))]
+    count = store._conn.execute("SELECT count FROM bars WHERE series = 'usd_krw' AND res = 86400").fetchone()
+    assert count[0] == 5
+    assert bars(store, 60, "gold_kimp") == []                       # 값이 없던 계열은 봉도 없음
+
+
+def test_compact_keeps_hour_and_day_bars(store, monkeypatch):
+    monkeypatch.setattr(monitor, "TICK_RETENTION_DAYS", 1)
+    monkeypatch.setattr(monitor, "MINUTE_BAR_RETENTION_DAYS", 2)
+    old, mid = NOW - timedelta(days=3), NOW - timedelta(days=1.5, hours=-0.5)   # 01-07 12:00:30 · 01-09 00:00:30
+    for t, fx in ((old, 1370.0), (mid, 1380.0), (NOW, 1390.0)):
+        store.append(t, {"usd_krw": fx})
+
+    assert store.compact(NOW, force=True) == (2, 1)                 # 틱: old · mid, 1분 봉: old
+    assert store.compact(NOW) == (0, 0)                             # 정리 주기 안
+    assert store.count() == 1
+    assert [start for start, _ in bars(store, 60)] == [mid.replace(second=0).timestamp(),
+                                                       NOW.replace(second=0).timestamp()]
+    assert len(bars(store, 3600)) == 3 and len(bars(store, 86400)) == 3
+
+    # 이력 = 1시간 봉(old) → 1분 봉(mid) → 원시 틱 (봉 값의 ts는 봉 종료 시각)
+    history = [(r["ts"], r["usd_krw"]) for r in store.iter_history(columns=("usd_krw",))]
+    assert history == [(old.replace(second=0).timestamp() + 3600, 1370.0),
+                       (mid.replace(second=0).timestamp() + 60, 1380.0),
+                       (NOW.timestamp(), 1390.0)]
+
+
+def test_missing_bars_table_is_backfilled_from_ticks(store, tmp_path):
+    for seconds, fx in ((0, 1385.0), (15, 1390.0), (5400, 1380.0)):
+        store.append(NOW + timedelta(seconds=seconds), {"usd_krw": fx, "gold_kimp": 2.0})
+    expected = {res: bars(store, res) for res in monitor.BAR_RESOLUTIONS.values()}
+    store.close()
+
+    conn = sqlite3.connect(tmp_path / "ticks.db")
+    conn.execute("DROP TABLE bars")
+    conn.commit()
+    conn.close()
+    reopened = monitor.TickStore(str(tmp_path / "ticks.db"))
+    try:
+        assert {res: bars(reopened, res) for res in monitor.BAR_RESOLUTIONS.values()} == expected
+        assert len(bars(reopened, 60, "gold_kimp")) == 2
+    finally:
+        reopened.close()
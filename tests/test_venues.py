@@ -0,0 +1,100 @@
+"""
+국내 거래소 어댑터 — 정상 응답 · 오류 응답 (JsonHttpStub + venue_routes)
+"""
+
+import pytest
+import requests
+
+import monitor
+from stubs import JsonHttpStub, venue_routes
+
+PRICES = {
+    "upbit":   {"USDT": 1402.0, "BTC": 150_000_000.0, "ETH": 5_000_000.0},
+    "bithumb": {"USDT": 1403.0, "BTC": 150_300_000.0, "ETH": 5_010_000.0},
+    "korbit":  {"USDT": 1404.0, "BTC": 150_600_000.0},
+    "coinone": {"USDT": 1405.0, "BTC": 150_900_000.0, "ETH": 5_030_000.0},
+}
+
+
+@pytest.fixture
+def http():
+    client = monitor.HttpClient(timeout=2.0, retries=0)
+    yield client
+    client.session.close()
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """routes로 스탠드인을 띄우고 모든 거래소 기본 URL을 그쪽으로 지정"""
+    stubs = []
+
+    def start(routes: dict) -> JsonHttpStub:
+        stub = JsonHttpStub(routes).start()
+        stubs.append(stub)
+        for venue in monitor.VENUE_BASE_URLS:
+            monkeypatch.setitem(monitor.VENUE_BASE_URLS, venue, stub.url)
+        return stub
+
+    yield start
+    for stub in stubs:
+        stub.stop()
+
+
+@pytest.mark.parametrize("venue", ["bithumb", "korbit", "coinone"])
+def test_venue_adapter_parses_prices(serve, http, venue):
+    stub   = serve(venue_routes(PRICES))
+    prices = monitor.fetch_venue_prices(venue, ["USDT", "BTC", "ETH"], http)
+    assert prices == PRICES[venue]
+    assert len(stub.requests) == 1       # 거래소당 요청 1회
+
+
+def test_korbit_requests_all_symbols_in_one_call(serve, http):
+    stub = serve(venue_routes(PRICES))
+    monitor.fetch_venue_prices("korbit", ["USDT", "BTC"], http)
+    (_, path, query, _), = stub.requests
+    assert path == "/v2/tickers"
+    assert query["symbol"] == "usdt_krw,btc_krw"
+
+
+def test_upbit_batch_tickers(serve, http):
+    serve(venue_routes(PRICES))
+    prices = monitor.fetch_upbit_tickers(http, ["KRW-USDT", "KRW-BTC"])
+    assert prices == {"KRW-USDT": 1402.0, "KRW-BTC": 150_000_000.0}
+
+
+def test_upbit_unknown_market_is_http_error(serve, http):
+    serve(venue_routes(PRICES))
+    with pytest.raises(requests.HTTPError):
+        monitor.fetch_upbit_tickers(http, ["KRW-USDT", "KRW-XRP"])
+
+
+@pytest.mark.parametrize("venue, routes", [
+    ("bithumb", {"/public/ticker/ALL_KRW": {"status": "5600", "message": "점검 중"}}),
+    ("korbit",  {"/v2/tickers": {"success": False, "error": "invalid symbol"}}),
+    ("coinone", {"/public/v2/ticker_new/KRW": {"result": "error", "error_code": "4"}}),
+])
+def test_venue_error_status_in_body(serve, http, venue, routes):
+    serve(routes)
+    with pytest.raises(ValueError):
+        monitor.fetch_venue_prices(venue, ["USDT"], http)
+
+
+@pytest.mark.parametrize("venue", ["bithumb", "korbit", "coinone"])
+def test_venue_http_error(serve, http, venue):
+    serve({})       # 모든 경로 404
+    with pytest.raises(requests.HTTPError):
+        monitor.fetch_venue_prices(venue, ["USDT"], http)
+
+
+@pytest.mark.parametrize("venue", ["bithumb", "korbit", "coinone"])
+def test_venue_without_watched_symbols(serve, http, venue):
+    serve(venue_routes(PRICES))
+    with pytest.raises(ValueError, match="감시 자산 시세 없음"):
+        monitor.fetch_venue_prices(venue, ["DOGE"], http)
+
+
+@pytest.mark.parametrize("venue", ["bithumb", "korbit", "coinone"])
+def test_venue_rejects_non_positive_price(serve, http, venue):
+    serve(venue_routes({venue: {"USDT": 0.0}}))
+    with pytest.raises(ValueError, match="비정상 가격"):
+        monitor.fetch_venue_prices(venue, ["USDT"], http)